@@ -0,0 +1,305 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from panel_calc import load_panels
+from shared_panel import load_shared_panels, map_blocks
+from signal_calc import detect_ema_crossovers
+
+# ---------------------------
+# Vectorized crossover backtest
+# ---------------------------
+# Evaluates the EMA 12/26 crossovers of detect_ema_crossovers on the whole
+# universe at once. Inputs are dates x tickers panels and every step is an
+# array operation over all tickers and bars; there is no per-bar loop.
+#
+# Rules:
+# - A bullish cross goes long, a bearish cross goes flat (or short with
+#   short=True). Signals are taken at the close of their bar, so the new
+#   position earns returns from the next bar on.
+# - Optional filters only apply to entries: rsi_max skips bullish crosses
+#   with RSI at or above it, macd_confirm requires a positive MACD histogram
+#   (negative for short entries).
+# - Transaction costs are a fraction of the traded value, charged on every
+#   change of position (a flip from long to short trades twice).
+
+TRADING_DAYS = 252
+BACKTEST_COLUMNS = ['Close', 'EMA_12', 'EMA_26', 'RSI_14', 'MACD_Hist']
+
+
+def _ffill(values):
+    # Forward fill NaN down every column
+    rows = np.arange(values.shape[0])[:, None]
+    last = np.maximum.accumulate(np.where(np.isnan(values), 0, rows), axis=0)
+    return np.take_along_axis(values, last, axis=0)
+
+
+def target_positions(bullish, bearish, rsi=None, macd_hist=None, rsi_max=None,
+                     macd_confirm=False, short=False):
+    """
+    Turn crossover flags into the position held after each bar's close
+
+    Parameters:
+    - bullish, bearish: Boolean dates x tickers arrays
+    - rsi: Optional RSI panel for the rsi_max filter
+    - macd_hist: Optional MACD histogram panel for the macd_confirm filter
+    - rsi_max: Skip bullish entries with RSI at or above this level
+    - macd_confirm: Only enter in the direction of the MACD histogram
+    - short: Go short on bearish crosses instead of flat
+
+    Returns:
+    - Float array of positions (1 long, 0 flat, -1 short)
+    """
+    bullish = np.asarray(bullish, dtype=bool)
+    bearish = np.asarray(bearish, dtype=bool)
+
+    long_entry = bullish
+    short_entry = bearish if short else np.zeros_like(bearish)
+    if rsi_max is not None:
+        long_entry = long_entry & (np.asarray(rsi) < rsi_max)
+    if macd_confirm:
+        long_entry = long_entry & (np.asarray(macd_hist) > 0)
+        short_entry = short_entry & (np.asarray(macd_hist) < 0)
+
+    # Every cross closes the open position; filtered crosses leave it flat
+    target = np.full(bullish.shape, np.nan)
+    target[bullish | bearish] = 0.0
+    target[long_entry] = 1.0
+    target[short_entry] = -1.0
+    target[0][np.isnan(target[0])] = 0.0
+
+    return _ffill(target)
+
+
+def _run_starts_ends(position):
+    # Rows where runs of the same non-zero position start and end, tickers
+    # major so starts and ends pair up one to one
+    values = position.T
+    previous = np.concatenate([np.zeros((values.shape[0], 1)), values[:, :-1]], axis=1)
+    following = np.concatenate([values[:, 1:], np.zeros((values.shape[0], 1))], axis=1)
+    active = values != 0
+    starts = np.nonzero(active & (values != previous))
+    ends = np.nonzero(active & (values != following))
+    return starts, ends
+
+
+def run_backtest(close, bullish, bearish, rsi=None, macd_hist=None, rsi_max=None,
+                 macd_confirm=False, short=False, cost=0.0):
+    """
+    Backtest crossover signals on every ticker of a panel
+
+    Parameters:
+    - close: DataFrame of close prices, dates x tickers
+    - bullish, bearish: Boolean DataFrames from detect_ema_crossovers
+    - rsi, macd_hist: Optional panels for the entry filters
+    - rsi_max: Skip bullish entries with RSI at or above this level
+    - macd_confirm: Only enter in the direction of the MACD histogram
+    - short: Go short on bearish crosses instead of flat
+    - cost: Transaction cost as a fraction of traded value (0.0005 = 5 bps)
+
+    Returns:
+    - Dict with 'positions', 'returns', 'equity' and 'drawdown' panels, the
+      equal-weight 'portfolio' (DataFrame of returns, equity, drawdown),
+      'trades' (one row per trade) and 'stats' (one row per ticker)
+    """
+    index, tickers = close.index, close.columns
+    prices = close.to_numpy(dtype=float)
+    listed = ~np.isnan(prices)
+
+    target = target_positions(bullish, bearish, rsi, macd_hist, rsi_max, macd_confirm, short)
+    target[~np.maximum.accumulate(listed, axis=0)] = 0.0
+
+    # The position decided at a close is held over the next bar
+    held = np.zeros_like(target)
+    held[1:] = target[:-1]
+
+    filled = _ffill(prices)
+    bar_returns = np.zeros_like(prices)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bar_returns[1:] = filled[1:] / filled[:-1] - 1
+    bar_returns[np.isnan(bar_returns)] = 0.0
+
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    gross = held * bar_returns
+    returns = gross - cost * turnover
+
+    equity = np.cumprod(1 + returns, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    active = np.maximum.accumulate(listed, axis=0)
+    portfolio = _portfolio(returns, active, index)
+
+    trades = _trades(target, filled, gross, index, tickers, cost)
+    stats = _stats(returns, equity, drawdown, held, active, trades, tickers)
+
+    def as_panel(values):
+        return pd.DataFrame(values, index=index, columns=tickers)
+
+    return {
+        'positions': as_panel(held),
+        'returns': as_panel(returns),
+        'equity': as_panel(equity),
+        'drawdown': as_panel(drawdown),
+        'portfolio': portfolio,
+        'trades': trades,
+        'stats': stats,
+    }
+
+
+def _portfolio(returns, active, index):
+    # Equal weight across the tickers listed on each date
+    counts = active.sum(axis=1)
+    portfolio_returns = np.divide(np.where(active, returns, 0).sum(axis=1), counts,
+                                  out=np.zeros(len(index)), where=counts > 0)
+    portfolio_equity = np.cumprod(1 + portfolio_returns)
+    return pd.DataFrame({
+        'returns': portfolio_returns,
+        'equity': portfolio_equity,
+        'drawdown': portfolio_equity / np.maximum.accumulate(portfolio_equity) - 1,
+    }, index=index)
+
+
+def _trades(target, prices, gross, index, tickers, cost):
+    """
+    List every run of a non-zero position as a trade
+
+    A trade is entered at the close of its signal bar and exited at the
+    close of the bar whose signal ends it, or is still open at the last bar.
+    Its return compounds the bar returns in between; net_return deducts the
+    cost of entering and exiting.
+    """
+    (columns, entries), (_, last_rows) = _run_starts_ends(target)
+    n_rows = target.shape[0]
+    exits = np.minimum(last_rows + 1, n_rows - 1)
+    is_open = last_rows == n_rows - 1
+
+    # Compounded gross return of each ticker up to every bar
+    growth = np.cumprod(1 + gross, axis=0)
+    gross_return = growth[exits, columns] / growth[entries, columns] - 1
+    side = target[entries, columns]
+
+    return pd.DataFrame({
+        'ticker': np.asarray(tickers)[columns],
+        'side': np.where(side > 0, 'long', 'short'),
+        'entry_date': index[entries],
+        'entry_price': prices[entries, columns],
+        'exit_date': index[exits],
+        'exit_price': prices[exits, columns],
+        'bars': exits - entries,
+        'return': gross_return,
+        'net_return': (1 + gross_return) * (1 - cost) ** np.where(is_open, 1, 2) - 1,
+        'open': is_open,
+    })
+
+
+def _stats(returns, equity, drawdown, held, active, trades, tickers):
+    # Per-ticker summary over the bars since each ticker's first close
+    bars = active.sum(axis=0)
+    years = bars / TRADING_DAYS
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(active, returns, 0).sum(axis=0) / bars
+        variance = (np.where(active, returns - mean, 0) ** 2).sum(axis=0) / (bars - 1)
+        sharpe = mean / np.sqrt(variance) * np.sqrt(TRADING_DAYS)
+        cagr = equity[-1] ** (1 / years) - 1
+
+    codes = pd.Categorical(trades['ticker'], categories=tickers).codes
+    n_trades = np.bincount(codes, minlength=len(tickers))
+    wins = np.bincount(codes, weights=trades['net_return'].to_numpy() > 0,
+                       minlength=len(tickers))
+
+    return pd.DataFrame({
+        'total_return': equity[-1] - 1,
+        'cagr': cagr,
+        'volatility': np.sqrt(variance * TRADING_DAYS),
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=0),
+        'exposure': (held != 0).sum(axis=0) / bars,
+        'trades': n_trades,
+        'win_rate': np.divide(wins, n_trades, out=np.full(len(tickers), np.nan),
+                              where=n_trades > 0),
+    }, index=pd.Index(tickers, name='Ticker'))
+
+
+def _backtest_block(panels, rsi_max, macd_confirm, short, cost):
+    # Signals and backtest of one block of tickers
+    bullish, bearish = detect_ema_crossovers(panels)
+    return run_backtest(panels['Close'], bullish, bearish,
+                        rsi=panels['RSI_14'], macd_hist=panels['MACD_Hist'],
+                        rsi_max=rsi_max, macd_confirm=macd_confirm,
+                        short=short, cost=cost)
+
+
+def _combine_blocks(blocks, close):
+    """
+    Join the results of blocks of tickers into one run_backtest result
+
+    Everything but the portfolio is per ticker; the portfolio is
+    recalculated over all tickers.
+    """
+    result = {name: pd.concat([block[name] for block in blocks], axis=1)
+              for name in ('positions', 'returns', 'equity', 'drawdown')}
+    result['trades'] = pd.concat([block['trades'] for block in blocks], ignore_index=True)
+    result['stats'] = pd.concat([block['stats'] for block in blocks])
+    active = np.maximum.accumulate(~np.isnan(close.to_numpy(dtype=float)), axis=0)
+    result['portfolio'] = _portfolio(result['returns'].to_numpy(), active, close.index)
+    return result
+
+
+def backtest_universe(data_dir='stock_data', tickers=None, rsi_max=None,
+                      macd_confirm=False, short=False, cost=0.0, workers=1):
+    """
+    Backtest the EMA 12/26 crossover signals of every ticker in a data
+    directory
+
+    With workers > 1 the panels are loaded once into a shared_panel and
+    blocks of tickers are backtested in worker processes that map it; the
+    result is the same as in a single process.
+
+    Parameters:
+    - data_dir: Directory containing ticker data (with indicator columns)
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - rsi_max, macd_confirm, short, cost: See run_backtest
+    - workers: Number of worker processes
+
+    Returns:
+    - Result dict of run_backtest
+    """
+    args = (rsi_max, macd_confirm, short, cost)
+    if workers <= 1:
+        return _backtest_block(load_panels(data_dir, BACKTEST_COLUMNS, tickers), *args)
+
+    with load_shared_panels(data_dir, BACKTEST_COLUMNS, tickers) as shared:
+        chunk = -(-len(shared.tickers) // workers)
+        blocks = map_blocks(_backtest_block, shared, BACKTEST_COLUMNS, args=args,
+                            workers=workers, chunk_tickers=chunk)
+        return _combine_blocks(blocks, shared.frame('Close'))
+
+
+# Example usage
+if __name__ == "__main__":
+    # python backtest.py --cost-bps 5 --rsi-max 70 --trades signals/trades.csv
+    parser = argparse.ArgumentParser(description="Backtest the EMA crossover signals of all tickers")
+    parser.add_argument("--data-dir", default="stock_data")
+    parser.add_argument("--cost-bps", type=float, default=0.0)
+    parser.add_argument("--rsi-max", type=float)
+    parser.add_argument("--macd-confirm", action="store_true")
+    parser.add_argument("--short", action="store_true")
+    parser.add_argument("--trades", help="CSV file to save the trade list to")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    result = backtest_universe(args.data_dir, rsi_max=args.rsi_max,
+                               macd_confirm=args.macd_confirm, short=args.short,
+                               cost=args.cost_bps / 10000, workers=args.workers)
+
+    pd.set_option('display.width', 120)
+    print(result['stats'].round(3))
+    portfolio = result['portfolio']
+    print(f"\nPortfolio: total return {portfolio['equity'].iloc[-1] - 1:.1%}, "
+          f"max drawdown {portfolio['drawdown'].min():.1%}, "
+          f"{len(result['trades'])} trades")
+
+    if args.trades:
+        os.makedirs(os.path.dirname(args.trades) or ".", exist_ok=True)
+        result['trades'].to_csv(args.trades, index=False)
+        print(f"✓ Trades saved to {args.trades}")
@@ -0,0 +1,351 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from ema_calc import calculate_ema
+from macd_calc import calculate_macd
+from rsi_calc import calculate_rsi
+from indicators_main import calculate_all_indicators
+from load_data import store_ticker_data
+from storage import last_date, ticker_path, write_frame
+
+# ---------------------------
+# Benchmarks of the hot paths
+# ---------------------------
+# Every case runs one function over a synthetic universe of N tickers with
+# `years` of daily bars and reports the best wall time of `repeat` runs and
+# the peak traced memory of one run. Results are saved as JSON so a later
+# run can be compared against them (--baseline).
+#
+# A universe cycles through POOL_SIZE distinct synthetic histories, so a
+# 10,000-ticker run costs 10,000 calls without holding 10,000 histories in
+# memory or on disk. Chart rendering is capped at RENDER_LIMIT tickers.
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+POOL_SIZE = 100
+RENDER_LIMIT = 20
+CASES = [
+    'calculate_ema',
+    'calculate_macd',
+    'calculate_rsi',
+    'load_stock_csv',
+    'detect_ema_crossovers',
+    'load_data_merge',
+    'render_signal_chart',
+]
+
+
+def make_history(ticker, years=10, seed=0):
+    """
+    Generate a random-walk daily OHLCV history in the yfinance layout
+
+    Parameters:
+    - ticker: Ticker symbol
+    - years: Number of years of business days
+    - seed: Random seed
+
+    Returns:
+    - DataFrame with DatetimeIndex 'Date' and (Price, Ticker) columns
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-12-31', periods=years * 252, name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+    spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+
+    df = pd.DataFrame({
+        'Close': close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Open': close + rng.normal(0, 0.005, len(dates)) * close,
+        'Volume': rng.integers(1_000_000, 100_000_000, len(dates)),
+    }, index=dates)
+    df.columns = pd.MultiIndex.from_product([df.columns, [ticker]], names=['Price', 'Ticker'])
+    return df
+
+
+def make_pool(n_tickers, years=10):
+    """
+    Generate the distinct histories a universe of n_tickers cycles through
+
+    Returns:
+    - List of (ticker, DataFrame) tuples
+    """
+    return [(f'T{i:05d}', make_history(f'T{i:05d}', years, seed=i))
+            for i in range(min(n_tickers, POOL_SIZE))]
+
+
+def _quiet(func, *args, **kwargs):
+    # The pipeline functions print progress; keep it out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def _with_indicators(pool):
+    return [(ticker, _quiet(calculate_all_indicators, df.copy(), ('Close', ticker), ticker))
+            for ticker, df in pool]
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+# Each case prepares its inputs and returns run(), which performs the
+# workload for n tickers and returns the seconds spent in the benchmarked
+# function (setup such as resetting files is not counted).
+
+def case_calculate_ema(pool, n, work_dir):
+    def run():
+        start = time.perf_counter()
+        for i in range(n):
+            ticker, df = pool[i % len(pool)]
+            calculate_ema(df, ('Close', ticker), 12)
+        return time.perf_counter() - start
+    return run, n
+
+
+def case_calculate_macd(pool, n, work_dir):
+    def run():
+        start = time.perf_counter()
+        for i in range(n):
+            ticker, df = pool[i % len(pool)]
+            calculate_macd(df, ('Close', ticker))
+        return time.perf_counter() - start
+    return run, n
+
+
+def case_calculate_rsi(pool, n, work_dir):
+    def run():
+        start = time.perf_counter()
+        for i in range(n):
+            ticker, df = pool[i % len(pool)]
+            calculate_rsi(df, ('Close', ticker))
+        return time.perf_counter() - start
+    return run, n
+
+
+def case_load_stock_csv(pool, n, work_dir):
+    from generate_signals import load_stock_csv
+
+    paths = []
+    for ticker, df in _with_indicators(pool):
+        paths.append(ticker_path(work_dir, ticker))
+        write_frame(df, paths[-1])
+
+    def run():
+        start = time.perf_counter()
+        for i in range(n):
+            load_stock_csv(paths[i % len(paths)])
+        return time.perf_counter() - start
+    return run, n
+
+
+def case_detect_ema_crossovers(pool, n, work_dir):
+    from signal_calc import detect_ema_crossovers
+
+    frames = []
+    for ticker, df in _with_indicators(pool):
+        flat = df.copy()
+        flat.columns = flat.columns.get_level_values(0)
+        frames.append(flat.reset_index())
+
+    def run():
+        start = time.perf_counter()
+        for i in range(n):
+            detect_ema_crossovers(frames[i % len(frames)])
+        return time.perf_counter() - start
+    return run, n
+
+
+def case_load_data_merge(pool, n, work_dir):
+    # Daily updates: every pass over the pool merges the next bar into each
+    # history, as consecutive refreshes would (including compactions)
+    days = -(-n // len(pool))
+
+    def run():
+        for ticker, df in pool:
+            write_frame(df.iloc[:-days], ticker_path(work_dir, ticker))
+
+        start = time.perf_counter()
+        for i in range(n):
+            ticker, df = pool[i % len(pool)]
+            row = len(df) - days + i // len(pool)
+            path = ticker_path(work_dir, ticker)
+            _quiet(store_ticker_data, ticker, df.iloc[row:row + 1], last_date(path), path)
+        return time.perf_counter() - start
+    return run, n
+
+
+def case_render_signal_chart(pool, n, work_dir):
+    from generate_signals import (LOOKBACK_DAYS, detect_ema_crossovers,
+                                  determine_latest_signal, render_signal_chart)
+
+    charts = []
+    for ticker, df in _with_indicators(pool[:RENDER_LIMIT]):
+        flat = df.copy()
+        flat.columns = flat.columns.get_level_values(0)
+        flat = flat.reset_index().rename(columns={'MACD_Hist': 'MACD_Histogram'})
+        flat = flat[flat['Date'] >= flat['Date'].max() - pd.Timedelta(days=LOOKBACK_DAYS)]
+        bullish, bearish = detect_ema_crossovers(flat)
+        charts.append((ticker, flat, bullish, bearish,
+                       determine_latest_signal(flat, bullish, bearish)))
+
+    count = min(n, RENDER_LIMIT)
+
+    def run():
+        start = time.perf_counter()
+        for i in range(count):
+            ticker, flat, bullish, bearish, signal = charts[i % len(charts)]
+            render_signal_chart(ticker, flat, bullish, bearish, signal,
+                                os.path.join(work_dir, f'{ticker}.png'))
+        return time.perf_counter() - start
+    return run, count
+
+
+# ---------------------------
+# Runner
+# ---------------------------
+
+def measure(run, repeat=3):
+    """
+    Time a workload and trace its peak memory
+
+    Parameters:
+    - run: Callable returning the seconds spent in the benchmarked code
+    - repeat: Number of timed runs; the best one is reported
+
+    Returns:
+    - Tuple of (best seconds, peak traced memory in MB)
+    """
+    seconds = min(run() for _ in range(repeat))
+
+    # Separate run: tracing slows allocation-heavy code down
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak / 1e6
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cases=CASES, years=10, repeat=3):
+    """
+    Run the benchmark cases over universes of the given sizes
+
+    Parameters:
+    - sizes: List of universe sizes (number of tickers)
+    - cases: List of case names (see CASES)
+    - years: Years of daily bars per ticker
+    - repeat: Number of timed runs per case
+
+    Returns:
+    - Results dict (see save_results)
+    """
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'years': years,
+            'repeat': repeat,
+        },
+        'results': [],
+    }
+
+    for size in sizes:
+        pool = make_pool(size, years)
+        print(f"Universe: {size} tickers x {years} years")
+
+        for name in cases:
+            work_dir = tempfile.mkdtemp(prefix='siqrs_bench_')
+            try:
+                run, items = globals()[f'case_{name}'](pool, size, work_dir)
+                seconds, peak_mb = measure(run, repeat)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+            results['results'].append({
+                'case': name,
+                'tickers': size,
+                'items': items,
+                'seconds': seconds,
+                'per_item_ms': 1000 * seconds / items,
+                'peak_mb': peak_mb,
+            })
+            print(f"  ✓ {name:<24} {items:>6} items  {seconds:9.3f}s  "
+                  f"{1000 * seconds / items:8.3f} ms/item  {peak_mb:9.1f} MB peak")
+
+    return results
+
+
+def save_results(results, path):
+    """
+    Save benchmark results as JSON
+
+    The file holds 'meta' (date, versions, machine, settings) and
+    'results', a list of {case, tickers, items, seconds, per_item_ms, peak_mb}.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {path}")
+
+
+def compare_results(results, baseline):
+    """
+    Print each case's time and memory relative to a baseline run
+
+    Ratios below 1.0 mean the current run is faster / uses less memory.
+
+    Returns:
+    - List of {case, tickers, time_ratio, memory_ratio} dicts
+    """
+    previous = {(r['case'], r['tickers']): r for r in baseline['results']}
+    comparison = []
+
+    print("\nComparison with baseline (current / baseline):")
+    for r in results['results']:
+        base = previous.get((r['case'], r['tickers']))
+        if base is None:
+            continue
+        time_ratio = r['per_item_ms'] / base['per_item_ms']
+        memory_ratio = r['peak_mb'] / base['peak_mb'] if base['peak_mb'] else float('nan')
+        comparison.append({'case': r['case'], 'tickers': r['tickers'],
+                           'time_ratio': time_ratio, 'memory_ratio': memory_ratio})
+        print(f"  {r['case']:<24} {r['tickers']:>6} tickers  "
+              f"time x{time_ratio:5.2f}  memory x{memory_ratio:5.2f}")
+
+    return comparison
+
+
+# Example usage
+if __name__ == "__main__":
+    # python benchmark.py --sizes 10 100 --output benchmarks/latest.json
+    # python benchmark.py --baseline benchmarks/baseline.json
+    parser = argparse.ArgumentParser(description="Benchmark the indicator, loading and signal hot paths")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--cases', nargs='+', default=CASES, choices=CASES)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmarks/latest.json')
+    parser.add_argument('--baseline', help="Results JSON to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.cases, args.years, args.repeat)
+    save_results(results, args.output)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            compare_results(results, json.load(f))
@@ -0,0 +1,193 @@
+import argparse
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from rsi_calc import calculate_rsi
+from signal_calc import detect_ema_crossovers
+
+# ---------------------------
+# Out-of-core indicator calculation
+# ---------------------------
+# For histories too long to load at once (e.g. years of 1-minute bars) the
+# input CSV is read in fixed-size chunks. Indicator state is carried from
+# one chunk to the next and every chunk is appended to the output file as
+# soon as it is calculated, so memory depends on the chunk size only.
+#
+# Carried state:
+# - EMA: the last value plus any trailing missing inputs, which replays
+#   pandas' ewm(adjust=False) exactly when prepended to the next chunk
+# - RSI: the last `period` closes, i.e. the rolling window
+# - Crossovers: the last EMA_12 / EMA_26 pair
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _ewm_chunk(tail, values, span):
+    """
+    EMA of a chunk, continuing from the tail of the previous chunk
+
+    Returns:
+    - Tuple of (EMA values of the chunk, tail for the next chunk)
+    """
+    seeded = np.concatenate([tail, values])
+    ema = pd.Series(seeded).ewm(span=span, adjust=False).mean().to_numpy()
+
+    observed = np.flatnonzero(~np.isnan(seeded))
+    if len(observed) == 0:
+        next_tail = seeded[:0]
+    else:
+        last = observed[-1]
+        next_tail = np.concatenate([ema[last:last + 1], seeded[last + 1:]])
+
+    return ema[len(tail):], next_tail
+
+
+def _read_header(input_csv):
+    """
+    Read the column names, ticker and index name of a stock CSV file
+    """
+    with open(input_csv, 'r') as f:
+        lines = [f.readline().rstrip('\r\n').split(',') for _ in range(3)]
+
+    # Multi-header files carry a 'Ticker' row and usually a 'Date' row
+    if lines[1][0] != 'Ticker':
+        header_rows = 1
+    else:
+        header_rows = 3 if len(lines[2]) > 1 and not any(lines[2][1:]) else 2
+
+    names = lines[0][1:]
+    if header_rows > 1:
+        ticker = lines[1][1]
+        index_name = lines[2][0] if header_rows == 3 else 'Datetime'
+    else:
+        ticker = os.path.splitext(os.path.basename(input_csv))[0]
+        index_name = lines[0][0] or 'Datetime'
+    return header_rows, names, ticker, index_name
+
+
+def process_csv_chunked(input_csv, output_csv=None, chunksize=DEFAULT_CHUNKSIZE,
+                        ema_periods=[12, 26, 50, 200], macd_fast=12, macd_slow=26,
+                        macd_signal=9, rsi_period=14):
+    """
+    Calculate EMA, MACD, RSI and EMA 12/26 crossovers of a long price history
+    chunk by chunk
+
+    The output has the input columns plus EMA_{period}, MACD, MACD_Signal,
+    MACD_Hist, RSI_{period} and Bullish_Cross / Bearish_Cross flags, in the
+    same multi-header layout as stock_data. It is written to a temporary
+    file and moved into place when complete.
+
+    Parameters:
+    - input_csv: Path to the price CSV (stock_data layout or a plain CSV
+      with a Close column)
+    - output_csv: Path of the output CSV (default: <input>_indicators.csv)
+    - chunksize: Number of rows per chunk
+    - ema_periods: List of EMA periods to calculate
+    - macd_fast: MACD fast EMA period
+    - macd_slow: MACD slow EMA period
+    - macd_signal: MACD signal line period
+    - rsi_period: RSI period
+
+    Returns:
+    - Dict with rows, chunks, latest_signal and last_cross, or None on error
+    """
+    if output_csv is None:
+        output_csv = os.path.splitext(input_csv)[0] + '_indicators.csv'
+    tmp_csv = f'{output_csv}.{os.getpid()}.{uuid.uuid4().hex[:12]}.tmp'
+
+    try:
+        print(f"Processing {os.path.basename(input_csv)} in chunks of {chunksize} rows...")
+        header_rows, names, ticker, index_name = _read_header(input_csv)
+        close_name = 'Close' if 'Close' in names else names[0]
+
+        # State carried across chunk boundaries
+        ema_periods = list(ema_periods)
+        macd_periods = [p for p in (macd_fast, macd_slow) if p not in ema_periods]
+        ema_tails = {p: np.empty(0) for p in ema_periods + macd_periods}
+        signal_tail = np.empty(0)
+        rsi_window = np.empty(0)
+        last_cross_pair = (np.nan, np.nan)
+        has_crossovers = 12 in ema_periods and 26 in ema_periods
+
+        summary = {'rows': 0, 'chunks': 0, 'latest_signal': 'Neutral', 'last_cross': None}
+
+        reader = pd.read_csv(input_csv, header=None, skiprows=header_rows,
+                             names=[index_name] + names, index_col=0, dtype={index_name: str},
+                             float_precision='round_trip', chunksize=chunksize)
+
+        with open(tmp_csv, 'w') as out:
+            for chunk in reader:
+                close = chunk[close_name].to_numpy(dtype=float)
+
+                # EMA
+                emas = {}
+                for period in ema_tails:
+                    emas[period], ema_tails[period] = _ewm_chunk(ema_tails[period], close, period)
+                for period in ema_periods:
+                    chunk[f'EMA_{period}'] = emas[period]
+
+                # MACD
+                macd = emas[macd_fast] - emas[macd_slow]
+                signal_line, signal_tail = _ewm_chunk(signal_tail, macd, macd_signal)
+                chunk['MACD'] = macd
+                chunk['MACD_Signal'] = signal_line
+                chunk['MACD_Hist'] = macd - signal_line
+
+                # RSI over the carried window plus the chunk
+                window = pd.DataFrame({'Close': np.concatenate([rsi_window, close])})
+                rsi = calculate_rsi(window, 'Close', rsi_period).to_numpy()
+                chunk[f'RSI_{rsi_period}'] = rsi[len(rsi_window):]
+                rsi_window = window['Close'].to_numpy()[-rsi_period:]
+
+                # EMA 12/26 crossovers, continuing from the previous row
+                if has_crossovers:
+                    frame = {
+                        'EMA_12': pd.Series(np.concatenate([[last_cross_pair[0]], emas[12]])),
+                        'EMA_26': pd.Series(np.concatenate([[last_cross_pair[1]], emas[26]])),
+                    }
+                    bullish, bearish = detect_ema_crossovers(frame)
+                    bullish, bearish = bullish.to_numpy()[1:], bearish.to_numpy()[1:]
+                    chunk['Bullish_Cross'] = bullish.astype(int)
+                    chunk['Bearish_Cross'] = bearish.astype(int)
+                    last_cross_pair = (emas[12][-1], emas[26][-1])
+
+                    crosses = np.flatnonzero(bullish | bearish)
+                    if len(crosses):
+                        last = crosses[-1]
+                        summary['latest_signal'] = 'Bullish' if bullish[last] else 'Bearish'
+                        summary['last_cross'] = chunk.index[last]
+
+                # Write the header once, then append every chunk
+                if summary['chunks'] == 0:
+                    columns = list(chunk.columns)
+                    out.write(','.join(['Price'] + columns) + '\n')
+                    out.write(','.join(['Ticker'] + [ticker] * len(columns)) + '\n')
+                    out.write(index_name + ',' * len(columns) + '\n')
+                chunk.to_csv(out, header=False)
+
+                summary['rows'] += len(chunk)
+                summary['chunks'] += 1
+                print(f"  ✓ chunk {summary['chunks']}: {summary['rows']} rows")
+
+        os.replace(tmp_csv, output_csv)
+        print(f"✓ {os.path.basename(input_csv)}: {summary['rows']} rows saved to {output_csv}\n")
+        return summary
+
+    except Exception as e:
+        if os.path.exists(tmp_csv):
+            os.remove(tmp_csv)
+        print(f"✗ Error processing {os.path.basename(input_csv)}: {str(e)}\n")
+        return None
+
+
+# Example usage
+if __name__ == "__main__":
+    # python chunked_calc.py minute_data/SPY.csv --chunksize 200000
+    parser = argparse.ArgumentParser(description="Calculate indicators of a long price history chunk by chunk")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_csv", nargs="?")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    process_csv_chunked(args.input_csv, args.output_csv, args.chunksize)
@@ -1,5 +1,7 @@
 import pandas as pd
 import os
+import metrics
+from storage import read_frame, write_frame
 
 def calculate_ema(df, column, period):
     """
@@ -26,32 +28,36 @@ def add_ema_to_file(csv_file, periods=[12, 26, 50, 200]):
     Returns:
     - DataFrame with EMA columns added
     """
-    try:
-        print(f"Calculating EMA for {os.path.basename(csv_file)}...")
+    ticker = os.path.splitext(os.path.basename(csv_file))[0]
+    with metrics.stage('ema', ticker) as record:
+        try:
+            print(f"Calculating EMA for {os.path.basename(csv_file)}...")
         
-        # Read the CSV file
-        df = pd.read_csv(csv_file, header=[0, 1], index_col=0, parse_dates=True)
+            # Read the ticker data
+            df = read_frame(csv_file)
         
-        # Get the ticker symbol
-        ticker = df.columns[0][1]
+            # Get the ticker symbol
+            ticker = df.columns[0][1]
         
-        # Access the Close price column
-        close_col = ('Price', ticker) if 'Price' in df.columns.levels[0] else ('Close', ticker)
+            # Access the Close price column
+            close_col = ('Price', ticker) if 'Price' in df.columns.levels[0] else ('Close', ticker)
         
-        # Calculate EMAs for each period
-        for period in periods:
-            df[(f'EMA_{period}', ticker)] = calculate_ema(df, close_col, period)
-            print(f"  ✓ EMA_{period} calculated")
+            # Calculate EMAs for each period
+            for period in periods:
+                df[(f'EMA_{period}', ticker)] = calculate_ema(df, close_col, period)
+                print(f"  ✓ EMA_{period} calculated")
         
-        # Save back to the same file
-        df.to_csv(csv_file)
-        print(f"✓ {os.path.basename(csv_file)}: EMA indicators saved\n")
+            # Save back to the same file
+            write_frame(df, csv_file)
+            print(f"✓ {os.path.basename(csv_file)}: EMA indicators saved\n")
         
-        return df
+            record['rows'] = len(df)
+            return df
         
-    except Exception as e:
-        print(f"✗ Error processing {os.path.basename(csv_file)}: {str(e)}\n")
-        return None
+        except Exception as e:
+            record['ok'] = False
+            print(f"✗ Error processing {os.path.basename(csv_file)}: {str(e)}\n")
+            return None
 
 # Example usage
 if __name__ == "__main__":
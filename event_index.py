@@ -0,0 +1,353 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from storage import (list_tickers, read_arrays, read_tail, replace_file, stat_signature,
+                     ticker_path)
+
+# ---------------------------
+# Signal event index
+# ---------------------------
+# Every crossover event of every ticker over its whole history, in one
+# table sorted by date and ticker:
+# - ema_12_26:   EMA 12 crossing EMA 26 (the generate_signals signal)
+# - ema_50_200:  EMA 50 crossing EMA 200 (bullish = golden cross,
+#                bearish = death cross)
+# - macd_zero:   MACD crossing zero
+# - macd_signal: MACD crossing its signal line
+# - rsi_70:      RSI 14 entering (crossing above) or exiting 70
+# - rsi_30:      RSI 14 entering (crossing below) or exiting 30
+#
+# A cross uses the same rule as signal_calc.detect_ema_crossovers: the
+# difference turns positive from <= 0, or negative from >= 0.
+#
+# The index lives in <data_dir>/.event_index/: events.npz holds the table
+# and state.json the stat signature, last date and last indicator row of
+# every ticker. An update only looks at tickers whose signature changed
+# and reads just the rows after the recorded last date (plus that row, the
+# "previous" row of the first new one). When the recorded row no longer
+# matches the data (history rewritten, indicators recalculated) the
+# ticker's events are rebuilt from its full history.
+#
+# Queries binary-search the date column, so "bullish crosses in the last
+# 5 days" only touches the events of those days.
+
+STOCK_DATA_DIR = 'stock_data'
+INDEX_DIR_NAME = '.event_index'
+TAIL_ROWS = 16
+
+# name -> (column, column or level it crosses, label of an upward cross,
+# label of a downward cross)
+EVENTS = {
+    'ema_12_26': ('EMA_12', 'EMA_26', 'bullish', 'bearish'),
+    'ema_50_200': ('EMA_50', 'EMA_200', 'bullish', 'bearish'),
+    'macd_zero': ('MACD', 0.0, 'bullish', 'bearish'),
+    'macd_signal': ('MACD', 'MACD_Signal', 'bullish', 'bearish'),
+    'rsi_70': ('RSI_14', 70.0, 'enter', 'exit'),
+    'rsi_30': ('RSI_14', 30.0, 'exit', 'enter'),
+}
+EVENT_NAMES = list(EVENTS)
+COLUMNS = sorted({column for a, b, *_ in EVENTS.values() for column in (a, b)
+                  if isinstance(column, str)})
+FIELDS = ['date', 'ticker', 'event', 'direction']
+
+
+def detect_events(arrays):
+    """
+    Find every event in a ticker's indicator arrays
+
+    Parameters:
+    - arrays: Dict of column -> float array (see COLUMNS), one row per bar
+
+    Returns:
+    - Tuple of (rows, event codes, directions) arrays sorted by row; the
+      event code indexes EVENT_NAMES, direction is 1 for an upward cross
+      and -1 for a downward one
+    """
+    rows, codes, directions = [], [], []
+    for code, (a, b, _, _) in enumerate(EVENTS.values()):
+        level = arrays[b] if isinstance(b, str) else b
+        diff = np.asarray(arrays[a], dtype=float) - np.asarray(level, dtype=float)
+        prev_diff = np.concatenate([[np.nan], diff[:-1]])
+        for direction, mask in ((1, (diff > 0) & (prev_diff <= 0)),
+                                (-1, (diff < 0) & (prev_diff >= 0))):
+            found = np.flatnonzero(mask)
+            rows.append(found)
+            codes.append(np.full(len(found), code, dtype=np.int8))
+            directions.append(np.full(len(found), direction, dtype=np.int8))
+
+    rows = np.concatenate(rows)
+    order = np.argsort(rows, kind='stable')
+    return rows[order], np.concatenate(codes)[order], np.concatenate(directions)[order]
+
+
+def _last_row(path):
+    # Indicator values of the last bar, parsed the way read_tail parses them
+    index, arrays = read_tail(path, 1, COLUMNS)
+    return str(index[-1])[:10], {name: float(arrays[name][-1]) for name in COLUMNS}
+
+
+def _empty_events():
+    return {
+        'date': np.array([], dtype='datetime64[ns]'),
+        'ticker': np.array([], dtype='<U16'),
+        'event': np.array([], dtype=np.int8),
+        'direction': np.array([], dtype=np.int8),
+    }
+
+
+class EventIndex:
+    """
+    Persistent, incrementally updated index of signal events
+
+    Parameters:
+    - data_dir: Directory containing ticker data (with indicator columns)
+    - rebuild: Ignore the saved index; the next update() indexes every
+      ticker from its full history
+    """
+
+    def __init__(self, data_dir=STOCK_DATA_DIR, rebuild=False):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, INDEX_DIR_NAME)
+        self.state = {}
+        self.events = _empty_events()
+        if not rebuild:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.path, 'state.json'), 'r') as f:
+                state = json.load(f)
+            with np.load(os.path.join(self.path, 'events.npz')) as data:
+                events = {name: data[name] for name in FIELDS}
+        except (OSError, ValueError, KeyError):
+            return
+        self.state, self.events = state, events
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        # Written through a file handle: np.savez would add .npz to the
+        # temporary name
+        def dump_events(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **self.events)
+        replace_file(os.path.join(self.path, 'events.npz'), dump_events)
+
+        # The state is written last: a crash in between only causes tickers
+        # to be rebuilt on the next update
+        def dump_state(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f)
+        replace_file(os.path.join(self.path, 'state.json'), dump_state)
+
+    def _new_events(self, ticker, entry):
+        """
+        Events of a ticker not in the index yet
+
+        Returns:
+        - Tuple of (index dates, rows, codes, directions, True if the
+          ticker's indexed events must be replaced rather than extended)
+        """
+        path = ticker_path(self.data_dir, ticker)
+        if entry is not None:
+            last_date = np.datetime64(entry['last_date'])
+            rows = TAIL_ROWS
+            while True:
+                index, arrays = read_tail(path, rows, COLUMNS)
+                if len(index) < rows or index[0] <= last_date:
+                    break
+                rows *= 4
+
+            position = np.flatnonzero(index == last_date)
+            if len(position) and len(arrays) == len(COLUMNS):
+                start = position[0]
+                recorded = np.array([entry['last_row'][name] for name in COLUMNS])
+                current = np.array([arrays[name][start] for name in COLUMNS])
+                if np.array_equal(recorded, current, equal_nan=True):
+                    tail = {name: values[start:] for name, values in arrays.items()}
+                    found, codes, directions = detect_events(tail)
+                    new = found > 0
+                    return index[start:], found[new], codes[new], directions[new], False
+
+        index, arrays = read_arrays(path, COLUMNS)
+        missing = [name for name in COLUMNS if name not in arrays]
+        if missing:
+            raise KeyError(f"missing indicator columns {', '.join(missing)}")
+        found, codes, directions = detect_events(arrays)
+        return np.asarray(index), found, codes, directions, True
+
+    def update(self, tickers=None):
+        """
+        Bring the index up to date with the stored data and save it
+
+        Parameters:
+        - tickers: Optional list of tickers (default: all tickers in
+          data_dir; indexed tickers that are no longer stored are dropped)
+
+        Returns:
+        - Dict of ticker -> number of events added, for updated tickers
+        """
+        all_tickers = tickers is None
+        if all_tickers:
+            tickers = list_tickers(self.data_dir)
+
+        added = {}
+        replace = set()
+        parts = []
+        for ticker in tickers:
+            path = ticker_path(self.data_dir, ticker)
+            try:
+                signature = stat_signature(path)
+                entry = self.state.get(ticker)
+                if entry is not None and entry['signature'] == signature:
+                    continue
+
+                dates, found, codes, directions, rebuilt = self._new_events(ticker, entry)
+                last_date, last_row = _last_row(path)
+            except Exception as e:
+                print(f"✗ {ticker}: Error - {str(e)}", file=sys.stderr)
+                continue
+
+            if rebuilt:
+                replace.add(ticker)
+            parts.append({
+                'date': dates[found].astype('datetime64[ns]'),
+                'ticker': np.full(len(found), ticker, dtype='<U16'),
+                'event': codes,
+                'direction': directions,
+            })
+            self.state[ticker] = {'signature': signature, 'last_date': last_date,
+                                  'last_row': last_row}
+            added[ticker] = len(found)
+
+        if all_tickers:
+            removed = set(self.state) - set(tickers)
+            for ticker in removed:
+                del self.state[ticker]
+            replace |= removed
+
+        if not added and not replace:
+            return added
+
+        keep = ~np.isin(self.events['ticker'], list(replace))
+        events = {name: np.concatenate([self.events[name][keep]] + [p[name] for p in parts])
+                  for name in FIELDS}
+        order = np.lexsort((events['ticker'], events['date']))
+        self.events = {name: values[order] for name, values in events.items()}
+        self.save()
+        return added
+
+    def query(self, events=None, direction=None, tickers=None, start=None, end=None):
+        """
+        Look up events
+
+        Parameters:
+        - events: Optional event name or list of names (see EVENTS)
+        - direction: Optional 'bullish', 'bearish', 'enter' or 'exit'
+        - tickers: Optional list of tickers
+        - start, end: Optional inclusive date bounds
+
+        Returns:
+        - DataFrame with date, ticker, event and direction columns, sorted
+          by date and ticker
+        """
+        dates = self.events['date']
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), 'left')
+        hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), 'right')
+        selected = {name: values[lo:hi] for name, values in self.events.items()}
+
+        mask = np.ones(hi - lo, dtype=bool)
+        if events is not None:
+            events = [events] if isinstance(events, str) else events
+            unknown = [e for e in events if e not in EVENTS]
+            if unknown:
+                raise ValueError(f"Unknown events: {', '.join(unknown)}")
+            mask &= np.isin(selected['event'], [EVENT_NAMES.index(e) for e in events])
+        if tickers is not None:
+            mask &= np.isin(selected['ticker'], list(tickers))
+
+        # Direction labels depend on the event
+        up_labels = np.array([up for _, _, up, _ in EVENTS.values()])
+        down_labels = np.array([down for _, _, _, down in EVENTS.values()])
+        codes = selected['event'].astype(int)
+        labels = np.where(selected['direction'] > 0, up_labels[codes], down_labels[codes])
+        if direction is not None:
+            mask &= labels == direction
+
+        return pd.DataFrame({
+            'date': selected['date'][mask],
+            'ticker': selected['ticker'][mask],
+            'event': np.array(EVENT_NAMES)[codes[mask]],
+            'direction': labels[mask],
+        })
+
+    def recent(self, days, events=None, direction=None, tickers=None, as_of=None):
+        """
+        Events of the last days calendar days up to as_of (default: today)
+        """
+        end = pd.Timestamp.today().normalize() if as_of is None else pd.Timestamp(as_of)
+        start = end - pd.Timedelta(days=days - 1)
+        return self.query(events, direction, tickers, start, end)
+
+
+def update_index(data_dir=STOCK_DATA_DIR, tickers=None):
+    """
+    Update the event index of a data directory and report it
+
+    Returns:
+    - The EventIndex
+    """
+    index = EventIndex(data_dir)
+    added = index.update(tickers)
+    print(f"✓ Event index: {len(index.events['date'])} events, "
+          f"{len(added)} tickers updated ({sum(added.values())} events indexed)", file=sys.stderr)
+    return index
+
+
+def write_events(events, output=None, fmt='json'):
+    """
+    Write query results as JSON or CSV
+
+    Parameters:
+    - events: DataFrame from EventIndex.query()
+    - output: File path (default: stdout)
+    - fmt: 'json' or 'csv'
+    """
+    events = events.assign(date=events['date'].dt.strftime('%Y-%m-%d'))
+    f = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        if fmt == 'csv':
+            events.to_csv(f, index=False)
+        else:
+            json.dump(events.to_dict(orient='records'), f, indent=2)
+            f.write('\n')
+    finally:
+        if output:
+            f.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    # python event_index.py --days 5 --event ema_12_26 --direction bullish
+    # python event_index.py --event ema_50_200 --direction bullish --since 2020-01-01
+    parser = argparse.ArgumentParser(description="Update and query the signal event index")
+    parser.add_argument("tickers", nargs="*", help="Tickers (default: all)")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--event", nargs="+", choices=EVENT_NAMES)
+    parser.add_argument("--direction", choices=["bullish", "bearish", "enter", "exit"])
+    parser.add_argument("--days", type=int, help="Only the last N calendar days")
+    parser.add_argument("--since", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    index = update_index(args.data_dir)
+    tickers = args.tickers or None
+    if args.days:
+        events = index.recent(args.days, args.event, args.direction, tickers, as_of=args.until)
+    else:
+        events = index.query(args.event, args.direction, tickers, args.since, args.until)
+    write_events(events, args.output, args.format)
@@ -1,7 +1,12 @@
+import argparse
 import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import metrics
+from signal_calc import detect_ema_crossovers, determine_latest_signal
+from storage import fingerprint, list_tickers, read_frame, replace_file, ticker_path
 
 
 # ---------------------------
@@ -10,153 +15,232 @@ import matplotlib.dates as mdates
 STOCK_DATA_DIR = "stock_data"
 SIGNALS_DIR = "signals"
 LOOKBACK_DAYS = 365
+DPI = 150
 
+# Records, per ticker, what its PNG was rendered from
+RENDER_MANIFEST = ".render_manifest.json"
+RENDER_MANIFEST_THUMB = ".render_manifest_thumb.json"
 
-os.makedirs(SIGNALS_DIR, exist_ok=True)
+# Downsample lines to this many points once a chart has more bars
+MAX_POINTS = 1000
+
+# Bump when the chart layout changes so every PNG is re-rendered once
+CHART_VERSION = 2
 
 
 # ---------------------------
-# Helper: Load & clean CSV
+# Helper: Load & clean ticker data
 # ---------------------------
 def load_stock_csv(filepath):
-    raw = pd.read_csv(filepath)
+    df = read_frame(filepath)
 
-    df = raw.iloc[2:].copy()
+    df.columns = df.columns.get_level_values(0)
+    df = df.astype(float).reset_index()
 
     df.rename(
         columns={
-            "Price": "Date",
             "MACD_Hist": "MACD_Histogram",
         },
         inplace=True,
     )
 
-    df["Date"] = pd.to_datetime(df["Date"])
-    numeric_cols = df.columns.drop("Date")
-    df[numeric_cols] = df[numeric_cols].astype(float)
-
     return df.sort_values("Date").reset_index(drop=True)
 
 
 # ---------------------------
-# EMA crossover detection
+# Plot
 # ---------------------------
-def detect_ema_crossovers(df):
-    diff = df["EMA_12"] - df["EMA_26"]
-    prev_diff = diff.shift(1)
+# One chart template per process; every ticker reuses its artists
+_chart = None
+
+
+def render_signal_chart(ticker, df, bullish, bearish, latest_signal, output_path, dpi=DPI,
+                        max_points=None, lookback_days=LOOKBACK_DAYS):
+    global _chart
+    if _chart is None:
+        # matplotlib is only imported once a chart has to be rendered
+        from signal_chart import SignalChart
+        _chart = SignalChart()
 
-    bullish = (diff > 0) & (prev_diff <= 0)
-    bearish = (diff < 0) & (prev_diff >= 0)
+    years = lookback_days / 365
+    if years == int(years):
+        period = f"Last {int(years)} Year{'s' if years > 1 else ''}"
+    else:
+        period = f"Last {lookback_days} Days"
 
-    return bullish, bearish
+    _chart.render(ticker, df, bullish, bearish, latest_signal, output_path,
+                  dpi=dpi, max_points=max_points, title_period=period)
 
 
 # ---------------------------
-# Main loop
+# Render manifest
 # ---------------------------
-today = pd.Timestamp.today().normalize()
-start_date = today - pd.Timedelta(days=LOOKBACK_DAYS)
+def load_render_manifest(signals_dir=SIGNALS_DIR, name=RENDER_MANIFEST):
+    path = os.path.join(signals_dir, name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_render_manifest(manifest, signals_dir=SIGNALS_DIR, name=RENDER_MANIFEST):
+    def dump(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    replace_file(os.path.join(signals_dir, name), dump)
+
+
+def plot_params_key(start_date, dpi=DPI, max_points=MAX_POINTS):
+    """Hash of everything besides the data that affects a rendered chart."""
+    params = {
+        "chart_version": CHART_VERSION,
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "dpi": dpi,
+        "max_points": max_points,
+    }
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
 
-for filename in os.listdir(STOCK_DATA_DIR):
-    if not filename.endswith(".csv"):
-        continue
 
-    ticker = filename.replace(".csv", "")
-    filepath = os.path.join(STOCK_DATA_DIR, filename)
+# ---------------------------
+# Per-ticker rendering stage
+# ---------------------------
+def process_ticker(ticker, start_date, previous=None, only_signal_changes=False,
+                   force=False, data_dir=STOCK_DATA_DIR, signals_dir=SIGNALS_DIR,
+                   dpi=DPI, max_points=MAX_POINTS, thumbnail=False):
+    """
+    Compute the latest signal of a ticker and render its chart if needed
+
+    The chart is skipped when the PNG exists and its manifest entry
+    (previous) was rendered from the same data and plot parameters. With
+    only_signal_changes, it is also skipped when the latest signal is the
+    same as the recorded one. Thumbnails are written at THUMBNAIL_DPI to
+    <TICKER>_signals_thumb.png.
+
+    Returns:
+    - Tuple of (ticker, manifest entry or None, status message)
+    """
+    filepath = ticker_path(data_dir, ticker)
+    suffix = "_thumb" if thumbnail else ""
+    output_path = os.path.join(signals_dir, f"{ticker}_signals{suffix}.png")
+    if thumbnail:
+        from signal_chart import THUMBNAIL_DPI
+        dpi = THUMBNAIL_DPI
+
+    entry = {
+        "data": fingerprint(filepath),
+        "params": plot_params_key(start_date, dpi, max_points),
+    }
+    have_png = os.path.exists(output_path)
+
+    if (not force and have_png and previous
+            and previous.get("data") == entry["data"]
+            and previous.get("params") == entry["params"]):
+        entry["signal"] = previous["signal"]
+        return ticker, entry, f"{ticker}: {entry['signal']} → unchanged, kept {output_path}"
 
     df = load_stock_csv(filepath)
     df = df[df["Date"] >= start_date]
 
     if df.empty:
-        continue
+        return ticker, None, None
 
     bullish, bearish = detect_ema_crossovers(df)
+    entry["signal"] = determine_latest_signal(df, bullish, bearish)
 
-    # Determine latest signal
-    latest_signal = "Neutral"
-    if bullish.any() or bearish.any():
-        last_bullish_date = df.loc[bullish, "Date"].max()
-        last_bearish_date = df.loc[bearish, "Date"].max()
-
-        if pd.notna(last_bullish_date) and (
-            pd.isna(last_bearish_date) or last_bullish_date > last_bearish_date
-        ):
-            latest_signal = "Bullish"
-        elif pd.notna(last_bearish_date):
-            latest_signal = "Bearish"
-
-    # ---------------------------
-    # Plot
-    # ---------------------------
-    fig, axes = plt.subplots(
-        3, 1, figsize=(14, 10), sharex=True,
-        gridspec_kw={"height_ratios": [3, 2, 2]},
-    )
+    if (not force and only_signal_changes and have_png and previous
+            and previous.get("signal") == entry["signal"]):
+        # Keep the old fingerprint so the chart is re-rendered on a full run
+        return ticker, dict(previous), f"{ticker}: {entry['signal']} → signal unchanged, kept {output_path}"
 
-    # === EMA + Price ===
-    axes[0].plot(df["Date"], df["Close"], label="Close", linewidth=2)
-    axes[0].plot(df["Date"], df["EMA_12"], label="EMA 12")
-    axes[0].plot(df["Date"], df["EMA_26"], label="EMA 26")
-    axes[0].plot(df["Date"], df["EMA_50"], label="EMA 50")
-    axes[0].plot(df["Date"], df["EMA_200"], label="EMA 200")
-
-    axes[0].scatter(
-        df.loc[bullish, "Date"],
-        df.loc[bullish, "Close"],
-        marker="^",
-        s=80,
-        label="Bullish EMA Cross",
-    )
+    lookback_days = (pd.Timestamp.today().normalize() - start_date).days
+    render_signal_chart(ticker, df, bullish, bearish, entry["signal"], output_path, dpi,
+                        max_points, lookback_days)
 
-    axes[0].scatter(
-        df.loc[bearish, "Date"],
-        df.loc[bearish, "Close"],
-        marker="v",
-        s=80,
-        label="Bearish EMA Cross",
-    )
+    return ticker, entry, f"{ticker}: {entry['signal']} → saved to {output_path}"
 
-    axes[0].set_title(f"{ticker} — Price, EMA & Signals (Last 1 Year)")
-    axes[0].set_ylabel("Price")
-    axes[0].legend(loc="upper left")
-    axes[0].grid(alpha=0.3)
-
-    axes[0].text(
-        0.01,
-        0.95,
-        f"Signal: {latest_signal}",
-        transform=axes[0].transAxes,
-        fontsize=12,
-        fontweight="bold",
-        verticalalignment="top",
-    )
 
-    # === MACD ===
-    axes[1].plot(df["Date"], df["MACD"], label="MACD")
-    axes[1].plot(df["Date"], df["MACD_Signal"], label="Signal")
-    axes[1].bar(df["Date"], df["MACD_Histogram"], alpha=0.4)
-    axes[1].axhline(0, linewidth=1)
-    axes[1].set_ylabel("MACD")
-    axes[1].legend(loc="upper left")
-    axes[1].grid(alpha=0.3)
-
-    # === RSI ===
-    axes[2].plot(df["Date"], df["RSI_14"])
-    axes[2].axhline(70, linestyle="--", linewidth=1)
-    axes[2].axhline(30, linestyle="--", linewidth=1)
-    axes[2].set_ylabel("RSI")
-    axes[2].set_ylim(0, 100)
-    axes[2].grid(alpha=0.3)
-
-    # X-axis formatting
-    axes[2].xaxis.set_major_locator(mdates.WeekdayLocator(interval=2))
-    axes[2].xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
-    fig.autofmt_xdate()
-
-    # Save
-    output_path = os.path.join(SIGNALS_DIR, f"{ticker}_signals.png")
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150)
-    plt.close(fig)
-
-    print(f"{ticker}: {latest_signal} → saved to {output_path}")
\ No newline at end of file
+def _process_ticker_safe(ticker, *args, **kwargs):
+    with metrics.stage('signals', ticker) as record:
+        try:
+            return process_ticker(ticker, *args, **kwargs)
+        except Exception as e:
+            record['ok'] = False
+            return ticker, None, f"✗ {ticker}: Error - {str(e)}"
+
+
+# ---------------------------
+# Main loop
+# ---------------------------
+def main(workers=1, only_signal_changes=False, force=False,
+         data_dir=STOCK_DATA_DIR, signals_dir=SIGNALS_DIR,
+         lookback_days=LOOKBACK_DAYS, max_points=MAX_POINTS, thumbnail=False):
+    """
+    Render signal charts for every ticker
+
+    Parameters:
+    - workers: Number of worker processes rendering charts
+    - only_signal_changes: Only render tickers whose latest signal changed
+    - force: Render every chart even if it is up to date
+    - data_dir: Directory containing ticker data
+    - signals_dir: Directory the PNG charts are written to
+    - lookback_days: Calendar days shown in each chart
+    - max_points: Downsample lines longer than this (None to draw all bars)
+    - thumbnail: Render low-DPI thumbnails instead of full charts
+
+    Returns:
+    - Dict of ticker -> latest signal
+    """
+    os.makedirs(signals_dir, exist_ok=True)
+
+    today = pd.Timestamp.today().normalize()
+    start_date = today - pd.Timedelta(days=lookback_days)
+
+    manifest_name = RENDER_MANIFEST_THUMB if thumbnail else RENDER_MANIFEST
+    manifest = load_render_manifest(signals_dir, manifest_name)
+    tickers = list_tickers(data_dir)
+    args = [
+        (ticker, start_date, manifest.get(ticker), only_signal_changes, force,
+         data_dir, signals_dir, DPI, max_points, thumbnail)
+        for ticker in tickers
+    ]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_process_ticker_safe, *a) for a in args]
+            results = (future.result() for future in futures)
+            signals = _collect_results(results, manifest)
+    else:
+        signals = _collect_results((_process_ticker_safe(*a) for a in args), manifest)
+
+    save_render_manifest(manifest, signals_dir, manifest_name)
+    return signals
+
+
+def _collect_results(results, manifest):
+    signals = {}
+    for ticker, entry, message in results:
+        if message:
+            print(message)
+        if entry is not None:
+            manifest[ticker] = entry
+            signals[ticker] = entry["signal"]
+    return signals
+
+
+if __name__ == "__main__":
+    # python generate_signals.py
+    # python generate_signals.py --lookback-days 1825 --thumbnail
+    parser = argparse.ArgumentParser(description="Render EMA crossover signal charts")
+    parser.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS)
+    parser.add_argument("--max-points", type=int, default=MAX_POINTS,
+                        help="Downsample longer lines to this many points (0 for all)")
+    parser.add_argument("--thumbnail", action="store_true", help="Render low-DPI thumbnails")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    main(workers=args.workers, force=args.force, lookback_days=args.lookback_days,
+         max_points=args.max_points or None, thumbnail=args.thumbnail)
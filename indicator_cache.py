@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# ---------------------------
+# Content-addressed indicator cache
+# ---------------------------
+# Indicator results are memoized on disk under a key made of a hash of the
+# input close prices plus the indicator name and parameters. Each indicator
+# is a separate entry (EMA_12, EMA_26, ... are cached one by one), so adding
+# a new EMA period only computes the new column and reuses the rest.
+#
+# Entries are .npy files in <data_dir>/.indicator_cache/. A hit refreshes the
+# file's mtime, and when the total size exceeds max_bytes the least recently
+# used entries are deleted first.
+#
+# The cache saves the calculation only: the ticker is still read and its
+# input columns hashed to build the key, so a hit costs a read plus a hash
+# of the inputs instead of the indicator kernels.
+#
+# Bump CACHE_VERSION whenever an indicator formula changes so that old
+# entries are no longer matched.
+
+CACHE_DIR_NAME = '.indicator_cache'
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class IndicatorCache:
+    """
+    Size-bounded LRU cache of indicator arrays on disk
+
+    Parameters:
+    - cache_dir: Directory holding the cache entries
+    - max_bytes: Total size the cache is trimmed to after every store
+      (None to never trim on store; the owner calls evict() with a bound)
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._sizes = None
+        self._total = 0
+
+    @classmethod
+    def for_data_dir(cls, data_dir, max_bytes=DEFAULT_MAX_BYTES):
+        return cls(os.path.join(data_dir, CACHE_DIR_NAME), max_bytes)
+
+    def key(self, values, indicator, params):
+        """
+        Key of an indicator calculated on the given input values
+
+        Parameters:
+        - values: Input array (e.g. close prices)
+        - indicator: Indicator name (e.g. 'ema')
+        - params: Dict of the indicator's parameters
+
+        Returns:
+        - Hex digest string
+        """
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        h = hashlib.sha1(values.tobytes())
+        h.update(json.dumps({'indicator': indicator, 'params': params,
+                             'version': CACHE_VERSION}, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.npy')
+
+    def get(self, key):
+        """
+        Load a cached array and mark it as recently used
+
+        Returns:
+        - The array, or None if the key is not cached
+        """
+        path = self._path(key)
+        try:
+            array = np.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return array
+
+    def put(self, key, array):
+        """
+        Store an array under a key, then evict entries beyond max_bytes
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(array))
+        os.replace(tmp_path, path)
+
+        if self.max_bytes is None:
+            return
+        if self._sizes is None:
+            self._sizes = self._scan()
+            self._total = sum(self._sizes.values())
+        size = os.path.getsize(path)
+        self._total += size - self._sizes.get(path, 0)
+        self._sizes[path] = size
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def cached(self, values, indicator, params, compute):
+        """
+        Return the cached result of compute(), calculating and storing it on
+        a miss
+
+        Parameters:
+        - values: Input array the result depends on
+        - indicator: Indicator name
+        - params: Dict of the indicator's parameters
+        - compute: Callable returning the result as an array
+
+        Returns:
+        - Tuple of (array, True if it came from the cache)
+        """
+        key = self.key(values, indicator, params)
+        array = self.get(key)
+        if array is not None:
+            self.hits += 1
+            return array, True
+
+        self.misses += 1
+        array = np.asarray(compute())
+        self.put(key, array)
+        return array, False
+
+    def _scan(self):
+        sizes = {}
+        if not os.path.isdir(self.cache_dir):
+            return sizes
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npy'):
+                try:
+                    sizes[entry.path] = entry.stat().st_size
+                except OSError:
+                    pass
+        return sizes
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits max_bytes
+
+        Returns:
+        - Number of entries deleted
+        """
+        if self.max_bytes is None:
+            return 0
+        entries = []
+        for entry in os.scandir(self.cache_dir) if os.path.isdir(self.cache_dir) else []:
+            if not entry.name.endswith('.npy'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        # Oldest mtime first: hits refresh the mtime in get()
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        self._sizes = {path: size for _, size, path in entries}
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            del self._sizes[path]
+            total -= size
+            removed += 1
+
+        self._total = total
+        return removed
+
+    def clear(self):
+        """
+        Delete every cache entry
+        """
+        for path in self._scan():
+            os.remove(path)
+        self._sizes = {}
+        self._total = 0
+
+    def size(self):
+        """
+        Total size of the cache entries in bytes
+        """
+        return sum(self._scan().values())
+
+
+# Example usage
+if __name__ == "__main__":
+    # python indicator_cache.py  -> report and trim the stock_data cache
+    cache = IndicatorCache.for_data_dir('stock_data')
+    before = cache.size()
+    removed = cache.evict()
+    print(f"Indicator cache: {before / 1e6:.1f} MB, {removed} entries evicted")
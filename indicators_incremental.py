@@ -0,0 +1,259 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from ema_calc import calculate_ema
+from rsi_calc import calculate_rsi
+from indicators_main import calculate_all_indicators
+from indicator_registry import calculate_indicators, make_indicator
+from storage import read_frame, round_to_storage, write_frame
+
+STATE_DIR_NAME = '.state'
+
+def get_state_path(csv_file):
+    """
+    Get the path of the indicator state file that belongs to a stock CSV file
+
+    State files live next to the data, e.g. stock_data/.state/SPY.json
+    """
+    data_dir = os.path.dirname(csv_file)
+    ticker = os.path.splitext(os.path.basename(csv_file))[0]
+    return os.path.join(data_dir, STATE_DIR_NAME, f'{ticker}.json')
+
+def load_state(csv_file):
+    """
+    Load the stored indicator state for a stock CSV file
+
+    Returns:
+    - State dict, or None if no usable state exists
+    """
+    state_path = get_state_path(csv_file)
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def save_state(csv_file, state):
+    """
+    Save the indicator state for a stock CSV file
+    """
+    state_path = get_state_path(csv_file)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path, 'w') as f:
+        json.dump(state, f, indent=2)
+
+def build_state(df, close_col, ticker, params):
+    """
+    Capture everything needed to extend the indicators by new rows
+
+    The state holds the last EMA values and the fast/slow EMAs and the
+    signal line value of MACD; RSI continues from the stored closes.
+
+    EMA values are kept in full precision so the recursion continues as a
+    full recompute would. The last close is saved at storage precision
+    (float32 in compact mode), the precision it is compared at next time.
+
+    Parameters:
+    - df: DataFrame with indicator columns already calculated
+    - close_col: Close price column
+    - ticker: Ticker symbol used as the second column level
+    - params: Dict of indicator parameters the columns were calculated with
+
+    Returns:
+    - State dict (JSON serializable)
+    """
+    last = df.iloc[-1]
+
+    ema = {str(p): float(last[(f'EMA_{p}', ticker)]) for p in params['ema_periods']}
+
+    # MACD EMAs are only stored as columns when they are part of ema_periods
+    macd_ema = {}
+    for key in ('macd_fast', 'macd_slow'):
+        period = params[key]
+        if str(period) in ema:
+            macd_ema[key] = ema[str(period)]
+        else:
+            macd_ema[key] = float(calculate_ema(df, close_col, period).iloc[-1])
+
+    return {
+        'params': params,
+        'rows': len(df),
+        'last_date': df.index[-1].strftime('%Y-%m-%d'),
+        'last_close': float(round_to_storage(df[close_col].to_numpy(dtype=float)[-1:])[0]),
+        'ema': ema,
+        'macd': {
+            'ema_fast': macd_ema['macd_fast'],
+            'ema_slow': macd_ema['macd_slow'],
+            'signal': float(last[('MACD_Signal', ticker)]),
+        },
+    }
+
+def extend_ema(last_value, values, span):
+    """
+    Extend an EMA series by new values, starting from its last value
+
+    Seeding ewm with the previous EMA value runs the exact same recursion
+    as a full recompute, so the results match bit for bit.
+
+    Parameters:
+    - last_value: Last EMA value of the existing history
+    - values: Array of new input values
+    - span: EMA span
+
+    Returns:
+    - Array of EMA values for the new rows
+    """
+    seeded = pd.Series(np.concatenate([[last_value], values]))
+    return seeded.ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+def _state_is_usable(state, df, close_col, params):
+    if state is None or state.get('params') != params:
+        return False
+
+    last_date = pd.Timestamp(state['last_date'])
+    if last_date not in df.index:
+        return False
+
+    # History must be unchanged up to the stored last row
+    if df.index.get_loc(last_date) != state['rows'] - 1:
+        return False
+    # Compared at storage precision: compact CSV files hold the shortest
+    # float32 text, which parses to a nearby float64
+    last_close = round_to_storage(np.array([df.at[last_date, close_col]], dtype=float))[0]
+    if last_close != state['last_close']:
+        return False
+
+    # NaN closes break the seeded recursion; recompute in that case
+    new_close = df.loc[df.index > last_date, close_col]
+    return not new_close.isna().any() and not np.isnan(state['last_close'])
+
+def update_indicators_incremental(csv_file, ema_periods=[12, 26, 50, 200],
+                                  macd_fast=12, macd_slow=26, macd_signal=9,
+                                  rsi_period=14, extra_indicators=()):
+    """
+    Extend EMA, MACD and RSI indicators of a stock CSV file by its new rows
+
+    Only rows after the date recorded in the ticker's state file are
+    calculated, so the indicator calculation of a daily update costs
+    O(new rows). The file itself is still read and rewritten in full: the
+    new rows are already stored (without indicator values), and storage
+    can only append rows, not update them in place. Results are identical
+    to a full recompute. When there is no usable state (first run, changed
+    parameters or rewritten history) the indicators are fully recomputed
+    and a fresh state is stored.
+
+    Parameters:
+    - csv_file: Path to the CSV file
+    - ema_periods: List of EMA periods to calculate
+    - macd_fast: MACD fast EMA period
+    - macd_slow: MACD slow EMA period
+    - macd_signal: MACD signal line period
+    - rsi_period: RSI period
+    - extra_indicators: Further indicator specs (see
+      indicators_main.calculate_all_indicators); these have no saved state
+      and are recalculated over the full history
+
+    Returns:
+    - DataFrame with indicator columns updated, or None on error
+    """
+    params = {
+        'ema_periods': list(ema_periods),
+        'macd_fast': macd_fast,
+        'macd_slow': macd_slow,
+        'macd_signal': macd_signal,
+        'rsi_period': rsi_period,
+    }
+    # Recorded in the state so that changed extras force a recompute; only
+    # present when requested, so states without extras stay usable
+    extras = sorted(make_indicator(spec).spec() for spec in extra_indicators)
+    state_params = dict(params, extra_indicators=extras) if extras else params
+
+    try:
+        print(f"Updating indicators for {os.path.basename(csv_file)}...")
+
+        # Read the ticker data; round_trip keeps stored indicator values exact.
+        # Compact data is read as float32 but calculated in float64, as a
+        # full recompute does
+        df = read_frame(csv_file, float_precision='round_trip')
+        df = df.astype({column: np.float64 for column, dtype in df.dtypes.items()
+                        if dtype == np.float32})
+
+        # Get the ticker symbol
+        ticker = df.columns[0][1]
+
+        # Access the Close price column
+        close_col = ('Price', ticker) if 'Price' in df.columns.levels[0] else ('Close', ticker)
+
+        state = load_state(csv_file)
+
+        if not _state_is_usable(state, df, close_col, state_params):
+            print("  No usable state, recalculating full history")
+            calculate_all_indicators(df, close_col, ticker, extra_indicators=extras, **params)
+        else:
+            last_date = pd.Timestamp(state['last_date'])
+            new_rows = df.index > last_date
+            new_close = df.loc[new_rows, close_col].to_numpy(dtype=float)
+
+            if len(new_close) == 0:
+                # Extra columns may have been dropped from the file since
+                missing = [spec for spec in extras
+                           if any((name, ticker) not in df.columns
+                                  for name in make_indicator(spec).columns())]
+                if not missing:
+                    print(f"✓ {os.path.basename(csv_file)}: Indicators already up to date\n")
+                    return df
+
+                for name, values in calculate_indicators(df, missing, ticker).items():
+                    df[(name, ticker)] = values
+                print(f"  ✓ {len(missing)} missing extra indicators calculated")
+            else:
+                # EMA
+                for period in ema_periods:
+                    df.loc[new_rows, (f'EMA_{period}', ticker)] = extend_ema(
+                        state['ema'][str(period)], new_close, period
+                    )
+                    print(f"  ✓ EMA_{period} extended")
+
+                # MACD
+                ema_fast = extend_ema(state['macd']['ema_fast'], new_close, macd_fast)
+                ema_slow = extend_ema(state['macd']['ema_slow'], new_close, macd_slow)
+                macd = ema_fast - ema_slow
+                signal_line = extend_ema(state['macd']['signal'], macd, macd_signal)
+                df.loc[new_rows, ('MACD', ticker)] = macd
+                df.loc[new_rows, ('MACD_Signal', ticker)] = signal_line
+                df.loc[new_rows, ('MACD_Hist', ticker)] = macd - signal_line
+                print(f"  ✓ MACD ({macd_fast},{macd_slow},{macd_signal}) extended")
+
+                # RSI over the trailing window plus the new closes
+                old_close = df.loc[~new_rows, close_col].to_numpy(dtype=float)[-rsi_period:]
+                window = pd.DataFrame({'Close': np.concatenate([old_close, new_close])})
+                rsi = calculate_rsi(window, 'Close', rsi_period).to_numpy()
+                df.loc[new_rows, (f'RSI_{rsi_period}', ticker)] = rsi[-len(new_close):]
+                print(f"  ✓ RSI_{rsi_period} extended")
+
+                # Extra indicators, sharing their intermediates on one graph
+                if extras:
+                    for name, values in calculate_indicators(df, extras, ticker).items():
+                        df[(name, ticker)] = values
+                    print(f"  ✓ {len(extras)} extra indicators recalculated")
+
+                print(f"  {len(new_close)} new rows")
+
+        # Save back to the same file and record the new state
+        write_frame(df, csv_file)
+        save_state(csv_file, build_state(df, close_col, ticker, state_params))
+        print(f"✓ {os.path.basename(csv_file)}: Indicators saved\n")
+
+        return df
+
+    except Exception as e:
+        print(f"✗ Error processing {os.path.basename(csv_file)}: {str(e)}\n")
+        return None
+
+# Example usage
+if __name__ == "__main__":
+    # Single file
+    update_indicators_incremental('stock_data/SPY.csv')
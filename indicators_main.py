@@ -1,13 +1,225 @@
+import contextlib
+import functools
+import io
 import json
 import os
-from ema_calc import add_ema_to_file
-from macd_calc import add_macd_to_file
-from rsi_calc import add_rsi_to_file
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import metrics
+from indicator_cache import DEFAULT_MAX_BYTES, IndicatorCache
+from storage import list_tickers, read_frame, round_to_storage, ticker_path, write_frame
+from indicator_registry import EMA, MACD, RSI, IndicatorGraph, input_fields, make_indicator
+
+# Indicator caches of this process, by data directory
+_caches = {}
+
+def _shared_cache(data_dir):
+    """
+    Indicator cache of a data directory, created once per process
+    
+    Stores are never trimmed here: scanning the cache directory on every
+    ticker would make a run quadratic in the number of tickers. The caller
+    of a run trims the cache once at the end with evict().
+    """
+    if data_dir not in _caches:
+        _caches[data_dir] = IndicatorCache.for_data_dir(data_dir, max_bytes=None)
+    return _caches[data_dir]
+
+def calculate_all_indicators(df, close_col, ticker, ema_periods=[12, 26, 50, 200],
+                             macd_fast=12, macd_slow=26, macd_signal=9,
+                             rsi_period=14, extra_indicators=(), cache=None):
+    """
+    Calculate EMA, MACD and RSI columns on an in-memory DataFrame
+    
+    Indicators are evaluated on one indicator_registry graph, so shared
+    intermediates are calculated once: MACD reuses the EMAs of the EMA
+    step, and extra indicators reuse whatever they have in common (price
+    changes, true range, ...). With a cache, every indicator is looked up
+    by the hash of its input prices and its parameters before calculating it.
+    
+    Parameters:
+    - df: DataFrame with stock data (modified in place)
+    - close_col: Column to calculate indicators on (typically Close price)
+    - ticker: Ticker symbol used as the second column level
+    - ema_periods: List of EMA periods to calculate
+    - macd_fast: MACD fast EMA period
+    - macd_slow: MACD slow EMA period
+    - macd_signal: MACD signal line period
+    - rsi_period: RSI period
+    - extra_indicators: Further indicator specs, e.g. ['bollinger', 'atr:21']
+      (see indicator_registry.make_indicator)
+    - cache: Optional IndicatorCache to reuse results from
+    
+    Returns:
+    - DataFrame with indicator columns added
+    """
+    graph = IndicatorGraph.from_frame(df, ticker)
+    graph.inputs['close'] = df[close_col]
+    
+    def calculate(indicator, stage):
+        # One registry indicator, memoized on its input prices when a cache is given
+        with metrics.stage(stage, ticker) as record:
+            record['rows'] = len(df)
+            compute = lambda: np.vstack(list(graph.evaluate(indicator).values()))
+            if cache is None:
+                values, status = compute(), 'calculated'
+            else:
+                inputs = np.concatenate([df[close_col if field == 'Close' else (field, ticker)]
+                                         .to_numpy(dtype=float)
+                                         for field in input_fields(indicator)])
+                values, hit = cache.cached(inputs, indicator.name, indicator.params, compute)
+                status = 'cached' if hit else 'calculated'
+            # One row per column (single-column entries may be stored flat)
+            columns = indicator.columns()
+            for name, column in zip(columns, np.reshape(values, (len(columns), -1))):
+                df[(name, ticker)] = column
+            return status
+    
+    # Calculate EMAs for each period
+    for period in ema_periods:
+        status = calculate(EMA(period=period), 'ema')
+        print(f"  ✓ EMA_{period} {status}")
+    
+    # Calculate MACD, reusing the EMAs computed above
+    status = calculate(MACD(fast=macd_fast, slow=macd_slow, signal=macd_signal), 'macd')
+    print(f"  ✓ MACD ({macd_fast},{macd_slow},{macd_signal}) {status}")
+    
+    # Calculate RSI
+    status = calculate(RSI(period=rsi_period), 'rsi')
+    print(f"  ✓ RSI_{rsi_period} {status}")
+    
+    for spec in extra_indicators:
+        indicator = make_indicator(spec)
+        status = calculate(indicator, indicator.name)
+        print(f"  ✓ {indicator.label()} {status}")
+    
+    return df
+
+def add_indicators_to_file(csv_file, ema_periods=[12, 26, 50, 200],
+                           macd_fast=12, macd_slow=26, macd_signal=9,
+                           rsi_period=14, extra_indicators=(), cache=None):
+    """
+    Add EMA, MACD and RSI indicators to a stock CSV file in a single pass
+    
+    The file is read once, every indicator is computed in memory and the
+    result is written back once. The write is skipped when the file already
+    holds exactly these indicator values.
+    
+    Parameters:
+    - csv_file: Path to the CSV file
+    - ema_periods: List of EMA periods to calculate
+    - macd_fast: MACD fast EMA period
+    - macd_slow: MACD slow EMA period
+    - macd_signal: MACD signal line period
+    - rsi_period: RSI period
+    - extra_indicators: Further indicator specs (see calculate_all_indicators)
+    - cache: Optional IndicatorCache to reuse results from
+    
+    Returns:
+    - DataFrame with indicator columns added, or None on error
+    """
+    try:
+        print(f"Calculating indicators for {os.path.basename(csv_file)}...")
+        
+        # Read the ticker data; round_trip parsing makes unchanged values
+        # compare equal to freshly calculated ones
+        df = read_frame(csv_file, float_precision='round_trip')
+        
+        # Get the ticker symbol
+        ticker = df.columns[0][1]
+        
+        # Access the Close price column
+        close_col = ('Price', ticker) if 'Price' in df.columns.levels[0] else ('Close', ticker)
+        
+        # Indicator values currently in the file
+        names = [f'EMA_{period}' for period in ema_periods]
+        names += ['MACD', 'MACD_Signal', 'MACD_Hist', f'RSI_{rsi_period}']
+        for spec in extra_indicators:
+            names += make_indicator(spec).columns()
+        previous = {name: df[(name, ticker)].to_numpy() for name in names
+                    if (name, ticker) in df.columns}
+        
+        # Calculate EMA, MACD and RSI in memory
+        calculate_all_indicators(
+            df, close_col, ticker,
+            ema_periods=ema_periods,
+            macd_fast=macd_fast,
+            macd_slow=macd_slow,
+            macd_signal=macd_signal,
+            rsi_period=rsi_period,
+            extra_indicators=extra_indicators,
+            cache=cache
+        )
+        
+        # In compact mode both sides are compared as float32, the precision
+        # the file holds
+        unchanged = len(previous) == len(names) and all(
+            np.array_equal(round_to_storage(previous[name]),
+                           round_to_storage(df[(name, ticker)].to_numpy()), equal_nan=True)
+            for name in names
+        )
+        if unchanged:
+            print(f"✓ {os.path.basename(csv_file)}: Indicators up to date\n")
+            return df
+        
+        # Save back to the same file
+        write_frame(df, csv_file)
+        print(f"✓ {os.path.basename(csv_file)}: Indicators saved\n")
+        
+        return df
+        
+    except Exception as e:
+        print(f"✗ Error processing {os.path.basename(csv_file)}: {str(e)}\n")
+        return None
+
+def _process_ticker(csv_file, file_path, params, incremental=False, capture=False,
+                    cache_max_bytes=None):
+    """
+    Add all indicators to one ticker file and report the outcome
+    
+    Runs in a worker process when process_all_tickers uses workers > 1, in
+    which case the printed progress is captured and returned so it can be
+    shown in a deterministic order. Full recomputes use the indicator cache
+    of the data directory unless cache_max_bytes is None; the cache is
+    shared by every ticker of the process and trimmed by the caller.
+    
+    Returns:
+    - Tuple of (csv_file, success flag, captured output)
+    """
+    if incremental:
+        # Imported here because indicators_incremental builds on this module
+        from indicators_incremental import update_indicators_incremental
+        add_indicators = update_indicators_incremental
+    elif cache_max_bytes is not None:
+        cache = _shared_cache(os.path.dirname(file_path))
+        add_indicators = functools.partial(add_indicators_to_file, cache=cache)
+    else:
+        add_indicators = add_indicators_to_file
+    
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer) if capture else contextlib.nullcontext():
+        print(f"{'='*60}")
+        print(f"Processing: {csv_file}")
+        print(f"{'='*60}")
+        
+        # Add EMA, MACD and RSI indicators in one read/write cycle
+        with metrics.stage('indicators', csv_file[:-len('.csv')]) as record:
+            df = add_indicators(file_path, **params)
+            record['rows'] = None if df is None else len(df)
+            record['ok'] = df is not None
+        
+        if df is not None:
+            print(f"✓ {csv_file}: All indicators calculated successfully!\n")
+        else:
+            print(f"✗ {csv_file}: Error - indicators not saved\n")
+    
+    return csv_file, df is not None, buffer.getvalue()
 
 def process_all_tickers(data_dir='stock_data',
                        ema_periods=[12, 26, 50, 200],
                        macd_fast=12, macd_slow=26, macd_signal=9,
-                       rsi_period=14):
+                       rsi_period=14, extra_indicators=(), incremental=False, workers=1,
+                       use_cache=True, cache_max_bytes=DEFAULT_MAX_BYTES):
     """
     Process all CSV files in the data directory and add technical indicators
     
@@ -18,56 +230,93 @@ def process_all_tickers(data_dir='stock_data',
     - macd_slow: MACD slow EMA period
     - macd_signal: MACD signal line period
     - rsi_period: RSI period
+    - extra_indicators: Further indicator specs, e.g. ['bollinger', 'atr',
+      'stochastic', 'obv'] (see indicator_registry.make_indicator)
+    - incremental: Only calculate rows added since the last run, using the
+      per-ticker state stored by indicators_incremental
+    - workers: Number of worker processes. Tickers are independent, so
+      values above 1 spread them across a process pool; output is still
+      printed per ticker in the same order as a serial run.
+    - use_cache: Reuse indicator results cached in <data_dir>/.indicator_cache
+      for unchanged prices and parameters (full recompute mode only). Files
+      are still read; only the indicator calculation is skipped on a hit.
+    - cache_max_bytes: Size the indicator cache is trimmed to at the end of
+      the run
     """
     # Get all CSV files in the directory
     if not os.path.exists(data_dir):
         print(f"Error: Directory '{data_dir}' not found.")
         return
     
-    csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
+    csv_files = [f'{ticker}.csv' for ticker in list_tickers(data_dir)]
     
     if not csv_files:
-        print(f"No CSV files found in '{data_dir}' directory.")
+        print(f"No ticker files found in '{data_dir}' directory.")
         return
     
     print(f"\n{'#'*60}")
     print(f"TECHNICAL INDICATORS CALCULATOR")
     print(f"{'#'*60}")
-    print(f"Found {len(csv_files)} CSV files in '{data_dir}' directory")
+    print(f"Found {len(csv_files)} ticker files in '{data_dir}' directory")
     print(f"\nIndicators to calculate:")
     print(f"  - EMA: {', '.join(map(str, ema_periods))}")
     print(f"  - MACD: ({macd_fast}, {macd_slow}, {macd_signal})")
     print(f"  - RSI: {rsi_period}")
+    for spec in extra_indicators:
+        print(f"  - {make_indicator(spec).label()}")
+    print(f"Mode: {'incremental' if incremental else 'full recompute'}")
+    print(f"Workers: {workers}")
+    print(f"Indicator cache: {'on' if use_cache and not incremental else 'off'}")
     print(f"{'#'*60}\n")
     
+    params = {
+        'ema_periods': ema_periods,
+        'macd_fast': macd_fast,
+        'macd_slow': macd_slow,
+        'macd_signal': macd_signal,
+        'rsi_period': rsi_period,
+        'extra_indicators': list(extra_indicators),
+    }
+    jobs = [(csv_file, ticker_path(data_dir, csv_file.replace('.csv', '')))
+            for csv_file in csv_files]
+    cache_max_bytes = cache_max_bytes if use_cache and not incremental else None
+    
     # Process each file
     success_count = 0
     failed_files = []
     
-    for csv_file in csv_files:
-        file_path = os.path.join(data_dir, csv_file)
-        ticker_name = csv_file.replace('.csv', '')
-        
-        print(f"{'='*60}")
-        print(f"Processing: {csv_file}")
-        print(f"{'='*60}")
-        
-        try:
-            # Add EMA indicators
-            add_ema_to_file(file_path, periods=ema_periods)
-            
-            # Add MACD indicators
-            add_macd_to_file(file_path, fast=macd_fast, slow=macd_slow, signal=macd_signal)
+    if workers > 1:
+        # Worker output is captured and printed in submission order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_process_ticker, csv_file, file_path, params,
+                                incremental, True, cache_max_bytes)
+                for csv_file, file_path in jobs
+            ]
+            for (csv_file, _), future in zip(jobs, futures):
+                try:
+                    _, ok, output = future.result()
+                except Exception as e:
+                    ok, output = False, f"✗ {csv_file}: Error - {str(e)}\n\n"
+                
+                print(output, end='')
+                if ok:
+                    success_count += 1
+                else:
+                    failed_files.append(csv_file)
+    else:
+        for csv_file, file_path in jobs:
+            _, ok, _ = _process_ticker(csv_file, file_path, params, incremental,
+                                       cache_max_bytes=cache_max_bytes)
             
-            # Add RSI indicator
-            add_rsi_to_file(file_path, period=rsi_period)
-            
-            print(f"✓ {csv_file}: All indicators calculated successfully!\n")
-            success_count += 1
-            
-        except Exception as e:
-            print(f"✗ {csv_file}: Error - {str(e)}\n")
-            failed_files.append(csv_file)
+            if ok:
+                success_count += 1
+            else:
+                failed_files.append(csv_file)
+    
+    # Tickers only add to the cache; trim it once for the whole run
+    if cache_max_bytes is not None:
+        IndicatorCache.for_data_dir(data_dir, cache_max_bytes).evict()
     
     # Summary
     print(f"\n{'='*60}")
@@ -89,5 +338,6 @@ if __name__ == "__main__":
         macd_fast=12,
         macd_slow=26,
         macd_signal=9,
-        rsi_period=14
+        rsi_period=14,
+        workers=os.cpu_count() or 1
     )
\ No newline at end of file
@@ -1,8 +1,11 @@
-import yfinance as yf
 import pandas as pd
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import metrics
+from data_providers import RateLimiter, YahooProvider, download_with_retry
+from storage import append_frame, exists, last_date, read_frame, ticker_path, write_frame
 
 def load_tickers_from_json(json_file='tickers.json'):
     """
@@ -36,73 +39,176 @@ def load_tickers_from_json(json_file='tickers.json'):
         print(f"Error: {json_file} is not valid JSON.")
         return []
 
-def fetch_and_store_ticker_data(tickers, data_dir='stock_data', years=10):
+def plan_fetches(tickers, data_dir, start_date, end_date):
     """
-    Fetch last N years of stock data and store incrementally in CSV files.
-    
+    Work out the missing date range of every ticker.
+
+    Only the last stored date is looked up, not the full history.
+
     Parameters:
-    - tickers: list of ticker symbols (e.g., ['AAPL', 'GOOGL', 'MSFT'])
-    - data_dir: directory to store CSV files
-    - years: number of years of historical data to fetch
+    - tickers: list of ticker symbols
+    - data_dir: directory with stored ticker data
+    - start_date: start of the full history for tickers not stored yet
+    - end_date: end of the range to fetch
+
+    Returns:
+    - Tuple of (plan, last_dates): plan maps fetch start date -> list of
+      tickers missing data from that date, last_dates maps ticker -> last
+      stored date (None for tickers not stored yet)
     """
-    
-    # Create directory if it doesn't exist
-    os.makedirs(data_dir, exist_ok=True)
-    
-    # Calculate start date
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=years*365)
-    
+    plan = {}
+    last_dates = {}
+
     for ticker in tickers:
-        csv_file = os.path.join(data_dir, f'{ticker}.csv')
-        
+        csv_file = ticker_path(data_dir, ticker)
+
         try:
-            # Check if CSV already exists
-            if os.path.exists(csv_file):
-                print(f"Loading existing data for {ticker}...")
-                existing_data = pd.read_csv(csv_file, index_col=0, parse_dates=True)
-                
-                # Get the last date in existing data
-                last_date = existing_data.index.max()
-                
+            # Check if the ticker is already stored
+            last = last_date(csv_file) if exists(csv_file) else None
+
+            if last is not None:
                 # Fetch only new data from the day after last date
-                fetch_start = last_date + timedelta(days=1)
-                
+                fetch_start = last + timedelta(days=1)
+
                 # Skip if data is already up to date
                 if fetch_start.date() >= end_date.date():
                     print(f"{ticker}: Data is already up to date.")
                     continue
-                
-                print(f"{ticker}: Fetching data from {fetch_start.date()} to {end_date.date()}...")
-                new_data = yf.download(ticker, start=fetch_start, end=end_date, progress=False)
-                
-                if not new_data.empty:
-                    # Combine and remove duplicates
-                    combined_data = pd.concat([existing_data, new_data])
-                    combined_data = combined_data[~combined_data.index.duplicated(keep='last')]
-                    combined_data.sort_index(inplace=True)
-                    
-                    # Save to CSV
-                    combined_data.to_csv(csv_file)
-                    print(f"{ticker}: Added {len(new_data)} new rows. Total: {len(combined_data)} rows.")
-                else:
-                    print(f"{ticker}: No new data available.")
-            
             else:
-                # Fetch full historical data
-                print(f"{ticker}: Fetching full {years}-year history from {start_date.date()} to {end_date.date()}...")
-                data = yf.download(ticker, start=start_date, end=end_date, progress=False)
-                
-                if not data.empty:
-                    data.to_csv(csv_file)
-                    print(f"{ticker}: Saved {len(data)} rows to {csv_file}")
-                else:
-                    print(f"{ticker}: No data available.")
-        
+                fetch_start = start_date
+
+            last_dates[ticker] = last
+            plan.setdefault(fetch_start.date(), []).append(ticker)
+
         except Exception as e:
             print(f"Error processing {ticker}: {str(e)}")
-            continue
-    
+
+    return plan, last_dates
+
+def store_ticker_data(ticker, new_data, last, csv_file):
+    """
+    Add fetched rows to a ticker's stored data.
+
+    Rows strictly newer than the stored data are appended as a delta
+    segment, so an update writes only the new rows. Rows overlapping the
+    stored history (revised bars) fall back to a full merge and rewrite.
+
+    Parameters:
+    - ticker: ticker symbol
+    - new_data: fetched DataFrame
+    - last: last stored date, or None if the ticker is not stored yet
+    - csv_file: logical path of the ticker
+    """
+    if new_data.empty:
+        print(f"{ticker}: No {'new ' if last is not None else ''}data available.")
+
+    elif last is None:
+        write_frame(new_data, csv_file)
+        print(f"{ticker}: Saved {len(new_data)} rows to {csv_file}")
+
+    elif new_data.index.min() > last:
+        append_frame(new_data, csv_file)
+        print(f"{ticker}: Appended {len(new_data)} new rows.")
+
+    else:
+        # Combine and remove duplicates
+        existing_data = read_frame(csv_file, float_precision='round_trip')
+        combined_data = pd.concat([existing_data, new_data])
+        combined_data = combined_data[~combined_data.index.duplicated(keep='last')]
+        combined_data.sort_index(inplace=True)
+
+        # Save with the ticker's storage backend
+        write_frame(combined_data, csv_file)
+        print(f"{ticker}: Added {len(new_data)} new rows. Total: {len(combined_data)} rows.")
+
+def _download_batch(provider, batch, start, end, limiter, max_retries, backoff):
+    # Runs on the fetch thread pool; one metrics record per request
+    with metrics.stage('download') as record:
+        frames = download_with_retry(provider, batch, start, end, limiter, max_retries, backoff)
+        record['tickers'] = len(batch)
+        record['rows'] = sum(len(frame) for frame in frames.values())
+    return frames
+
+def fetch_and_store_ticker_data(tickers, data_dir='stock_data', years=10, provider=None,
+                                batch_size=50, max_workers=4, rate_limit=2.0,
+                                max_retries=3, backoff=1.0):
+    """
+    Fetch last N years of stock data and store incrementally in stock_data.
+
+    Tickers that miss the same date range are fetched together in
+    multi-symbol requests of up to batch_size tickers. The requests run
+    concurrently on a bounded thread pool, spaced by a rate limit and retried
+    with exponential backoff.
+
+    Parameters:
+    - tickers: list of ticker symbols (e.g., ['AAPL', 'GOOGL', 'MSFT'])
+    - data_dir: directory to store CSV files
+    - years: number of years of historical data to fetch
+    - provider: DataProvider to fetch from (default: YahooProvider)
+    - batch_size: maximum number of tickers per request
+    - max_workers: maximum number of concurrent requests
+    - rate_limit: maximum requests started per second (None for no limit)
+    - max_retries: number of retries of a failed request
+    - backoff: delay before the first retry in seconds, doubled each retry
+    """
+    if provider is None:
+        provider = YahooProvider()
+
+    # Create directory if it doesn't exist
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Calculate start date
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=years*365)
+
+    plan, last_dates = plan_fetches(tickers, data_dir, start_date, end_date)
+
+    # One request per batch of tickers sharing a start date
+    requests = []
+    for fetch_start in sorted(plan):
+        group = plan[fetch_start]
+        for i in range(0, len(group), batch_size):
+            requests.append((datetime.combine(fetch_start, datetime.min.time()),
+                             group[i:i + batch_size]))
+
+    print(f"Fetching {sum(len(group) for group in plan.values())} tickers "
+          f"in {len(requests)} requests from {provider.name}...")
+
+    limiter = RateLimiter(rate_limit)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_download_batch, provider, batch, fetch_start, end_date,
+                            limiter, max_retries, backoff)
+            for fetch_start, batch in requests
+        ]
+
+        # Store in request order so the output is the same on every run
+        for (fetch_start, batch), future in zip(requests, futures):
+            if fetch_start.date() == start_date.date():
+                print(f"Fetching full {years}-year history from {start_date.date()} "
+                      f"to {end_date.date()}: {', '.join(batch)}")
+            else:
+                print(f"Fetching data from {fetch_start.date()} to {end_date.date()}: "
+                      f"{', '.join(batch)}")
+
+            try:
+                frames = future.result()
+            except Exception as e:
+                for ticker in batch:
+                    print(f"Error processing {ticker}: {str(e)}")
+                continue
+
+            for ticker in batch:
+                new_data = frames.get(ticker, pd.DataFrame())
+                with metrics.stage('store', ticker) as record:
+                    record['rows'] = len(new_data)
+                    try:
+                        store_ticker_data(ticker, new_data, last_dates[ticker],
+                                          ticker_path(data_dir, ticker))
+                    except Exception as e:
+                        record['ok'] = False
+                        print(f"Error processing {ticker}: {str(e)}")
+
     print("\nData fetch complete!")
 
 # Example usage
@@ -1,7 +1,9 @@
 import pandas as pd
 import os
+import metrics
+from storage import read_frame, write_frame
 
-def calculate_macd(df, column, fast=12, slow=26, signal=9):
+def calculate_macd(df, column, fast=12, slow=26, signal=9, ema_fast=None, ema_slow=None):
     """
     Calculate MACD (Moving Average Convergence Divergence)
     
@@ -11,12 +13,16 @@ def calculate_macd(df, column, fast=12, slow=26, signal=9):
     - fast: Fast EMA period (default 12)
     - slow: Slow EMA period (default 26)
     - signal: Signal line EMA period (default 9)
+    - ema_fast: Optional precomputed fast EMA Series (skips recalculation)
+    - ema_slow: Optional precomputed slow EMA Series (skips recalculation)
     
     Returns:
     - Tuple of (macd, signal_line, histogram)
     """
-    ema_fast = df[column].ewm(span=fast, adjust=False).mean()
-    ema_slow = df[column].ewm(span=slow, adjust=False).mean()
+    if ema_fast is None:
+        ema_fast = df[column].ewm(span=fast, adjust=False).mean()
+    if ema_slow is None:
+        ema_slow = df[column].ewm(span=slow, adjust=False).mean()
     macd = ema_fast - ema_slow
     signal_line = macd.ewm(span=signal, adjust=False).mean()
     histogram = macd - signal_line
@@ -35,37 +41,41 @@ def add_macd_to_file(csv_file, fast=12, slow=26, signal=9):
     Returns:
     - DataFrame with MACD columns added
     """
-    try:
-        print(f"Calculating MACD for {os.path.basename(csv_file)}...")
+    ticker = os.path.splitext(os.path.basename(csv_file))[0]
+    with metrics.stage('macd', ticker) as record:
+        try:
+            print(f"Calculating MACD for {os.path.basename(csv_file)}...")
         
-        # Read the CSV file
-        df = pd.read_csv(csv_file, header=[0, 1], index_col=0, parse_dates=True)
+            # Read the ticker data
+            df = read_frame(csv_file)
         
-        # Get the ticker symbol
-        ticker = df.columns[0][1]
+            # Get the ticker symbol
+            ticker = df.columns[0][1]
         
-        # Access the Close price column
-        close_col = ('Price', ticker) if 'Price' in df.columns.levels[0] else ('Close', ticker)
+            # Access the Close price column
+            close_col = ('Price', ticker) if 'Price' in df.columns.levels[0] else ('Close', ticker)
         
-        # Calculate MACD
-        macd, signal_line, histogram = calculate_macd(df, close_col, fast, slow, signal)
-        df[('MACD', ticker)] = macd
-        df[('MACD_Signal', ticker)] = signal_line
-        df[('MACD_Hist', ticker)] = histogram
+            # Calculate MACD
+            macd, signal_line, histogram = calculate_macd(df, close_col, fast, slow, signal)
+            df[('MACD', ticker)] = macd
+            df[('MACD_Signal', ticker)] = signal_line
+            df[('MACD_Hist', ticker)] = histogram
         
-        print(f"  ✓ MACD ({fast},{slow}) calculated")
-        print(f"  ✓ MACD Signal Line ({signal}) calculated")
-        print(f"  ✓ MACD Histogram calculated")
+            print(f"  ✓ MACD ({fast},{slow}) calculated")
+            print(f"  ✓ MACD Signal Line ({signal}) calculated")
+            print(f"  ✓ MACD Histogram calculated")
         
-        # Save back to the same file
-        df.to_csv(csv_file)
-        print(f"✓ {os.path.basename(csv_file)}: MACD indicators saved\n")
+            # Save back to the same file
+            write_frame(df, csv_file)
+            print(f"✓ {os.path.basename(csv_file)}: MACD indicators saved\n")
         
-        return df
+            record['rows'] = len(df)
+            return df
         
-    except Exception as e:
-        print(f"✗ Error processing {os.path.basename(csv_file)}: {str(e)}\n")
-        return None
+        except Exception as e:
+            record['ok'] = False
+            print(f"✗ Error processing {os.path.basename(csv_file)}: {str(e)}\n")
+            return None
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,308 @@
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+
+# ---------------------------
+# Per-stage performance metrics
+# ---------------------------
+# Hot paths are wrapped in metrics.stage(name, ticker), which records one
+# JSON line per call with:
+# - wall_s / cpu_s: elapsed and CPU time of the calling process
+# - rows: rows processed, when the caller sets record['rows']
+# - read_bytes / write_bytes: bytes the process read and wrote through
+#   system calls (from /proc/self/io, so None where that does not exist)
+# - peak_bytes: peak traced memory of the process while the stage ran
+#   (tracemalloc, only when memory tracing is on); max_rss_kb: process
+#   high-water mark
+#
+# Recording is off unless configure() was called (or the SIQRS_METRICS
+# environment variable is set), in which case stage() costs nothing but a
+# dict lookup. The settings live in environment variables so that worker
+# processes started by the process pools record into the same file; every
+# process appends whole lines to it. Time and I/O are per process, so with
+# a thread pool (load_data) concurrent stages see each other's I/O.
+#
+# With a profile directory, the outermost stage of every call stack is also
+# run under cProfile and dumped to <dir>/<stage>-<ticker>-<pid>.prof.
+#
+# export_prometheus() turns the records of one run into a Prometheus text
+# format file (node_exporter textfile collector layout).
+
+METRICS_ENV_VAR = 'SIQRS_METRICS'
+PROFILE_ENV_VAR = 'SIQRS_PROFILE'
+MEMORY_ENV_VAR = 'SIQRS_METRICS_MEMORY'
+RUN_ENV_VAR = 'SIQRS_METRICS_RUN'
+PROM_PREFIX = 'siqrs_stage'
+
+# Open stages of this process, innermost last: [peak bytes seen by children]
+_active = []
+
+
+def configure(path=None, profile_dir=None, trace_memory=False):
+    """
+    Turn metrics recording on for this process and the workers it starts
+
+    Parameters:
+    - path: JSON lines file the records are appended to (None: no records)
+    - profile_dir: Directory to write cProfile dumps to (None: no profiling)
+    - trace_memory: Record the peak allocated memory of every stage.
+      tracemalloc slows down allocation-heavy code, so it is opt-in.
+
+    Returns:
+    - Run id shared by every record of this run
+    """
+    run = uuid.uuid4().hex[:12]
+    settings = {
+        RUN_ENV_VAR: run,
+        # Absolute paths, so workers with another working directory agree
+        METRICS_ENV_VAR: os.path.abspath(path) if path else None,
+        PROFILE_ENV_VAR: os.path.abspath(profile_dir) if profile_dir else None,
+        MEMORY_ENV_VAR: '1' if trace_memory else None,
+    }
+    for name, value in settings.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    return run
+
+
+def _io_counters():
+    try:
+        with open('/proc/self/io', 'r') as f:
+            fields = dict(line.split(': ') for line in f.read().splitlines())
+        return int(fields['rchar']), int(fields['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _write_record(path, record):
+    # One write() per line; O_APPEND keeps lines of concurrent processes whole
+    line = json.dumps(record) + '\n'
+    with open(path, 'a') as f:
+        f.write(line)
+
+
+@contextlib.contextmanager
+def stage(name, ticker=None):
+    """
+    Measure one stage of work, optionally for one ticker
+
+    Yields a dict the caller may add fields to, e.g. record['rows'] = n,
+    or record['ok'] = False for a handled failure. An exception leaving the
+    block is recorded as ok=False and re-raised.
+    """
+    path = os.environ.get(METRICS_ENV_VAR)
+    profile_dir = os.environ.get(PROFILE_ENV_VAR)
+    if not path and not profile_dir:
+        yield {}
+        return
+
+    trace_memory = bool(os.environ.get(MEMORY_ENV_VAR))
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if _active:
+            # Keep the enclosing stage's peak so far before resetting it
+            _active[-1][0] = max(_active[-1][0], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    # cProfile cannot nest; only the outermost stage is profiled
+    profiler = cProfile.Profile() if profile_dir and not _active else None
+    _active.append([0])
+
+    record = {'stage': name, 'ticker': ticker, 'rows': None}
+    read_start, write_start = _io_counters()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    ok = True
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        read_end, write_end = _io_counters()
+        children_peak = _active.pop()[0]
+
+        peak = None
+        if trace_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], children_peak)
+            if _active:
+                _active[-1][0] = max(_active[-1][0], peak)
+            tracemalloc.reset_peak()
+
+        record.update({
+            'run': os.environ.get(RUN_ENV_VAR),
+            'time': time.time(),
+            'pid': os.getpid(),
+            'ok': ok and record.get('ok', True),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'read_bytes': None if read_start is None else read_end - read_start,
+            'write_bytes': None if write_start is None else write_end - write_start,
+            'peak_bytes': peak,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        })
+
+        if path:
+            _write_record(path, record)
+        if profiler is not None:
+            label = name if ticker is None else f'{name}-{ticker}'
+            profiler.dump_stats(os.path.join(profile_dir, f'{label}-{os.getpid()}.prof'))
+
+
+# ---------------------------
+# Export
+# ---------------------------
+def load_records(path, run=None):
+    """
+    Read metric records from a JSON lines file
+
+    Parameters:
+    - path: JSON lines file written by stage()
+    - run: Run id to select (default: the run of the last record)
+
+    Returns:
+    - List of record dicts
+    """
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A line cut short by a crash
+                continue
+    if run is None and records:
+        run = records[-1].get('run')
+    return [r for r in records if r.get('run') == run]
+
+
+def aggregate(records):
+    """
+    Sum records per (stage, ticker): times, rows and bytes add up, peak
+    memory is the maximum
+
+    Returns:
+    - Dict of (stage, ticker) -> aggregated record
+    """
+    totals = {}
+    for r in records:
+        key = (r['stage'], r.get('ticker'))
+        t = totals.setdefault(key, {'calls': 0, 'failures': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                    'rows': 0, 'read_bytes': 0, 'write_bytes': 0,
+                                    'peak_bytes': None})
+        t['calls'] += 1
+        t['failures'] += 0 if r.get('ok', True) else 1
+        for field in ('wall_s', 'cpu_s', 'rows', 'read_bytes', 'write_bytes'):
+            t[field] += r.get(field) or 0
+        if r.get('peak_bytes') is not None:
+            t['peak_bytes'] = max(t['peak_bytes'] or 0, r['peak_bytes'])
+    return totals
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def export_prometheus(records, prom_path):
+    """
+    Write aggregated records as a Prometheus text format file
+
+    One gauge family per measure, labelled by stage and ticker (ticker=""
+    for stages that cover the whole universe).
+    """
+    totals = aggregate(records)
+    families = [
+        ('wall_seconds', 'wall_s', 'Wall clock time spent in the stage'),
+        ('cpu_seconds', 'cpu_s', 'CPU time spent in the stage'),
+        ('rows', 'rows', 'Rows processed by the stage'),
+        ('read_bytes', 'read_bytes', 'Bytes read by the stage'),
+        ('write_bytes', 'write_bytes', 'Bytes written by the stage'),
+        ('peak_memory_bytes', 'peak_bytes', 'Peak traced memory while the stage ran'),
+        ('calls', 'calls', 'Number of times the stage ran'),
+        ('failures', 'failures', 'Number of times the stage failed'),
+    ]
+
+    lines = []
+    for suffix, field, help_text in families:
+        metric = f'{PROM_PREFIX}_{suffix}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} gauge')
+        for (name, ticker), t in sorted(totals.items(), key=lambda kv: (kv[0][0], kv[0][1] or '')):
+            if t[field] is None:
+                continue
+            lines.append(f'{metric}{{stage="{_label(name)}",ticker="{_label(ticker or "")}"}} {t[field]}')
+
+    os.makedirs(os.path.dirname(os.path.abspath(prom_path)), exist_ok=True)
+    # A temporary name of its own, so concurrent exporters never share one
+    tmp_path = f'{prom_path}.{os.getpid()}.{uuid.uuid4().hex[:12]}.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, prom_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def print_report(records, top=10):
+    """
+    Print wall time per stage and the slowest (stage, ticker) pairs
+    """
+    totals = aggregate(records)
+
+    per_stage = {}
+    for (name, _), t in totals.items():
+        per_stage[name] = per_stage.get(name, 0.0) + t['wall_s']
+
+    print(f"{'Stage':<16} {'Wall (s)':>10}")
+    for name, wall in sorted(per_stage.items(), key=lambda kv: -kv[1]):
+        print(f"{name:<16} {wall:>10.3f}")
+
+    print(f"\nSlowest {top}:")
+    slowest = sorted(totals.items(), key=lambda kv: -kv[1]['wall_s'])[:top]
+    for (name, ticker), t in slowest:
+        rows = t['rows'] or '-'
+        print(f"  {name:<16} {ticker or '*':<8} {t['wall_s']:>9.3f}s  rows {rows}")
+
+
+# Example usage
+if __name__ == "__main__":
+    # python start.py --metrics metrics/run.jsonl run
+    # python metrics.py metrics/run.jsonl --prom metrics/siqrs.prom
+    parser = argparse.ArgumentParser(description="Summarize and export recorded stage metrics")
+    parser.add_argument("path", help="JSON lines file written by the stages")
+    parser.add_argument("--run", help="Run id (default: the latest run)")
+    parser.add_argument("--prom", help="Prometheus text file to write")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    records = load_records(args.path, args.run)
+    if not records:
+        print(f"No records in {args.path}")
+        sys.exit(1)
+    print_report(records, args.top)
+    if args.prom:
+        export_prometheus(records, args.prom)
+        print(f"\n✓ Prometheus metrics saved to {args.prom}")
@@ -0,0 +1,417 @@
+import numpy as np
+import pandas as pd
+from storage import list_tickers, read_arrays, storage_dtype, ticker_path
+
+# ---------------------------
+# Cross-ticker panel engine
+# ---------------------------
+# A panel is a DataFrame of dates x tickers holding one field (e.g. Close)
+# for the whole universe, aligned on the union of all trading dates. A NaN
+# means "no bar for this ticker on this date" (e.g. before JEPQ existed),
+# so every ticker column is calculated over its own bars only and matches
+# ema_calc / macd_calc / rsi_calc run on that ticker alone, bit for bit.
+#
+# The kernels below loop over time once and update every ticker at each
+# step with NumPy vector operations, following the exact arithmetic of
+# pandas' ewm(adjust=False) and rolling().mean() implementations.
+#
+# Panels are float64 unless data is stored in compact mode
+# (STOCK_DATA_PRECISION=float32), in which case they are loaded as float32
+# and the indicators are calculated and returned in float32 too, halving
+# their memory traffic. Running sums and averaging weights stay float64.
+# precision_check.py measures what that does to the signals.
+
+
+def load_panel(data_dir='stock_data', column='Close', tickers=None, dtype=None):
+    """
+    Load one column of every ticker into an aligned dates x tickers panel
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - column: Field to load (e.g. 'Close', 'EMA_12')
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - dtype: Float dtype of the panel (default: the storage precision)
+
+    Returns:
+    - DataFrame indexed by Date with one float column per ticker
+    """
+    return load_panels(data_dir, [column], tickers, dtype)[column]
+
+
+def load_panels(data_dir='stock_data', columns=['Close'], tickers=None, dtype=None):
+    """
+    Load several columns of every ticker into aligned panels, reading each
+    ticker once
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - columns: Fields to load (e.g. ['Close', 'EMA_12', 'EMA_26'])
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - dtype: Float dtype of the panels (default: the storage precision)
+
+    Returns:
+    - Dict of column -> DataFrame indexed by Date with one float column per
+      ticker; all panels share the same dates
+    """
+    if tickers is None:
+        tickers = list_tickers(data_dir)
+    if dtype is None:
+        dtype = storage_dtype()
+
+    series = {column: {} for column in columns}
+    for ticker in tickers:
+        index, arrays = read_arrays(ticker_path(data_dir, ticker), columns=columns)
+        index = pd.DatetimeIndex(index)
+        for column in columns:
+            series[column][ticker] = pd.Series(np.asarray(arrays[column], dtype=dtype),
+                                               index=index)
+
+    panels = {}
+    for column in columns:
+        panel = pd.DataFrame(series[column], columns=list(tickers)).sort_index()
+        panel.index.name = 'Date'
+        panels[column] = panel
+    return panels
+
+
+class _Layout:
+    """
+    Working layout of a panel for the indicator kernels
+
+    The kernels need each ticker's bars to be one contiguous run of rows.
+    That is already the case for shorter histories (leading NaN) and
+    delisted tickers (trailing NaN), so those panels are used as is. Panels
+    with gaps inside a history are compacted: each column's valid values
+    are moved to the top and the results scattered back afterwards.
+    """
+
+    def __init__(self, values):
+        # Row-major so each time step is a contiguous vector of tickers;
+        # float32 panels stay float32
+        dtype = np.float32 if values.dtype == np.float32 else np.float64
+        values = np.ascontiguousarray(values, dtype=dtype)
+        n_rows, n_cols = values.shape
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        first = np.where(counts > 0, valid.argmax(axis=0), n_rows)
+        last = n_rows - 1 - valid[::-1].argmax(axis=0)
+        contiguous = np.all((counts == 0) | (last - first + 1 == counts))
+
+        self.valid = valid
+        self.scatter = None
+
+        if contiguous:
+            self.values = values
+            self.first = first
+            return
+
+        rank = np.cumsum(valid, axis=0) - 1
+        source = np.flatnonzero(valid)
+        target = rank.ravel()[source] * n_cols + source % n_cols
+
+        compact = np.full(values.shape, np.nan, dtype=dtype)
+        compact.ravel()[target] = values.ravel()[source]
+        self.values = compact
+        self.first = np.where(counts > 0, 0, n_rows)
+        self.scatter = (source, target)
+
+    def mask_warmup(self, result, periods):
+        """Blank the first periods - 1 bars of every ticker."""
+        rows = np.arange(result.shape[0])[:, None]
+        result[rows < self.first + periods - 1] = np.nan
+        return result
+
+    def expand(self, result):
+        """Map a result from the working layout back onto the panel."""
+        if self.scatter is None:
+            result[~self.valid] = np.nan
+            return result
+
+        source, target = self.scatter
+        out = np.full(result.shape, np.nan, dtype=result.dtype)
+        out.ravel()[source] = result.ravel()[target]
+        return out
+
+
+def _ewm(values, span):
+    """
+    ewm(span=span, adjust=False).mean() down every column
+
+    Mirrors pandas' ewm kernel. Each column is NaN until its first
+    observation and then a contiguous run of observations, so the old
+    weight is always 1 before it decays by (1 - alpha); NaN after the run
+    propagates and is blanked by the layout.
+    """
+    com = (span - 1) / 2.0
+    alpha = 1. / (1. + com)
+    old_wt = 1. * (1. - alpha)
+    new_wt = alpha
+    total_wt = old_wt + new_wt
+
+    n_rows, n_cols = values.shape
+    out = np.empty_like(values)
+    out[0] = values[0]
+
+    # Rows up to the latest first observation still need the start check
+    observed = ~np.isnan(values)
+    last_start = np.max(observed.argmax(axis=0), initial=0)
+    starting = np.empty(n_cols, dtype=bool)
+
+    blended = np.empty(n_cols)
+    scaled = np.empty(n_cols)
+    changed = np.empty(n_cols, dtype=bool)
+
+    for i in range(1, n_rows):
+        weighted = out[i - 1]
+        cur = values[i]
+        row = out[i]
+        row[:] = weighted
+
+        np.multiply(weighted, old_wt, out=blended)
+        np.multiply(cur, new_wt, out=scaled)
+        np.add(blended, scaled, out=blended)
+        np.divide(blended, total_wt, out=blended)
+
+        # pandas leaves the average untouched when the value equals it
+        np.not_equal(weighted, cur, out=changed)
+        np.copyto(row, blended, where=changed)
+
+        if i <= last_start:
+            # The first observation of a ticker starts its average
+            np.isnan(weighted, out=starting)
+            np.copyto(row, cur, where=starting)
+
+    return out
+
+
+def _rolling_mean(values, window):
+    """
+    rolling(window).mean() down every column of a NaN-free array
+
+    Mirrors pandas' running-sum kernel, including its Kahan compensation
+    and its handling of windows made of a single repeated value.
+    """
+    n_rows, n_cols = values.shape
+    out = np.full_like(values, np.nan)
+
+    neg_ct = np.zeros(n_cols, dtype=np.int64)
+    sum_x = np.zeros(n_cols)
+    compensation_add = np.zeros(n_cols)
+    compensation_remove = np.zeros(n_cols)
+    same_ct = np.zeros(n_cols, dtype=np.int64)
+    prev_value = values[0]
+    negative = np.signbit(values)
+
+    y = np.empty(n_cols)
+    t = np.empty(n_cols)
+    mask = np.empty(n_cols, dtype=bool)
+    clamp = np.empty(n_cols, dtype=bool)
+
+    for i in range(n_rows):
+        # Remove the value leaving the window
+        if i >= window:
+            np.negative(values[i - window], out=y)
+            np.subtract(y, compensation_remove, out=y)
+            np.add(sum_x, y, out=t)
+            np.subtract(t, sum_x, out=compensation_remove)
+            np.subtract(compensation_remove, y, out=compensation_remove)
+            sum_x, t = t, sum_x
+            neg_ct -= negative[i - window]
+
+        # Add the value entering the window
+        val = values[i]
+        np.subtract(val, compensation_add, out=y)
+        np.add(sum_x, y, out=t)
+        np.subtract(t, sum_x, out=compensation_add)
+        np.subtract(compensation_add, y, out=compensation_add)
+        sum_x, t = t, sum_x
+        neg_ct += negative[i]
+
+        same_ct += 1
+        np.not_equal(val, prev_value, out=mask)
+        np.copyto(same_ct, 1, where=mask)
+        prev_value = val
+
+        nobs = min(i + 1, window)
+        if nobs < window:
+            continue
+
+        result = out[i]
+        np.divide(sum_x, nobs, out=result)
+        np.equal(neg_ct, 0, out=mask)
+        np.less(result, 0, out=clamp)
+        np.logical_and(mask, clamp, out=mask)
+        np.copyto(result, 0., where=mask)
+        np.equal(neg_ct, nobs, out=mask)
+        np.greater(result, 0, out=clamp)
+        np.logical_and(mask, clamp, out=mask)
+        np.copyto(result, 0., where=mask)
+        np.greater_equal(same_ct, nobs, out=mask)
+        np.copyto(result, val, where=mask)
+
+    return out
+
+
+def _rsi(layout, period):
+    values = layout.values
+    delta = np.full_like(values, np.nan)
+    np.subtract(values[1:], values[:-1], out=delta[1:])
+
+    # Same values as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0):
+    # fmax/fmin turn the NaN first delta into 0 and losses of non-negative
+    # moves are -0.0
+    gain = np.fmax(delta, 0.)
+    loss = np.fmin(delta, 0., out=delta)
+    np.negative(loss, out=loss)
+
+    avg_gain = _rolling_mean(gain, period)
+    avg_loss = _rolling_mean(loss, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.divide(avg_gain, avg_loss, out=avg_gain)
+        np.add(1, rsi, out=rsi)
+        np.divide(100, rsi, out=rsi)
+        np.subtract(100, rsi, out=rsi)
+
+    # A ticker's first period - 1 bars have no complete window
+    return layout.mask_warmup(rsi, period)
+
+
+def _as_panel(values, like):
+    return pd.DataFrame(values, index=like.index, columns=like.columns, copy=False)
+
+
+def calculate_ema_panel(panel, period):
+    """
+    Calculate the EMA of every ticker in a panel
+
+    Parameters:
+    - panel: DataFrame of dates x tickers (e.g. from load_panel)
+    - period: Number of periods for EMA calculation
+
+    Returns:
+    - DataFrame of EMA values, NaN where a ticker has no bar
+    """
+    layout = _Layout(panel.to_numpy())
+    return _as_panel(layout.expand(_ewm(layout.values, period)), panel)
+
+
+def calculate_macd_panel(panel, fast=12, slow=26, signal=9):
+    """
+    Calculate MACD of every ticker in a panel
+
+    Parameters:
+    - panel: DataFrame of dates x tickers
+    - fast: Fast EMA period (default 12)
+    - slow: Slow EMA period (default 26)
+    - signal: Signal line EMA period (default 9)
+
+    Returns:
+    - Tuple of (macd, signal_line, histogram) panels
+    """
+    results = calculate_indicators_panel(panel, ema_periods=[], macd_fast=fast,
+                                         macd_slow=slow, macd_signal=signal,
+                                         rsi_period=None)
+    return results['MACD'], results['MACD_Signal'], results['MACD_Hist']
+
+
+def calculate_rsi_panel(panel, period=14):
+    """
+    Calculate the RSI of every ticker in a panel
+
+    Parameters:
+    - panel: DataFrame of dates x tickers
+    - period: Number of periods for RSI calculation (default 14)
+
+    Returns:
+    - DataFrame of RSI values, NaN where a ticker has no bar
+    """
+    layout = _Layout(panel.to_numpy())
+    return _as_panel(layout.expand(_rsi(layout, period)), panel)
+
+
+def calculate_indicators_panel(panel, ema_periods=[12, 26, 50, 200],
+                               macd_fast=12, macd_slow=26, macd_signal=9,
+                               rsi_period=14):
+    """
+    Calculate EMA, MACD and RSI for every ticker of a panel in one pass
+
+    The panel's working layout is prepared once and every indicator is
+    calculated on it; MACD reuses the EMAs of ema_periods.
+
+    Parameters:
+    - panel: DataFrame of dates x tickers (e.g. from load_panel)
+    - ema_periods: List of EMA periods to calculate
+    - macd_fast: MACD fast EMA period (None to skip MACD)
+    - macd_slow: MACD slow EMA period
+    - macd_signal: MACD signal line period
+    - rsi_period: RSI period (None to skip RSI)
+
+    Returns:
+    - Dict of indicator name (e.g. 'EMA_12', 'MACD_Hist') -> panel
+    """
+    layout = _Layout(panel.to_numpy())
+    close = layout.values
+
+    emas = {}
+    results = {}
+    for period in ema_periods:
+        emas[period] = _ewm(close, period)
+        results[f'EMA_{period}'] = emas[period]
+
+    if macd_fast is not None:
+        ema_fast = emas[macd_fast] if macd_fast in emas else _ewm(close, macd_fast)
+        ema_slow = emas[macd_slow] if macd_slow in emas else _ewm(close, macd_slow)
+        macd = ema_fast - ema_slow
+        signal_line = _ewm(macd, macd_signal)
+        results['MACD'] = macd
+        results['MACD_Signal'] = signal_line
+        results['MACD_Hist'] = macd - signal_line
+
+    if rsi_period is not None:
+        results[f'RSI_{rsi_period}'] = _rsi(layout, rsi_period)
+
+    return {name: _as_panel(layout.expand(values), panel)
+            for name, values in results.items()}
+
+
+def _indicators_block(frames, params):
+    return calculate_indicators_panel(frames['Close'], **params)
+
+
+def calculate_universe_indicators(data_dir='stock_data', tickers=None, workers=1, **params):
+    """
+    Calculate EMA, MACD and RSI panels of every ticker in a data directory
+
+    With workers > 1 the close panel is loaded once into a shared_panel
+    and the tickers are split across worker processes that map it; every
+    ticker is calculated on its own bars, so the result is the same as in
+    a single process.
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - workers: Number of worker processes
+    - params: Indicator parameters, see calculate_indicators_panel
+
+    Returns:
+    - Dict of indicator name (e.g. 'EMA_12', 'MACD_Hist') -> panel
+    """
+    if workers <= 1:
+        return calculate_indicators_panel(load_panel(data_dir, 'Close', tickers), **params)
+
+    # Imported here because shared_panel loads its panels with this module
+    from shared_panel import load_shared_panels, map_blocks
+
+    with load_shared_panels(data_dir, ['Close'], tickers) as shared:
+        chunk = -(-len(shared.tickers) // workers)
+        blocks = map_blocks(_indicators_block, shared, ['Close'], args=(params,),
+                            workers=workers, chunk_tickers=chunk)
+    return {name: pd.concat([block[name] for block in blocks], axis=1) for name in blocks[0]}
+
+
+# Example usage
+if __name__ == "__main__":
+    close = load_panel('stock_data', column='Close')
+    indicators = calculate_indicators_panel(close)
+    print(f"Panel: {close.shape[0]} dates x {close.shape[1]} tickers")
+    print(indicators['RSI_14'].tail())
@@ -0,0 +1,367 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import metrics
+from event_index import EventIndex
+from generate_signals import (load_render_manifest, plot_params_key, process_ticker,
+                              save_render_manifest)
+from indicator_cache import DEFAULT_MAX_BYTES, IndicatorCache
+from indicators_main import _process_ticker
+from storage import list_tickers, replace_file, stat_signature, ticker_path
+
+# ---------------------------
+# Pipeline orchestrator
+# ---------------------------
+# Runs the daily workflow as a dependency graph and rebuilds only stale
+# outputs, make-style:
+#
+#   fetch -> indicators -> signals          (per ticker)
+#                       -> day_of_week      (per ticker, SPY only)
+#                       -> events           (event index, incremental)
+#                       -> seasonality      (whole universe)
+#
+# For every stage and ticker the inputs the output was built from are
+# recorded in <data_dir>/.pipeline_state.json: the stage parameters and
+# the stat signature of the ticker's stored data. A stage is stale when
+# its recorded inputs differ from the current ones or one of its output
+# files is missing. Inputs are recorded after the stage ran, so a stage
+# that rewrites the data (indicators) is not stale on the next run, while
+# every stage below it sees the new signature and rebuilds.
+#
+# The stages of one ticker run in order in one task; independent tickers
+# run concurrently in a process pool. Fetching is already incremental
+# (only missing days are downloaded) and always runs first.
+
+STOCK_DATA_DIR = 'stock_data'
+SIGNALS_DIR = 'signals'
+CONFIG_FILE = 'config/tickers.json'
+PIPELINE_STATE = '.pipeline_state.json'
+INDICATOR_PARAMS = {
+    'ema_periods': [12, 26, 50, 200],
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'rsi_period': 14,
+}
+DAY_OF_WEEK_TICKERS = ['SPY']
+LOOKBACK_DAYS = 365
+RESAMPLES = 20000
+
+
+def _params_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class Stage:
+    """
+    One per-ticker step of the pipeline
+
+    Subclasses implement run() and may narrow applies(), params() and
+    outputs(), and implement finish(). config is the plain dict built by
+    run_pipeline(), so stages can be sent to worker processes.
+    """
+
+    name = None
+
+    def applies(self, ticker, config):
+        return True
+
+    def params(self, config):
+        return {}
+
+    def outputs(self, ticker, config):
+        return []
+
+    def inputs(self, ticker, config):
+        return {
+            'params': _params_key(self.params(config)),
+            'data': stat_signature(ticker_path(config['data_dir'], ticker)),
+        }
+
+    def is_stale(self, ticker, record, config):
+        if record is None or record != self.inputs(ticker, config):
+            return True
+        return not all(os.path.exists(path) for path in self.outputs(ticker, config))
+
+    def run(self, ticker, config):
+        """
+        Returns:
+        - Tuple of (success flag, message, result passed to finish() or None)
+        """
+        raise NotImplementedError
+
+    def finish(self, results, config):
+        """
+        Record the results of the tickers the stage ran for; called once
+        per pipeline run in the main process
+
+        Parameters:
+        - results: Dict of ticker -> result returned by run()
+        """
+
+
+class IndicatorStage(Stage):
+    name = 'indicators'
+
+    def params(self, config):
+        return config['indicator_params']
+
+    def run(self, ticker, config):
+        _, ok, output = _process_ticker(
+            f'{ticker}.csv', ticker_path(config['data_dir'], ticker),
+            config['indicator_params'], capture=True,
+            cache_max_bytes=config['cache_max_bytes'])
+        return ok, output.rstrip('\n'), None
+
+
+class SignalStage(Stage):
+    name = 'signals'
+
+    def params(self, config):
+        # The same key generate_signals records, so either can skip the
+        # charts the other rendered
+        return {'plot_params': plot_params_key(pd.Timestamp(config['start_date']))}
+
+    def outputs(self, ticker, config):
+        return [os.path.join(config['signals_dir'], f'{ticker}_signals.png')]
+
+    def run(self, ticker, config):
+        os.makedirs(config['signals_dir'], exist_ok=True)
+        with metrics.stage(self.name, ticker):
+            _, entry, message = process_ticker(
+                ticker, pd.Timestamp(config['start_date']), force=True,
+                data_dir=config['data_dir'], signals_dir=config['signals_dir'])
+        return True, message or f'{ticker}: no bars in the lookback window', entry
+
+    def finish(self, results, config):
+        # Workers only return their entries; the manifest is written here,
+        # so the next generate_signals run keeps these charts
+        entries = {ticker: entry for ticker, entry in results.items() if entry is not None}
+        if entries:
+            manifest = load_render_manifest(config['signals_dir'])
+            manifest.update(entries)
+            save_render_manifest(manifest, config['signals_dir'])
+
+
+class DayOfWeekStage(Stage):
+    name = 'day_of_week'
+
+    def applies(self, ticker, config):
+        return ticker in config['day_of_week_tickers']
+
+    def outputs(self, ticker, config):
+        return [os.path.join(config['signals_dir'], f'{ticker}_day_analysis.png')]
+
+    def run(self, ticker, config):
+        from rising_falling import analyze_day_of_week_drops
+        os.makedirs(config['signals_dir'], exist_ok=True)
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer), metrics.stage(self.name, ticker) as record:
+            ok = analyze_day_of_week_drops(ticker_path(config['data_dir'], ticker),
+                                           config['signals_dir'])
+            record['ok'] = ok
+        return ok, buffer.getvalue().strip('\n'), None
+
+
+TICKER_STAGES = [IndicatorStage(), SignalStage(), DayOfWeekStage()]
+
+
+def _run_ticker(ticker, stages, records, config):
+    """
+    Run the stale stages of one ticker in dependency order
+
+    Returns:
+    - Tuple of (ticker, dict of stage name -> new record, dict of stage
+      name -> result of run(), list of messages, name of the stage that
+      failed or None)
+    """
+    updated = {}
+    outputs = {}
+    messages = []
+    for stage in stages:
+        if not stage.applies(ticker, config):
+            continue
+        if not stage.is_stale(ticker, records.get(stage.name), config):
+            continue
+
+        try:
+            ok, message, output = stage.run(ticker, config)
+        except Exception as e:
+            ok, message, output = False, f"✗ {ticker}: {stage.name} error - {str(e)}", None
+        if message:
+            messages.append(message)
+        if not ok:
+            # Later stages would be built from stale inputs
+            return ticker, updated, outputs, messages, stage.name
+
+        updated[stage.name] = stage.inputs(ticker, config)
+        outputs[stage.name] = output
+    return ticker, updated, outputs, messages, None
+
+
+# ---------------------------
+# Pipeline state
+# ---------------------------
+def load_state(data_dir=STOCK_DATA_DIR):
+    path = os.path.join(data_dir, PIPELINE_STATE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state, data_dir=STOCK_DATA_DIR):
+    def dump(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+    replace_file(os.path.join(data_dir, PIPELINE_STATE), dump)
+
+
+def _seasonality_inputs(tickers, config):
+    return {
+        'params': _params_key({'resamples': config['resamples']}),
+        'data': {t: stat_signature(ticker_path(config['data_dir'], t)) for t in tickers},
+    }
+
+
+def run_pipeline(data_dir=STOCK_DATA_DIR, signals_dir=SIGNALS_DIR, fetch=True,
+                 config_file=CONFIG_FILE, workers=1, force=False, seasonality=True,
+                 indicator_params=INDICATOR_PARAMS, resamples=RESAMPLES,
+                 cache_max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Bring every output of the workflow up to date, rebuilding only stale ones
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - signals_dir: Directory charts and the seasonality CSV are written to
+    - fetch: Download new bars for the tickers of config_file first
+    - config_file: JSON file with the tickers to fetch
+    - workers: Number of worker processes; tickers are independent
+    - force: Rebuild every output regardless of the recorded state
+    - seasonality: Include the universe seasonality stage
+    - indicator_params: Parameters passed to the indicators stage
+    - resamples: Permutation resamples of the seasonality stage
+    - cache_max_bytes: Size the indicator cache is trimmed to
+
+    Returns:
+    - Dict of stage name -> sorted list of tickers (or ['*'] for universe
+      stages) that were rebuilt
+    """
+    started = time.perf_counter()
+
+    if fetch:
+        from load_data import fetch_and_store_ticker_data, load_tickers_from_json
+        tickers = load_tickers_from_json(config_file)
+        if tickers:
+            fetch_and_store_ticker_data(tickers, data_dir=data_dir)
+
+    start_date = pd.Timestamp.today().normalize() - pd.Timedelta(days=LOOKBACK_DAYS)
+    config = {
+        'data_dir': data_dir,
+        'signals_dir': signals_dir,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'indicator_params': indicator_params,
+        'day_of_week_tickers': DAY_OF_WEEK_TICKERS,
+        'resamples': resamples,
+        'cache_max_bytes': cache_max_bytes,
+    }
+
+    state = {} if force else load_state(data_dir)
+    tickers = list_tickers(data_dir)
+
+    # Only tickers with at least one stale stage are dispatched
+    jobs = []
+    for ticker in tickers:
+        records = {name: stage_state.get(ticker) for name, stage_state in state.items()}
+        if any(stage.applies(ticker, config) and
+               stage.is_stale(ticker, records.get(stage.name), config)
+               for stage in TICKER_STAGES):
+            jobs.append((ticker, TICKER_STAGES, records, config))
+
+    print(f"Pipeline: {len(jobs)}/{len(tickers)} tickers stale")
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_ticker, *job) for job in jobs]
+            results = [future.result() for future in futures]
+    else:
+        results = [_run_ticker(*job) for job in jobs]
+
+    rebuilt = {stage.name: [] for stage in TICKER_STAGES}
+    stage_results = {stage.name: {} for stage in TICKER_STAGES}
+    for ticker, updated, outputs, messages, failed in results:
+        for message in messages:
+            print(message)
+        for name, record in updated.items():
+            state.setdefault(name, {})[ticker] = record
+            rebuilt[name].append(ticker)
+            stage_results[name][ticker] = outputs[name]
+        if failed is not None:
+            # Force the failed stage and everything below it to run again
+            for stage in TICKER_STAGES[[s.name for s in TICKER_STAGES].index(failed):]:
+                state.get(stage.name, {}).pop(ticker, None)
+
+    # Drop records of tickers that are no longer stored
+    for stage_state in state.values():
+        for ticker in [t for t in stage_state if t not in tickers and t != '*']:
+            del stage_state[ticker]
+
+    for stage in TICKER_STAGES:
+        if stage_results[stage.name]:
+            stage.finish(stage_results[stage.name], config)
+
+    if cache_max_bytes is not None and rebuilt['indicators']:
+        IndicatorCache.for_data_dir(data_dir, cache_max_bytes).evict()
+
+    save_state(state, data_dir)
+
+    # The event index keeps its own per-ticker state and only reads new bars
+    with metrics.stage('events'):
+        added = EventIndex(data_dir, rebuild=force).update()
+    if added:
+        print(f"✓ Event index: {sum(added.values())} events from {len(added)} tickers")
+    rebuilt['events'] = list(added)
+
+    if seasonality and tickers:
+        output = os.path.join(signals_dir, 'seasonality.csv')
+        inputs = _seasonality_inputs(tickers, config)
+        record = state.get('seasonality', {}).get('*')
+        rebuilt['seasonality'] = []
+        if record != inputs or not os.path.exists(output):
+            from seasonality import analyze_universe
+            os.makedirs(signals_dir, exist_ok=True)
+            analyze_universe(data_dir, tickers, resamples=resamples).to_csv(output)
+            print(f"✓ Seasonality saved to {output}")
+            state.setdefault('seasonality', {})['*'] = inputs
+            rebuilt['seasonality'] = ['*']
+            save_state(state, data_dir)
+
+    elapsed = time.perf_counter() - started
+    summary = ', '.join(f"{name}: {len(items)}" for name, items in rebuilt.items())
+    print(f"Pipeline done in {elapsed:.1f}s (rebuilt {summary})")
+    return {name: sorted(items) for name, items in rebuilt.items()}
+
+
+# Example usage
+if __name__ == "__main__":
+    # python pipeline.py              -> fetch, then rebuild stale outputs
+    # python pipeline.py --no-fetch   -> only rebuild from stored data
+    parser = argparse.ArgumentParser(description="Rebuild stale indicators, charts and statistics")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--signals-dir", default=SIGNALS_DIR)
+    parser.add_argument("--no-fetch", action="store_true")
+    parser.add_argument("--force", action="store_true", help="Rebuild every output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    run_pipeline(args.data_dir, args.signals_dir, fetch=not args.no_fetch,
+                 workers=args.workers, force=args.force)
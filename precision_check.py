@@ -0,0 +1,119 @@
+import argparse
+import numpy as np
+import pandas as pd
+from panel_calc import calculate_indicators_panel, load_panel
+from signal_calc import detect_ema_crossovers
+
+# ---------------------------
+# Compact precision check
+# ---------------------------
+# Compact mode (STOCK_DATA_PRECISION=float32, see storage.py) stores and
+# calculates in float32. This check runs the panel engine on the same
+# close prices in float64 and in float32 and reports, per ticker:
+# - the largest indicator differences (EMA and MACD relative to the price,
+#   RSI in points)
+# - how many EMA 12/26 crossover events differ, over the whole history
+# - whether the latest signal of the lookback window differs
+#
+# The per-ticker indicator path (indicators_main, indicators_incremental)
+# calculates in float64 and rounds the columns to float32 when it writes
+# them, so the signals read back from storage come from rounded EMAs. That
+# rounding can flip a near tie on its own; the "stored" columns report the
+# crossovers of the float64 EMAs rounded to float32.
+#
+# Run it on float64 data (before migrating) to see what compact mode would
+# change.
+
+STOCK_DATA_DIR = 'stock_data'
+LOOKBACK_DAYS = 365
+
+
+def _latest_signals(bullish, bearish, start_date):
+    # Same rule as determine_latest_signal: the later of the last bullish and
+    # the last bearish cross inside the window, Neutral without a cross
+    window = (bullish.index >= start_date)[:, None]
+    rows = np.arange(len(bullish))[:, None]
+    last_bullish = np.where(bullish.to_numpy() & window, rows, -1).max(axis=0)
+    last_bearish = np.where(bearish.to_numpy() & window, rows, -1).max(axis=0)
+    return np.select([last_bullish > last_bearish, last_bearish > last_bullish],
+                     ['Bullish', 'Bearish'], 'Neutral')
+
+
+def compare_precision(data_dir=STOCK_DATA_DIR, tickers=None, as_of=None,
+                      lookback_days=LOOKBACK_DAYS):
+    """
+    Measure how float32 calculation changes indicators and signals
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - as_of: Date the lookback window ends on (default: today)
+    - lookback_days: Length of the latest-signal window in calendar days
+
+    Returns:
+    - DataFrame indexed by ticker with the float64, float32 and stored
+      (float64 rounded to float32) latest signals, crossover event counts
+      and differences, and the maximum indicator errors
+    """
+    close64 = load_panel(data_dir, 'Close', tickers, dtype=np.float64)
+    close32 = close64.astype(np.float32)
+
+    results = {}
+    for name, close in (('float64', close64), ('float32', close32)):
+        results[name] = calculate_indicators_panel(close)
+
+    # What the stored columns hold after a float64 calculation
+    stored = {name: results['float64'][name].astype(np.float32).astype(np.float64)
+              for name in ('EMA_12', 'EMA_26')}
+
+    today = pd.Timestamp.today() if as_of is None else pd.Timestamp(as_of)
+    start_date = today.normalize() - pd.Timedelta(days=lookback_days)
+
+    crosses = {name: detect_ema_crossovers(ind) for name, ind in results.items()}
+    bullish64, bearish64 = crosses['float64']
+    bullish32, bearish32 = crosses['float32']
+    bullish_stored, bearish_stored = detect_ema_crossovers(stored)
+
+    report = pd.DataFrame(index=close64.columns)
+    report.index.name = 'ticker'
+    report['signal_float64'] = _latest_signals(bullish64, bearish64, start_date)
+    report['signal_float32'] = _latest_signals(bullish32, bearish32, start_date)
+    report['signal_stored'] = _latest_signals(bullish_stored, bearish_stored, start_date)
+    report['events'] = (bullish64 | bearish64).sum()
+    report['event_diffs'] = ((bullish64 != bullish32) | (bearish64 != bearish32)).sum()
+    report['event_diffs_stored'] = ((bullish64 != bullish_stored) |
+                                    (bearish64 != bearish_stored)).sum()
+
+    scale = close64.abs()
+    for name in results['float64']:
+        diff = (results['float64'][name] - results['float32'][name].astype(np.float64)).abs()
+        if not name.startswith('RSI'):
+            diff = diff / scale
+        report[f'max_err_{name}'] = diff.max()
+
+    return report
+
+
+# Example usage
+if __name__ == "__main__":
+    # python precision_check.py
+    parser = argparse.ArgumentParser(description="Compare float32 and float64 indicators and signals")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--as-of", help="End date of the lookback window (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    report = compare_precision(args.data_dir, as_of=args.as_of)
+
+    pd.set_option('display.width', 200)
+    print(report[['signal_float64', 'signal_float32', 'signal_stored', 'events', 'event_diffs',
+                  'event_diffs_stored', 'max_err_EMA_12', 'max_err_MACD_Hist', 'max_err_RSI_14']])
+
+    events = report['events'].sum()
+    for label, signal, diffs in (('float32 calculation', 'signal_float32', 'event_diffs'),
+                                 ('stored float32 columns', 'signal_stored', 'event_diffs_stored')):
+        changed = report['signal_float64'] != report[signal]
+        print(f"\n{label}:")
+        print(f"  Crossover events differing: {report[diffs].sum()} of {events}")
+        print(f"  Latest signals differing: {changed.sum()} of {len(report)}")
+        if changed.any():
+            print(f"    {', '.join(report.index[changed])}")
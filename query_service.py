@@ -0,0 +1,444 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import operator
+import sys
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+from screen import screen
+from storage import list_tickers, read_tail, stat_signature, ticker_path
+
+# ---------------------------
+# Local query service
+# ---------------------------
+# A small asyncio HTTP/1.1 server (standard library only) that keeps the
+# latest indicator row and the EMA 12/26 signal of every ticker in memory
+# and answers dashboards with JSON:
+#
+#   GET /health                           -> ticker count, last refresh
+#   GET /tickers                          -> list of tickers
+#   GET /ticker/SPY                       -> one ticker
+#   GET /batch?tickers=SPY,QQQ            -> several tickers by symbol
+#   GET /screen?signal=Bullish&rsi_max=30 -> tickers matching filters
+#
+# Every ticker's JSON is encoded once when it is loaded, so answering a
+# request is only parsing the request line and joining cached bytes. The
+# server runs on a single thread; connections are kept alive.
+#
+# A watcher polls the stat signature of every ticker (see storage.py) and
+# reloads the tickers whose files changed, or were added or removed, off
+# the event loop. Signals come from screen.screen(), which reuses its own
+# cache for unchanged tickers. A signal depends on the date too (crosses
+# older than the lookback window no longer count), so every ticker is
+# reloaded when the date changes.
+#
+# 'python query_service.py loadtest' starts the server in a process of its
+# own and drives it from client processes to measure its throughput.
+
+STOCK_DATA_DIR = 'stock_data'
+HOST = '127.0.0.1'
+PORT = 8765
+POLL_SECONDS = 1.0
+SCREEN_FILTERS = {
+    'rsi_min': ('RSI_14', operator.ge),
+    'rsi_max': ('RSI_14', operator.le),
+    'macd_hist_min': ('MACD_Hist', operator.ge),
+    'macd_hist_max': ('MACD_Hist', operator.le),
+}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def _value(x):
+    return None if math.isnan(x) else x
+
+
+def load_entries(data_dir, tickers, as_of=None):
+    """
+    Read the latest row and signal of tickers
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - tickers: List of tickers
+    - as_of: Date the signal lookback window ends on (default: today)
+
+    Returns:
+    - Dict of ticker -> entry dict (date, indicators, signal,
+      last_cross_date); tickers that cannot be read are left out
+    """
+    signals = {r['ticker']: r for r in screen(data_dir, tickers=tickers, as_of=as_of)}
+
+    entries = {}
+    for ticker in tickers:
+        try:
+            index, arrays = read_tail(ticker_path(data_dir, ticker), 1)
+        except Exception as e:
+            print(f"✗ {ticker}: Error - {str(e)}", file=sys.stderr)
+            continue
+        if len(index) == 0:
+            continue
+        signal = signals.get(ticker, {})
+        entries[ticker] = {
+            'ticker': ticker,
+            'date': str(index[-1])[:10],
+            'indicators': {name: _value(float(values[-1])) for name, values in arrays.items()},
+            'signal': signal.get('signal'),
+            'last_cross_date': signal.get('last_cross_date'),
+        }
+    return entries
+
+
+class QueryService:
+    """
+    In-memory latest indicators and signals of a data directory
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - poll_seconds: Interval of the file change check
+    - as_of: Fixed date signals are calculated for (default: today, moving
+      with the clock)
+    """
+
+    def __init__(self, data_dir=STOCK_DATA_DIR, poll_seconds=POLL_SECONDS, as_of=None):
+        self.data_dir = data_dir
+        self.poll_seconds = poll_seconds
+        self.as_of = as_of
+        self.signal_date = None
+        self.entries = {}
+        self.encoded = {}
+        self.signatures = {}
+        self.refreshed = None
+        self._tickers_body = b'[]'
+        self._screen_body = b'[]'
+
+    def _signatures(self):
+        signatures = {}
+        for ticker in list_tickers(self.data_dir):
+            try:
+                signatures[ticker] = stat_signature(ticker_path(self.data_dir, ticker))
+            except OSError:
+                pass
+        return signatures
+
+    def _signal_date(self):
+        return self.as_of if self.as_of is not None else time.strftime('%Y-%m-%d')
+
+    async def refresh(self):
+        """
+        Reload tickers whose files changed since the last refresh, or every
+        ticker when the date signals are calculated for changed
+
+        Returns:
+        - List of reloaded or removed tickers
+        """
+        signal_date = self._signal_date()
+        signatures = await asyncio.to_thread(self._signatures)
+        if signal_date != self.signal_date:
+            changed = list(signatures)
+        else:
+            changed = [t for t, sig in signatures.items() if self.signatures.get(t) != sig]
+        removed = [t for t in self.signatures if t not in signatures]
+        if not changed and not removed:
+            return []
+
+        entries = (await asyncio.to_thread(load_entries, self.data_dir, changed, signal_date)
+                   if changed else {})
+
+        # Swapped in on the event loop, between requests
+        for ticker in removed + changed:
+            self.entries.pop(ticker, None)
+            self.encoded.pop(ticker, None)
+        for ticker, entry in entries.items():
+            self.entries[ticker] = entry
+            self.encoded[ticker] = json.dumps(entry).encode()
+        self.signatures = signatures
+        self.signal_date = signal_date
+        self.refreshed = time.time()
+
+        tickers = sorted(self.entries)
+        self._tickers_body = json.dumps(tickers).encode()
+        self._screen_body = b'[' + b','.join(self.encoded[t] for t in tickers) + b']'
+        return sorted(removed + changed)
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                changed = await self.refresh()
+            except Exception as e:
+                print(f"✗ Refresh error - {str(e)}", file=sys.stderr)
+                continue
+            if changed:
+                print(f"✓ Reloaded {', '.join(changed)}", file=sys.stderr)
+
+    # === Routes ===
+
+    def _batch(self, query):
+        tickers = [t.upper() for item in query.get('tickers', []) for t in item.split(',') if t]
+        if not tickers:
+            return 400, {'error': 'tickers parameter is required'}
+        parts = [b'"%s":%s' % (t.encode(), self.encoded[t]) for t in tickers if t in self.encoded]
+        return 200, b'{' + b','.join(parts) + b'}'
+
+    def _screen(self, query):
+        if not query:
+            return 200, self._screen_body
+
+        signal = query.get('signal', [None])[0]
+        limits = []
+        for name, values in query.items():
+            if name == 'signal':
+                continue
+            if name not in SCREEN_FILTERS:
+                return 400, {'error': f'unknown filter {name}'}
+            try:
+                limits.append((SCREEN_FILTERS[name], float(values[0])))
+            except ValueError:
+                return 400, {'error': f'{name} must be a number'}
+
+        parts = []
+        for ticker in sorted(self.entries):
+            entry = self.entries[ticker]
+            if signal is not None and entry['signal'] != signal:
+                continue
+            matches = True
+            for (column, compare), limit in limits:
+                value = entry['indicators'].get(column)
+                if value is None or not compare(value, limit):
+                    matches = False
+                    break
+            if matches:
+                parts.append(self.encoded[ticker])
+        return 200, b'[' + b','.join(parts) + b']'
+
+    def route(self, method, target):
+        """
+        Answer one request
+
+        Returns:
+        - Tuple of (status code, body bytes or JSON-serializable object)
+        """
+        if method != 'GET':
+            return 405, {'error': 'only GET is supported'}
+
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        if path.startswith('/ticker/'):
+            body = self.encoded.get(unquote(path[len('/ticker/'):]).upper())
+            return (200, body) if body is not None else (404, {'error': 'unknown ticker'})
+        if path == '/tickers':
+            return 200, self._tickers_body
+        if path == '/batch':
+            return self._batch(parse_qs(url.query))
+        if path == '/screen':
+            return self._screen(parse_qs(url.query))
+        if path == '/health':
+            return 200, {'tickers': len(self.entries), 'refreshed': self.refreshed}
+        return 404, {'error': 'not found'}
+
+    # === HTTP ===
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split(' ')
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                # A body is not used by any route; skip it. Without a valid
+                # length the next request cannot be found, so the connection
+                # is closed after answering
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    length = None
+                if length:
+                    await reader.readexactly(length)
+
+                if length is None:
+                    status, body = 400, {'error': 'invalid Content-Length'}
+                elif len(parts) != 3:
+                    status, body = 400, {'error': 'malformed request line'}
+                else:
+                    status, body = self.route(parts[0], parts[1])
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+
+                close = (length is None
+                         or headers.get('connection', '').lower() == 'close'
+                         or (len(parts) == 3 and parts[2] == 'HTTP/1.0'
+                             and headers.get('connection', '').lower() != 'keep-alive'))
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: %d\r\nConnection: %s\r\n\r\n%s'
+                             % (status, REASONS[status].encode(), len(body),
+                                b'close' if close else b'keep-alive', body))
+                await writer.drain()
+                if close:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, ready=None):
+        """
+        Load every ticker, then serve until cancelled
+
+        Parameters:
+        - host, port: Address to listen on
+        - ready: Optional callable called once the server accepts requests
+        """
+        await self.refresh()
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"✓ Serving {len(self.entries)} tickers on http://{host}:{port}", file=sys.stderr)
+        if ready is not None:
+            ready()
+        watcher = asyncio.create_task(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def run_server(data_dir=STOCK_DATA_DIR, host=HOST, port=PORT, poll_seconds=POLL_SECONDS,
+               ready=None):
+    try:
+        asyncio.run(QueryService(data_dir, poll_seconds).serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+# ---------------------------
+# Load test
+# ---------------------------
+async def _client(host, port, paths, deadline, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = [f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode() for path in paths]
+    count = 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(requests[count % len(requests)])
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def _client_process(host, port, paths, connections, seconds, queue):
+    async def run():
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        counts = await asyncio.gather(*(_client(host, port, paths, deadline, latencies)
+                                        for _ in range(connections)))
+        return sum(counts), latencies
+
+    count, latencies = asyncio.run(run())
+    queue.put((count, latencies))
+
+
+def load_test(data_dir=STOCK_DATA_DIR, port=PORT + 1, seconds=10.0, clients=2, connections=32,
+              paths=None):
+    """
+    Measure the request throughput of a single server process
+
+    The server runs in its own process, i.e. on one core; the requests come
+    from client processes over keep-alive connections.
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - port: Port of the test server
+    - seconds: Duration of the test
+    - clients: Number of client processes
+    - connections: Concurrent connections per client process
+    - paths: Request paths cycled through (default: every ticker, a batch
+      and a screen)
+
+    Returns:
+    - Dict with requests, seconds, requests_per_second and p50/p99
+      latencies in milliseconds
+    """
+    if paths is None:
+        tickers = list_tickers(data_dir)
+        paths = [f'/ticker/{t}' for t in tickers]
+        paths += [f"/batch?tickers={','.join(tickers[:5])}", '/screen?signal=Bullish']
+
+    context = multiprocessing.get_context('spawn')
+    ready = context.Event()
+    server = context.Process(target=run_server,
+                             args=(data_dir, HOST, port, POLL_SECONDS, ready.set), daemon=True)
+    server.start()
+    try:
+        if not ready.wait(60):
+            raise RuntimeError("server did not start")
+
+        queue = context.Queue()
+        workers = [context.Process(target=_client_process,
+                                   args=(HOST, port, paths, connections, seconds, queue))
+                   for _ in range(clients)]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    finally:
+        server.terminate()
+        server.join()
+
+    requests = sum(count for count, _ in results)
+    latencies = sorted(latency for _, values in results for latency in values)
+    percentile = lambda q: 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return {
+        'requests': requests,
+        'seconds': seconds,
+        'requests_per_second': requests / seconds,
+        'p50_ms': percentile(0.50) if latencies else None,
+        'p99_ms': percentile(0.99) if latencies else None,
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    # python query_service.py serve --port 8765
+    # curl http://127.0.0.1:8765/ticker/SPY
+    # python query_service.py loadtest --seconds 10
+    parser = argparse.ArgumentParser(description="Serve latest indicators and signals as JSON")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("serve", help="Run the service")
+    p.add_argument("--host", default=HOST)
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--poll", type=float, default=POLL_SECONDS,
+                   help="Seconds between file change checks")
+
+    p = commands.add_parser("loadtest", help="Measure single-process throughput")
+    p.add_argument("--port", type=int, default=PORT + 1)
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--clients", type=int, default=2, help="Client processes")
+    p.add_argument("--connections", type=int, default=32, help="Connections per client")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        run_server(args.data_dir, args.host, args.port, args.poll)
+    else:
+        result = load_test(args.data_dir, args.port, args.seconds, args.clients, args.connections)
+        print(f"✓ {result['requests']} requests in {result['seconds']:.1f}s: "
+              f"{result['requests_per_second']:,.0f} req/s on one server core "
+              f"(p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms)")
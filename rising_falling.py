@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 from pathlib import Path
+from storage import exists, read_frame
 
 def analyze_day_of_week_drops(csv_file, output_dir):
     """
@@ -15,31 +16,13 @@ def analyze_day_of_week_drops(csv_file, output_dir):
     ticker = Path(csv_file).stem
     
     try:
-        # Read the data - first column is the index (Date)
-        # Read first few rows to check structure
-        df_check = pd.read_csv(csv_file, nrows=3)
-        
-        # Check if row 1 (index 0) contains ticker repeated across columns
-        first_row_values = df_check.iloc[0].astype(str).values
-        if any(ticker.upper() in val.upper() for val in first_row_values):
-            # Ticker row exists, skip it
-            df = pd.read_csv(csv_file, skiprows=[1], index_col=0)
-        else:
-            # No ticker row
-            df = pd.read_csv(csv_file, index_col=0)
-        
-        # Remove any rows where the index is still "Date" (header got included)
-        df = df[df.index != 'Date']
-        
-        # Convert index to datetime
-        df.index = pd.to_datetime(df.index, errors='coerce')
+        # Read the Close column through the storage layer
+        df = read_frame(csv_file, columns=['Close'])
+        df.columns = df.columns.get_level_values(0)
         
         # Drop any rows with invalid dates
         df = df[df.index.notna()]
         
-        # Convert Close to numeric
-        df['Close'] = pd.to_numeric(df['Close'], errors='coerce')
-        
         # Calculate daily returns (percentage change)
         df['Daily_Return'] = df['Close'].pct_change() * 100
         
@@ -181,9 +164,9 @@ def main():
         os.makedirs(output_dir)
         print(f"Created '{output_dir}' directory")
     
-    # Check if SPY.csv exists
+    # Check if SPY exists
     spy_path = os.path.join(input_dir, spy_file)
-    if not os.path.exists(spy_path):
+    if not exists(spy_path):
         print(f"Error: '{spy_file}' not found in '{input_dir}' directory!")
         return
     
@@ -0,0 +1,245 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from signal_calc import detect_ema_crossovers
+from storage import list_tickers, read_tail, replace_file, stat_signature, ticker_path
+
+# ---------------------------
+# Headless signal screen
+# ---------------------------
+# Computes the same latest signal as generate_signals (last EMA 12/26
+# cross within the lookback window) for the whole universe without
+# matplotlib and without parsing full histories. Only a short tail of each
+# ticker is read; tickers without a cross in it are re-read with a longer
+# tail until a cross is found or the lookback window is covered. Crossovers
+# are detected for all tickers at once on a rows x tickers panel.
+#
+# Results are cached in <data_dir>/.screen_cache.json under a stat-based
+# signature of each ticker's files, so repeated polls only re-read tickers
+# whose data changed since the previous screen.
+
+STOCK_DATA_DIR = "stock_data"
+LOOKBACK_DAYS = 365
+TAIL_ROWS = 64
+SCREEN_COLUMNS = ["EMA_12", "EMA_26", "RSI_14", "MACD_Hist"]
+FIELDS = ["ticker", "signal", "last_cross_date", "date", "rsi", "macd_hist"]
+SCREEN_CACHE = ".screen_cache.json"
+
+
+def _stack_tails(tails, rows):
+    """
+    Align ticker tails at their last row into rows x tickers arrays
+
+    Returns:
+    - Tuple of (dates array, dict of column -> array); shorter tails are
+      padded at the top with NaT / NaN
+    """
+    dates = np.full((rows, len(tails)), np.datetime64('NaT'), dtype='datetime64[ns]')
+    panels = {name: np.full((rows, len(tails)), np.nan) for name in SCREEN_COLUMNS}
+
+    for j, (index, arrays) in enumerate(tails):
+        n = len(index)
+        if n == 0:
+            continue
+        dates[rows - n:, j] = index
+        for name in SCREEN_COLUMNS:
+            if name in arrays:
+                panels[name][rows - n:, j] = arrays[name]
+
+    return dates, panels
+
+
+def _last_true_row(mask):
+    # Row of the last True in every column, -1 where there is none
+    rows = mask.shape[0]
+    last = rows - 1 - mask[::-1].argmax(axis=0)
+    return np.where(mask.any(axis=0), last, -1)
+
+
+def _screen_tails(tickers, tails, rows, start_date):
+    """
+    Detect the latest cross of every ticker from tails of up to rows rows
+
+    Returns:
+    - Tuple of (list of result dicts, list of positions of tickers whose
+      tail had no cross and does not cover the lookback window yet)
+    """
+    dates, panels = _stack_tails(tails, rows)
+
+    # Rows before the lookback window do not take part, as in generate_signals
+    outside = ~(dates >= np.datetime64(start_date))
+    ema = {name: pd.DataFrame(np.where(outside, np.nan, panels[name]))
+           for name in ("EMA_12", "EMA_26")}
+
+    bullish, bearish = detect_ema_crossovers(ema)
+    last_bullish = _last_true_row(bullish.to_numpy())
+    last_bearish = _last_true_row(bearish.to_numpy())
+
+    results = []
+    retry = []
+    for j, ticker in enumerate(tickers):
+        index = tails[j][0]
+        if len(index) == 0 or index[-1] < np.datetime64(start_date):
+            # No bars in the lookback window
+            continue
+
+        if last_bullish[j] < 0 and last_bearish[j] < 0:
+            complete = len(index) < rows or index[0] < np.datetime64(start_date)
+            if not complete:
+                retry.append(j)
+                continue
+            signal, cross_row = "Neutral", None
+        elif last_bullish[j] > last_bearish[j]:
+            signal, cross_row = "Bullish", last_bullish[j]
+        else:
+            signal, cross_row = "Bearish", last_bearish[j]
+
+        results.append({
+            "ticker": ticker,
+            "signal": signal,
+            "last_cross_date": None if cross_row is None else str(dates[cross_row, j])[:10],
+            "date": str(index[-1])[:10],
+            "rsi": _value(panels["RSI_14"][-1, j]),
+            "macd_hist": _value(panels["MACD_Hist"][-1, j]),
+        })
+
+    return results, retry
+
+
+def _value(x):
+    return None if np.isnan(x) else float(x)
+
+
+def load_screen_cache(data_dir=STOCK_DATA_DIR):
+    path = os.path.join(data_dir, SCREEN_CACHE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_screen_cache(cache, data_dir=STOCK_DATA_DIR):
+    def dump(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+    replace_file(os.path.join(data_dir, SCREEN_CACHE), dump)
+
+
+def _read_tails(data_dir, tickers, rows):
+    tails = []
+    for ticker in tickers:
+        try:
+            tails.append(read_tail(ticker_path(data_dir, ticker), rows, SCREEN_COLUMNS))
+        except Exception as e:
+            print(f"✗ {ticker}: Error - {str(e)}", file=sys.stderr)
+            tails.append((np.array([], dtype="datetime64[ns]"), {}))
+    return tails
+
+
+def screen(data_dir=STOCK_DATA_DIR, tickers=None, as_of=None,
+           lookback_days=LOOKBACK_DAYS, tail_rows=TAIL_ROWS, use_cache=True):
+    """
+    Screen every ticker for its latest EMA 12/26 crossover signal
+
+    Parameters:
+    - data_dir: Directory containing ticker data (with indicator columns)
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - as_of: Date the lookback window ends on (default: today)
+    - lookback_days: Length of the lookback window in calendar days
+    - tail_rows: Rows read per ticker on the first pass
+    - use_cache: Reuse results of tickers whose data did not change
+
+    Returns:
+    - List of dicts with ticker, signal, last_cross_date, date (last bar),
+      rsi and macd_hist, sorted by ticker
+    """
+    if tickers is None:
+        tickers = list_tickers(data_dir)
+
+    today = pd.Timestamp.today() if as_of is None else pd.Timestamp(as_of)
+    start_date = today.normalize() - pd.Timedelta(days=lookback_days)
+    window = f"{start_date.date()}:{tail_rows}"
+
+    cache = load_screen_cache(data_dir) if use_cache else {}
+    results = {}
+    signatures = {}
+    stale = []
+
+    for ticker in tickers:
+        try:
+            signatures[ticker] = stat_signature(ticker_path(data_dir, ticker))
+        except OSError as e:
+            print(f"✗ {ticker}: Error - {str(e)}", file=sys.stderr)
+            continue
+
+        entry = cache.get(ticker)
+        if entry and entry["signature"] == signatures[ticker] and entry["window"] == window:
+            results[ticker] = entry["result"]
+        else:
+            stale.append(ticker)
+
+    pending = stale
+    rows = tail_rows
+    while pending:
+        found, retry = _screen_tails(pending, _read_tails(data_dir, pending, rows),
+                                     rows, start_date)
+        results.update((r["ticker"], r) for r in found)
+
+        # Daily bars: lookback_days rows always cover the window
+        if rows > lookback_days:
+            break
+        pending = [pending[j] for j in retry]
+        rows *= 4
+
+    if use_cache and stale:
+        for ticker in stale:
+            cache[ticker] = {"signature": signatures[ticker], "window": window,
+                             "result": results.get(ticker)}
+        save_screen_cache(cache, data_dir)
+
+    # Tickers without bars in the lookback window have no signal
+    return [results[t] for t in sorted(results) if results[t] is not None]
+
+
+def write_results(results, output=None, fmt="json"):
+    """
+    Write screen results as JSON or CSV
+
+    Parameters:
+    - results: List of result dicts from screen()
+    - output: File path (default: stdout)
+    - fmt: 'json' or 'csv'
+    """
+    f = open(output, "w", newline="") if output else sys.stdout
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+        else:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    finally:
+        if output:
+            f.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    # python screen.py                      -> JSON table on stdout
+    # python screen.py --format csv --output signals/screen.csv
+    parser = argparse.ArgumentParser(description="Screen tickers for their latest EMA crossover signal")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output")
+    parser.add_argument("--as-of", help="End date of the lookback window (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    write_results(screen(args.data_dir, as_of=args.as_of), args.output, args.format)
@@ -0,0 +1,253 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import metrics
+from panel_calc import load_panel
+from shared_panel import load_shared_panels, map_blocks
+
+# ---------------------------
+# Universe seasonality
+# ---------------------------
+# Daily return statistics of every ticker per calendar bucket:
+# - day of week (Monday ... Friday)
+# - month of year (Jan ... Dec)
+# - turn of month: the last trading day of a month and the first three of
+#   the next ('TOM') against all other days ('Rest'). Where the data starts
+#   or ends mid-month, days that may be at the turn of month are in neither.
+#
+# All tickers are handled at once on a dates x tickers panel; a ticker's
+# days without a return (before listing, gaps) simply do not count.
+#
+# p-values come from a permutation test: under the null hypothesis the
+# calendar labels are unrelated to returns, so the dates are shuffled and
+# the bucket means recomputed. Every resample shuffles the dates of all
+# tickers the same way, which turns a batch of resamples into one matrix
+# product of shuffled one-hot labels with the returns of the universe.
+
+STOCK_DATA_DIR = 'stock_data'
+RESAMPLES = 20000
+BATCH_SIZE = 250
+TOM_DAYS_BEFORE = 1
+TOM_DAYS_AFTER = 3
+STATS = ['mean', 'hit_rate', 'count', 'p_value']
+
+
+def calendar_buckets(dates):
+    """
+    Assign every date to its day-of-week, month and turn-of-month bucket
+
+    Parameters:
+    - dates: DatetimeIndex of trading dates (sorted)
+
+    Returns:
+    - List of (bucket names, codes array) per grouping; codes index into
+      the names for every date, a code of len(names) leaves a date out
+    """
+    dates = pd.DatetimeIndex(dates)
+
+    # Days of week that occur in the data, in calendar order
+    days = sorted(set(dates.dayofweek))
+    day_names = [pd.Timestamp(2024, 1, 1 + d).day_name() for d in days]
+    day_codes = np.searchsorted(days, dates.dayofweek)
+
+    month_names = [pd.Timestamp(2024, m, 1).strftime('%b') for m in range(1, 13)]
+    month_codes = dates.month.to_numpy() - 1
+
+    # Trading day number within the month, from the start and from the end
+    period = dates.to_period('M')
+    new_month = np.concatenate([[True], period[1:] != period[:-1]])
+    month_id = np.cumsum(new_month) - 1
+    starts = np.flatnonzero(new_month)
+    ends = np.append(starts[1:], len(dates))
+    position = np.arange(len(dates)) - starts[month_id]
+    remaining = ends[month_id] - np.arange(len(dates))
+
+    # A month the data starts in after its first business day, or ends in
+    # before its last business day (the current month), is cut off: days
+    # counted from the missing side may not be at the actual turn of month
+    first, last = dates[0].normalize(), dates[-1].normalize()
+    start_known = (month_id > 0) | (first == pd.offsets.BMonthBegin().rollback(first))
+    end_known = (month_id < month_id[-1]) | (last == pd.offsets.BMonthEnd().rollforward(last))
+    at_start = position < TOM_DAYS_AFTER
+    at_end = remaining <= TOM_DAYS_BEFORE
+    tom = (at_start & start_known) | (at_end & end_known)
+    unknown = ~tom & ((at_start & ~start_known) | (at_end & ~end_known))
+    tom_codes = np.select([tom, unknown], [0, 2], 1)
+
+    return [
+        (day_names, day_codes),
+        (month_names, month_codes),
+        (['TOM', 'Rest'], tom_codes),
+    ]
+
+
+def _bucket_sums(codes, n_buckets, data):
+    # Per-bucket column sums of data (dates x columns)
+    labels = (codes[None, :] == np.arange(n_buckets)[:, None]).astype(float)
+    return labels @ data
+
+
+def _deviations(codes, n_buckets, data, overall, labels):
+    """
+    |bucket mean - overall mean| for a batch of label assignments
+
+    Parameters:
+    - codes: Batch x dates array of bucket codes
+    - n_buckets: Number of buckets
+    - data: Dates x (returns, valid flags) float32 array
+    - overall: Overall mean return of every ticker
+    - labels: Float32 buffer of at least batch x buckets x dates
+
+    Returns:
+    - Batch x buckets x tickers array
+    """
+    batch, n_dates = codes.shape
+    labels = labels[:batch]
+    np.equal(codes[:, None, :], np.arange(n_buckets)[None, :, None],
+             out=labels, casting='unsafe')
+    sums = (labels.reshape(-1, n_dates) @ data).reshape(batch, n_buckets, -1)
+    total, count = np.split(sums, 2, axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.abs(total / count - overall)
+
+
+def seasonality(close, resamples=RESAMPLES, batch_size=BATCH_SIZE, seed=0):
+    """
+    Calculate seasonality statistics of every ticker in a close panel
+
+    Parameters:
+    - close: DataFrame of close prices, dates x tickers
+    - resamples: Number of permutations for the p-values (0 to skip them)
+    - batch_size: Permutations evaluated per matrix product
+    - seed: Random seed of the permutations
+
+    Returns:
+    - DataFrame of tickers x (stat, bucket): mean daily return, hit_rate
+      (share of rising days), count of days and two-sided p_value of the
+      bucket mean differing from the ticker's overall mean
+    """
+    prices = close.to_numpy(dtype=float)
+    previous = pd.DataFrame(prices).ffill().shift(1).to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = prices / previous - 1
+
+    # Days without a return contribute nothing to sums and counts
+    valid = ~np.isnan(returns)
+    filled = np.where(valid, returns, 0.0)
+    data = np.hstack([filled, valid.astype(float), (filled > 0).astype(float)])
+    n_tickers = prices.shape[1]
+
+    groups = calendar_buckets(close.index)
+    overall = filled.sum(axis=0) / valid.sum(axis=0)
+
+    blocks = []
+    for names, codes in groups:
+        sums = _bucket_sums(codes, len(names), data)
+        total, count, up = np.split(sums, 3, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        blocks.append((names, codes, mean, count, up / np.where(count > 0, count, np.nan)))
+
+    # Permutation test on the bucket means. It runs in float32: the one-hot
+    # labels are most of the memory traffic, and observed and permuted
+    # deviations go through the same arithmetic
+    rng = np.random.default_rng(seed)
+    n_dates = len(close.index)
+    data32 = data[:, :2 * n_tickers].astype(np.float32)
+    buffers = [np.empty((min(batch_size, resamples), len(names), n_dates), dtype=np.float32)
+               for names, *_ in blocks] if resamples else []
+    observed = [_deviations(codes[None], len(names), data32, overall, buffer)[0]
+                for (names, codes, *_), buffer in zip(blocks, buffers)]
+    exceed = [np.zeros((len(names), n_tickers)) for names, *_ in blocks]
+
+    done = 0
+    while done < resamples:
+        size = min(batch_size, resamples - done)
+        order = rng.permuted(np.broadcast_to(np.arange(n_dates), (size, n_dates)), axis=1)
+        for k, (names, codes, *_) in enumerate(blocks):
+            deviation = _deviations(codes[order], len(names), data32, overall, buffers[k])
+            exceed[k] += (deviation >= observed[k]).sum(axis=0)
+        done += size
+
+    frames = {}
+    for k, (names, _, mean, count, hit_rate) in enumerate(blocks):
+        p_value = (exceed[k] + 1) / (resamples + 1) if resamples else np.full(mean.shape, np.nan)
+        p_value[count == 0] = np.nan
+        for stat, values in zip(STATS, (mean, hit_rate, count, p_value)):
+            frames.setdefault(stat, []).append(pd.DataFrame(values.T, index=close.columns,
+                                                            columns=names))
+
+    result = pd.concat({stat: pd.concat(frames[stat], axis=1) for stat in STATS}, axis=1)
+    result.index.name = 'Ticker'
+    result['count'] = result['count'].astype(int)
+    return result
+
+
+def _seasonality_block(frames, resamples, seed):
+    return seasonality(frames['Close'], resamples=resamples, seed=seed)
+
+
+def analyze_universe(data_dir=STOCK_DATA_DIR, tickers=None, resamples=RESAMPLES, seed=0,
+                     workers=1):
+    """
+    Calculate seasonality statistics of every ticker in a data directory
+
+    With workers > 1 the tickers are split across worker processes that
+    share one memory-mapped close panel. Every block is shuffled with the
+    same dates and seed, so counts and p-values are the same as in a
+    single-process run (means may differ in the last bit).
+
+    Returns:
+    - DataFrame of tickers x (stat, bucket), see seasonality()
+    """
+    with metrics.stage('seasonality') as record:
+        if workers > 1:
+            with load_shared_panels(data_dir, ['Close'], tickers) as shared:
+                print(f"Seasonality of {len(shared.tickers)} tickers over {len(shared.index)} "
+                      f"dates ({resamples} permutations, {workers} workers)...")
+                record['rows'] = shared.array('Close').size
+                chunk = -(-len(shared.tickers) // workers)
+                return pd.concat(map_blocks(_seasonality_block, shared, ['Close'],
+                                            args=(resamples, seed), workers=workers,
+                                            chunk_tickers=chunk))
+
+        close = load_panel(data_dir, 'Close', tickers)
+        print(f"Seasonality of {close.shape[1]} tickers over {close.shape[0]} dates "
+              f"({resamples} permutations)...")
+        record['rows'] = close.size
+        return seasonality(close, resamples=resamples, seed=seed)
+
+
+def report(result, output=None):
+    """
+    Print the mean return and p-value matrices of analyze_universe()
+
+    Parameters:
+    - result: DataFrame returned by analyze_universe()
+    - output: Optional CSV file to save the full matrix to
+    """
+    pd.set_option('display.width', 160)
+    print("\nMean daily return (%):")
+    print((100 * result['mean']).round(3))
+    print("\np-values:")
+    print(result['p_value'].round(3))
+
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        result.to_csv(output)
+        print(f"\n✓ Results saved to {output}")
+
+
+# Example usage
+if __name__ == "__main__":
+    # python seasonality.py --output signals/seasonality.csv
+    parser = argparse.ArgumentParser(description="Day-of-week, month and turn-of-month return statistics")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", help="CSV file to save the ticker x bucket matrix to")
+    args = parser.parse_args()
+
+    report(analyze_universe(args.data_dir, resamples=args.resamples, workers=args.workers),
+           args.output)
@@ -0,0 +1,193 @@
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from panel_calc import load_panels
+
+# ---------------------------
+# Shared panels for worker processes
+# ---------------------------
+# A SharedPanel holds named 2-D arrays (dates x tickers panels, or any
+# rows x tickers matrix) as .npy files in one directory, by default on
+# /dev/shm so the files live in memory. The process that creates it loads
+# the data once; worker processes map the same files read-only, so every
+# worker reads the same physical pages and memory stays flat as workers are
+# added. Pickling a SharedPanel only sends its directory, and each process
+# maps a directory once however many tasks it receives.
+#
+# The creating process owns the files and removes them on close(), or at
+# the end of a with block.
+
+SHARED_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None
+CHUNK_TICKERS = 32
+
+# Panels mapped by this process, by directory
+_attached = {}
+
+
+class SharedPanel:
+    """
+    Read-only, memory-mapped arrays shared between processes
+
+    Parameters:
+    - path: Directory created by SharedPanel.create()
+    - owner: Remove the directory on close()
+    """
+
+    def __init__(self, path, owner=False):
+        self.path = path
+        self.owner = owner
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        self.tickers = meta['tickers']
+        self.columns = meta['columns']
+        self._arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                        for name in self.columns}
+        index_path = os.path.join(path, 'index.npy')
+        self.index = (pd.DatetimeIndex(np.load(index_path, mmap_mode='r'), name='Date')
+                      if os.path.exists(index_path) else None)
+
+    @classmethod
+    def create(cls, arrays, tickers, index=None, root=SHARED_ROOT):
+        """
+        Write arrays to a new shared directory
+
+        Parameters:
+        - arrays: Dict of name -> rows x tickers array
+        - tickers: Ticker of every column
+        - index: Optional dates of the rows
+        - root: Directory to create the shared directory in (default:
+          /dev/shm where available, else the temp directory)
+
+        Returns:
+        - SharedPanel owning the new directory
+        """
+        path = tempfile.mkdtemp(prefix='siqrs-panel-', dir=root)
+        try:
+            for name, values in arrays.items():
+                np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(values))
+            if index is not None:
+                np.save(os.path.join(path, 'index.npy'), pd.DatetimeIndex(index).values)
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump({'tickers': list(tickers), 'columns': list(arrays)}, f)
+        except BaseException:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        return cls(path, owner=True)
+
+    @classmethod
+    def from_panels(cls, panels, root=SHARED_ROOT):
+        """
+        Share panels that have the same dates and tickers (e.g. from
+        panel_calc.load_panels)
+        """
+        first = next(iter(panels.values()))
+        arrays = {name: panel.to_numpy() for name, panel in panels.items()}
+        return cls.create(arrays, first.columns, first.index, root)
+
+    def array(self, name):
+        """Memory-mapped rows x tickers array of one column."""
+        return self._arrays[name]
+
+    def frame(self, name, start=0, stop=None):
+        """
+        Panel of one column for the tickers start:stop, without copying
+        """
+        values = self._arrays[name][:, start:stop]
+        return pd.DataFrame(values, index=self.index, columns=self.tickers[start:stop],
+                            copy=False)
+
+    def frames(self, columns=None, start=0, stop=None):
+        """Dict of column -> panel, see frame()."""
+        return {name: self.frame(name, start, stop) for name in (columns or self.columns)}
+
+    def close(self):
+        self._arrays = {}
+        _attached.pop(self.path, None)
+        if self.owner:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __reduce__(self):
+        # Workers receive the directory and map it themselves
+        return attach, (self.path,)
+
+
+def attach(path):
+    """
+    Map a shared directory once per process
+
+    Returns:
+    - SharedPanel (not owning the directory)
+    """
+    panel = _attached.get(path)
+    if panel is None:
+        panel = _attached[path] = SharedPanel(path)
+    return panel
+
+
+def load_shared_panels(data_dir='stock_data', columns=['Close'], tickers=None, dtype=None,
+                       root=SHARED_ROOT):
+    """
+    Load aligned panels of every ticker once and share them
+
+    Parameters:
+    - data_dir, columns, tickers, dtype: See panel_calc.load_panels
+    - root: See SharedPanel.create
+
+    Returns:
+    - SharedPanel owning the shared copy; use it as a context manager
+    """
+    return SharedPanel.from_panels(load_panels(data_dir, columns, tickers, dtype), root)
+
+
+def _run_block(func, shared, columns, start, stop, args):
+    return func(shared.frames(columns, start, stop), *args)
+
+
+def map_blocks(func, shared, columns=None, args=(), workers=1, chunk_tickers=CHUNK_TICKERS):
+    """
+    Run func over blocks of tickers of a shared panel, in worker processes
+
+    Every block is passed as a dict of column -> panel of its tickers,
+    mapped zero-copy from the shared files: func(frames, *args).
+
+    Parameters:
+    - func: Module-level function (it is sent to the workers)
+    - shared: SharedPanel
+    - columns: Columns to pass (default: all)
+    - args: Extra positional arguments of func
+    - workers: Number of worker processes (1 runs in this process)
+    - chunk_tickers: Tickers per block
+
+    Returns:
+    - List of func results, in ticker order
+    """
+    blocks = [(start, min(start + chunk_tickers, len(shared.tickers)))
+              for start in range(0, len(shared.tickers), chunk_tickers)]
+
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_block, func, shared, columns, start, stop, args)
+                       for start, stop in blocks]
+            return [future.result() for future in futures]
+    return [_run_block(func, shared, columns, start, stop, args) for start, stop in blocks]
+
+
+# Example usage
+if __name__ == "__main__":
+    from panel_calc import calculate_rsi_panel
+
+    with load_shared_panels('stock_data', ['Close']) as shared:
+        print(f"Shared panel in {shared.path}: {len(shared.index)} dates x {len(shared.tickers)} tickers")
+        rsi = calculate_rsi_panel(shared.frame('Close'))
+        print(rsi.tail())
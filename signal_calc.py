@@ -0,0 +1,33 @@
+import pandas as pd
+
+
+# ---------------------------
+# EMA crossover detection
+# ---------------------------
+def detect_ema_crossovers(df):
+    diff = df["EMA_12"] - df["EMA_26"]
+    prev_diff = diff.shift(1)
+
+    bullish = (diff > 0) & (prev_diff <= 0)
+    bearish = (diff < 0) & (prev_diff >= 0)
+
+    return bullish, bearish
+
+
+# ---------------------------
+# Latest signal
+# ---------------------------
+def determine_latest_signal(df, bullish, bearish):
+    latest_signal = "Neutral"
+    if bullish.any() or bearish.any():
+        last_bullish_date = df.loc[bullish, "Date"].max()
+        last_bearish_date = df.loc[bearish, "Date"].max()
+
+        if pd.notna(last_bullish_date) and (
+            pd.isna(last_bearish_date) or last_bullish_date > last_bearish_date
+        ):
+            latest_signal = "Bullish"
+        elif pd.notna(last_bearish_date):
+            latest_signal = "Bearish"
+
+    return latest_signal
@@ -0,0 +1,223 @@
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+
+# ---------------------------
+# Reusable signal chart
+# ---------------------------
+# The 3-panel chart of generate_signals (price + EMAs, MACD, RSI) is built
+# once per process: figure, axes, legends, reference lines and layout.
+# Rendering a ticker only replaces the data of the existing artists, resets
+# the axis limits and saves the figure.
+#
+# Long lookbacks can be downsampled with Largest-Triangle-Three-Buckets
+# (LTTB), which keeps the points that shape a line (peaks, troughs, turns)
+# so the chart looks the same with far fewer vertices. Crossover markers
+# are always drawn at their exact points. Thumbnails are the same chart
+# saved at a low DPI.
+
+FIGSIZE = (14, 10)
+THUMBNAIL_DPI = 40
+X_MARGIN = 0.05  # as matplotlib's default axes margins
+BAR_WIDTH = 0.8  # days, as matplotlib's default bar width on a date axis
+EMA_PERIODS = [12, 26, 50, 200]
+
+
+def lttb(x, y, threshold):
+    """
+    Pick the points of a line to keep with Largest-Triangle-Three-Buckets
+
+    The first and last points are kept; the points in between are split
+    into threshold - 2 buckets and from each bucket the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket is kept. NaN points are skipped.
+
+    Parameters:
+    - x: Increasing float array
+    - y: Float array of the same length
+    - threshold: Number of points to keep
+
+    Returns:
+    - Sorted array of indices into x / y
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if threshold >= n or threshold < 3:
+        return valid
+
+    x = np.asarray(x, dtype=float)[valid]
+    y = np.asarray(y, dtype=float)[valid]
+
+    # Bucket k spans [edges[k], edges[k + 1]) of the points between the ends
+    edges = (np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)) + 1).astype(int)
+    edges[-1] = n - 1
+
+    # Averages of every bucket, plus the last point as the bucket after the last
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    keep = np.empty(threshold, dtype=int)
+    keep[0] = 0
+    a = 0
+    for k in range(threshold - 2):
+        start, stop = edges[k], edges[k + 1]
+        area = np.abs((x[a] - avg_x[k + 1]) * (y[start:stop] - y[a])
+                      - (x[a] - x[start:stop]) * (avg_y[k + 1] - y[a]))
+        a = start + int(area.argmax())
+        keep[k + 1] = a
+    keep[-1] = n - 1
+
+    return valid[keep]
+
+
+class SignalChart:
+    """
+    3-panel price / MACD / RSI chart whose artists are reused per ticker
+
+    Parameters:
+    - figsize: Figure size in inches
+    """
+
+    def __init__(self, figsize=FIGSIZE):
+        fig, axes = plt.subplots(
+            3, 1, figsize=figsize, sharex=True,
+            gridspec_kw={"height_ratios": [3, 2, 2]},
+        )
+        self.fig = fig
+        self.axes = axes
+        self._laid_out = False
+
+        # === EMA + Price ===
+        price_ax = axes[0]
+        self.lines = {"Close": price_ax.plot([], [], label="Close", linewidth=2)[0]}
+        for period in EMA_PERIODS:
+            self.lines[f"EMA_{period}"] = price_ax.plot([], [], label=f"EMA {period}")[0]
+
+        # Markers as marker-only lines: their data can be replaced in place
+        colors = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+        self.bullish = price_ax.plot([], [], linestyle="none", marker="^", markersize=9,
+                                     color=colors[0], label="Bullish EMA Cross")[0]
+        self.bearish = price_ax.plot([], [], linestyle="none", marker="v", markersize=9,
+                                     color=colors[1], label="Bearish EMA Cross")[0]
+
+        self.title = price_ax.set_title("")
+        price_ax.set_ylabel("Price")
+        price_ax.legend(loc="upper left")
+        price_ax.grid(alpha=0.3)
+
+        self.signal_text = price_ax.text(
+            0.01, 0.95, "",
+            transform=price_ax.transAxes,
+            fontsize=12,
+            fontweight="bold",
+            verticalalignment="top",
+        )
+
+        # === MACD ===
+        macd_ax = axes[1]
+        self.lines["MACD"] = macd_ax.plot([], [], label="MACD")[0]
+        self.lines["MACD_Signal"] = macd_ax.plot([], [], label="Signal")[0]
+        self.histogram = PolyCollection([], alpha=0.4, facecolor=colors[0], edgecolor="none")
+        macd_ax.add_collection(self.histogram)
+        macd_ax.axhline(0, linewidth=1)
+        macd_ax.set_ylabel("MACD")
+        macd_ax.legend(loc="upper left")
+        macd_ax.grid(alpha=0.3)
+
+        # === RSI ===
+        rsi_ax = axes[2]
+        self.lines["RSI_14"] = rsi_ax.plot([], [])[0]
+        rsi_ax.axhline(70, linestyle="--", linewidth=1)
+        rsi_ax.axhline(30, linestyle="--", linewidth=1)
+        rsi_ax.set_ylabel("RSI")
+        rsi_ax.set_ylim(0, 100)
+        rsi_ax.grid(alpha=0.3)
+
+        rsi_ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+
+    @staticmethod
+    def _set_ylim(ax, *arrays, margin=0.05):
+        values = np.concatenate([np.asarray(a, dtype=float).ravel() for a in arrays])
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        low, high = values.min(), values.max()
+        pad = (high - low) * margin or abs(high) * margin or 1.0
+        ax.set_ylim(low - pad, high + pad)
+
+    def render(self, ticker, df, bullish, bearish, latest_signal, output_path,
+               dpi=150, max_points=None, title_period="Last 1 Year"):
+        """
+        Draw one ticker's data into the chart and save it
+
+        Parameters:
+        - ticker: Ticker symbol for the title
+        - df: DataFrame with Date, Close, EMA_*, MACD, MACD_Signal,
+          MACD_Histogram and RSI_14 columns
+        - bullish, bearish: Boolean Series marking the crossover rows
+        - latest_signal: Text shown in the price panel
+        - output_path: PNG file to write
+        - dpi: Output resolution (THUMBNAIL_DPI for thumbnails)
+        - max_points: Downsample every line to at most this many points
+          (None to draw every point)
+        - title_period: Lookback description in the title
+        """
+        dates = mdates.date2num(df["Date"].to_numpy())
+
+        for name, line in self.lines.items():
+            values = df[name].to_numpy(dtype=float)
+            if max_points:
+                keep = lttb(dates, values, max_points)
+                line.set_data(dates[keep], values[keep])
+            else:
+                line.set_data(dates, values)
+
+        close = df["Close"].to_numpy(dtype=float)
+        bullish = np.asarray(bullish, dtype=bool)
+        bearish = np.asarray(bearish, dtype=bool)
+        self.bullish.set_data(dates[bullish], close[bullish])
+        self.bearish.set_data(dates[bearish], close[bearish])
+
+        histogram = df["MACD_Histogram"].to_numpy(dtype=float)
+        bar_dates = dates
+        if max_points:
+            keep = lttb(dates, histogram, max_points)
+            bar_dates, histogram = dates[keep], histogram[keep]
+        histogram = np.nan_to_num(histogram)
+        left = bar_dates - BAR_WIDTH / 2
+        right = bar_dates + BAR_WIDTH / 2
+        zeros = np.zeros_like(histogram)
+        self.histogram.set_verts(np.stack([
+            np.column_stack([left, zeros]), np.column_stack([left, histogram]),
+            np.column_stack([right, histogram]), np.column_stack([right, zeros]),
+        ], axis=1))
+
+        self.title.set_text(f"{ticker} — Price, EMA & Signals ({title_period})")
+        self.signal_text.set_text(f"Signal: {latest_signal}")
+
+        # Limits from the full data, so downsampling never clips extremes
+        if len(dates):
+            pad = (dates[-1] - dates[0]) * X_MARGIN or 1.0
+            self.axes[0].set_xlim(dates[0] - pad, dates[-1] + pad)
+        self._set_ylim(self.axes[0], *(df[name] for name in ["Close"] + [f"EMA_{p}" for p in EMA_PERIODS]))
+        self._set_ylim(self.axes[1], df["MACD"], df["MACD_Signal"], df["MACD_Histogram"], [0.0])
+
+        # Every other week for about a year, automatic for longer spans
+        span_days = dates[-1] - dates[0] if len(dates) else 0
+        locator = (mdates.WeekdayLocator(interval=2) if span_days <= 400
+                   else mdates.AutoDateLocator())
+        self.axes[2].xaxis.set_major_locator(locator)
+
+        if not self._laid_out:
+            # Layout is computed once; later tickers reuse it
+            self.fig.autofmt_xdate()
+            self.fig.tight_layout()
+            self._laid_out = True
+
+        self.fig.savefig(output_path, dpi=dpi)
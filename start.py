@@ -1 +1,313 @@
-print ("Hellow World!")
\ No newline at end of file
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+# ---------------------------
+# Command line interface
+# ---------------------------
+# python start.py fetch                 -> download / update stock_data
+# python start.py indicators            -> add EMA, MACD and RSI columns
+# python start.py signals               -> render signal charts
+# python start.py screen                -> latest signal of every ticker
+# python start.py events --days 5       -> crossover events of the last days
+# python start.py seasonality           -> calendar return statistics
+# python start.py serve                 -> JSON query service for dashboards
+# python start.py run                   -> all of the above, stale outputs only
+# python start.py tickers               -> list stored tickers
+# python start.py signal SPY QQQ        -> latest signal of a few tickers
+#
+# Global --metrics FILE records per-stage metrics as JSON lines (plus a
+# Prometheus text file next to it), --profile DIR dumps cProfile stats per
+# stage; see metrics.py.
+#
+# Only the standard library is imported at module level. pandas, NumPy,
+# matplotlib and yfinance are imported inside the subcommands that use
+# them, so 'tickers' and 'signal' (when the screen cache is current) answer
+# without paying their import cost.
+
+STOCK_DATA_DIR = "stock_data"
+SIGNALS_DIR = "signals"
+CONFIG_FILE = "config/tickers.json"
+
+# Defaults of screen.screen(); the fast 'signal' path only trusts cache
+# entries computed for this window
+SCREEN_LOOKBACK_DAYS = 365
+CHART_LOOKBACK_DAYS = 365
+CHART_MAX_POINTS = 1000
+SCREEN_TAIL_ROWS = 64
+SCREEN_CACHE = ".screen_cache.json"
+
+
+def stored_tickers(data_dir=STOCK_DATA_DIR):
+    """
+    List the tickers in a data directory from file names alone
+
+    Same result as storage.list_tickers() for the csv and npy backends,
+    without importing NumPy or pandas.
+
+    Returns:
+    - Sorted list of ticker symbols
+    """
+    tickers = set()
+    for entry in os.scandir(data_dir):
+        if entry.name.endswith(".csv"):
+            tickers.add(entry.name[:-len(".csv")])
+        elif entry.name.endswith(".cols") and os.path.isfile(os.path.join(entry.path, "meta.json")):
+            tickers.add(entry.name[:-len(".cols")])
+    return sorted(tickers)
+
+
+def _data_mtime_ns(data_dir):
+    # Latest modification time of any stored ticker data. Every write
+    # replaces the base file (or a .cols/meta.json) and adding or removing
+    # a delta segment touches its .delta directory.
+    latest = 0
+    for entry in os.scandir(data_dir):
+        if entry.name.endswith(".csv") or entry.name.endswith(".delta"):
+            latest = max(latest, entry.stat().st_mtime_ns)
+        elif entry.name.endswith(".cols"):
+            meta = os.path.join(entry.path, "meta.json")
+            if os.path.isfile(meta):
+                latest = max(latest, os.stat(meta).st_mtime_ns)
+    return latest
+
+
+def cached_signals(data_dir=STOCK_DATA_DIR, tickers=None):
+    """
+    Read screen results straight from the screen cache if they are current
+
+    The cache is current when it was written after the last change to any
+    ticker data and its entries cover today's default lookback window.
+
+    Returns:
+    - List of result dicts as returned by screen.screen(), or None when
+      the cache cannot answer for every requested ticker
+    """
+    path = os.path.join(data_dir, SCREEN_CACHE)
+    try:
+        cache_mtime = os.stat(path).st_mtime_ns
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    if _data_mtime_ns(data_dir) >= cache_mtime:
+        return None
+
+    start_date = date.today() - timedelta(days=SCREEN_LOOKBACK_DAYS)
+    window = f"{start_date}:{SCREEN_TAIL_ROWS}"
+
+    if tickers is None:
+        tickers = stored_tickers(data_dir)
+
+    results = []
+    for ticker in sorted(tickers):
+        entry = cache.get(ticker)
+        if entry is None or entry.get("window") != window:
+            return None
+        if entry["result"] is not None:
+            results.append(entry["result"])
+    return results
+
+
+def _print_signals(results):
+    for r in results:
+        cross = r["last_cross_date"] or "-"
+        rsi = "-" if r["rsi"] is None else f"{r['rsi']:.1f}"
+        print(f"{r['ticker']:<6} {r['signal']:<8} since {cross}  (last bar {r['date']}, RSI {rsi})")
+
+
+# ---------------------------
+# Subcommands
+# ---------------------------
+def cmd_tickers(args):
+    if args.config:
+        from load_data import load_tickers_from_json
+        tickers = load_tickers_from_json(args.config)
+    else:
+        tickers = stored_tickers(args.data_dir)
+    print("\n".join(tickers))
+
+
+def cmd_signal(args):
+    tickers = [t.upper() for t in args.tickers] or None
+    results = cached_signals(args.data_dir, tickers)
+    if results is None:
+        from screen import screen
+        results = screen(args.data_dir, tickers=tickers)
+    _print_signals(results)
+
+
+def cmd_fetch(args):
+    from load_data import fetch_and_store_ticker_data, load_tickers_from_json
+    tickers = args.tickers or load_tickers_from_json(args.config)
+    if not tickers:
+        print("No tickers loaded. Please check your tickers.json file.")
+        return 1
+    fetch_and_store_ticker_data(tickers, data_dir=args.data_dir, years=args.years,
+                                max_workers=args.workers)
+
+
+def cmd_indicators(args):
+    from indicators_main import process_all_tickers
+    process_all_tickers(data_dir=args.data_dir, extra_indicators=args.extra,
+                        incremental=args.incremental,
+                        workers=args.workers, use_cache=not args.no_cache)
+
+
+def cmd_signals(args):
+    from generate_signals import main
+    main(workers=args.workers, only_signal_changes=args.only_changes, force=args.force,
+         data_dir=args.data_dir, signals_dir=args.signals_dir,
+         lookback_days=args.lookback_days, max_points=args.max_points or None,
+         thumbnail=args.thumbnail)
+
+
+def cmd_screen(args):
+    from screen import screen, write_results
+    results = screen(args.data_dir, tickers=args.tickers or None, as_of=args.as_of,
+                     use_cache=not args.no_cache)
+    write_results(results, args.output, args.format)
+
+
+def cmd_events(args):
+    from event_index import update_index, write_events
+    index = update_index(args.data_dir)
+    tickers = args.tickers or None
+    if args.days:
+        events = index.recent(args.days, args.event, args.direction, tickers, as_of=args.until)
+    else:
+        events = index.query(args.event, args.direction, tickers, args.since, args.until)
+    write_events(events, args.output, args.format)
+
+
+def cmd_serve(args):
+    from query_service import run_server
+    run_server(args.data_dir, args.host, args.port, args.poll)
+
+
+def cmd_seasonality(args):
+    from seasonality import analyze_universe, report
+    report(analyze_universe(args.data_dir, tickers=args.tickers or None,
+                            resamples=args.resamples, workers=args.workers), args.output)
+
+
+def cmd_run(args):
+    from pipeline import run_pipeline
+    run_pipeline(args.data_dir, args.signals_dir, fetch=not args.no_fetch,
+                 workers=args.workers, force=args.force,
+                 seasonality=not args.no_seasonality)
+
+
+def build_parser():
+    workers = os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Stock data, indicators and signals")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--metrics", help="JSON lines file to record per-stage metrics to")
+    parser.add_argument("--profile", help="Directory to write per-stage cProfile dumps to")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record peak memory per stage (slower)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("tickers", help="List stored tickers")
+    p.add_argument("--config", help="List the tickers of a JSON config file instead")
+    p.set_defaults(func=cmd_tickers)
+
+    p = commands.add_parser("signal", help="Print the latest signal of tickers")
+    p.add_argument("tickers", nargs="*", help="Tickers (default: all)")
+    p.set_defaults(func=cmd_signal)
+
+    p = commands.add_parser("fetch", help="Download new daily bars")
+    p.add_argument("tickers", nargs="*", help="Tickers (default: from --config)")
+    p.add_argument("--config", default=CONFIG_FILE)
+    p.add_argument("--years", type=int, default=10)
+    p.add_argument("--workers", type=int, default=4)
+    p.set_defaults(func=cmd_fetch)
+
+    p = commands.add_parser("indicators", help="Calculate EMA, MACD and RSI columns")
+    p.add_argument("--incremental", action="store_true", help="Only calculate new rows")
+    p.add_argument("--no-cache", action="store_true", help="Do not use the indicator cache")
+    p.add_argument("--extra", nargs="+", default=[], metavar="SPEC",
+                   help="Further indicators, e.g. bollinger atr:21 stochastic obv")
+    p.add_argument("--workers", type=int, default=workers)
+    p.set_defaults(func=cmd_indicators)
+
+    p = commands.add_parser("signals", help="Render signal charts")
+    p.add_argument("--signals-dir", default=SIGNALS_DIR)
+    p.add_argument("--only-changes", action="store_true",
+                   help="Only render tickers whose latest signal changed")
+    p.add_argument("--force", action="store_true", help="Render every chart")
+    p.add_argument("--lookback-days", type=int, default=CHART_LOOKBACK_DAYS)
+    p.add_argument("--max-points", type=int, default=CHART_MAX_POINTS,
+                   help="Downsample longer lines to this many points (0 for all)")
+    p.add_argument("--thumbnail", action="store_true", help="Render low-DPI thumbnails")
+    p.add_argument("--workers", type=int, default=workers)
+    p.set_defaults(func=cmd_signals)
+
+    p = commands.add_parser("screen", help="Latest signal of every ticker as JSON or CSV")
+    p.add_argument("tickers", nargs="*", help="Tickers (default: all)")
+    p.add_argument("--format", choices=["json", "csv"], default="json")
+    p.add_argument("--output")
+    p.add_argument("--as-of", help="End date of the lookback window (YYYY-MM-DD)")
+    p.add_argument("--no-cache", action="store_true", help="Re-read every ticker")
+    p.set_defaults(func=cmd_screen)
+
+    p = commands.add_parser("events", help="Query the crossover event index")
+    p.add_argument("tickers", nargs="*", help="Tickers (default: all)")
+    p.add_argument("--event", nargs="+", metavar="EVENT",
+                   help="ema_12_26, ema_50_200, macd_zero, macd_signal, rsi_70, rsi_30")
+    p.add_argument("--direction", choices=["bullish", "bearish", "enter", "exit"])
+    p.add_argument("--days", type=int, help="Only the last N calendar days")
+    p.add_argument("--since", help="First date (YYYY-MM-DD)")
+    p.add_argument("--until", help="Last date (YYYY-MM-DD)")
+    p.add_argument("--format", choices=["json", "csv"], default="json")
+    p.add_argument("--output")
+    p.set_defaults(func=cmd_events)
+
+    p = commands.add_parser("serve", help="Serve latest indicators and signals as JSON")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--poll", type=float, default=1.0, help="Seconds between file change checks")
+    p.set_defaults(func=cmd_serve)
+
+    p = commands.add_parser("seasonality", help="Day-of-week, month and turn-of-month statistics")
+    p.add_argument("tickers", nargs="*", help="Tickers (default: all)")
+    p.add_argument("--resamples", type=int, default=20000)
+    p.add_argument("--output", help="CSV file to save the ticker x bucket matrix to")
+    p.add_argument("--workers", type=int, default=1)
+    p.set_defaults(func=cmd_seasonality)
+
+    p = commands.add_parser("run", help="Fetch, then rebuild only stale outputs")
+    p.add_argument("--signals-dir", default=SIGNALS_DIR)
+    p.add_argument("--no-fetch", action="store_true", help="Only rebuild from stored data")
+    p.add_argument("--no-seasonality", action="store_true")
+    p.add_argument("--force", action="store_true", help="Rebuild every output")
+    p.add_argument("--workers", type=int, default=workers)
+    p.set_defaults(func=cmd_run)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.metrics or args.profile):
+        return args.func(args)
+
+    import metrics
+    run = metrics.configure(args.metrics, args.profile, args.trace_memory)
+    try:
+        return args.func(args)
+    finally:
+        have_records = args.metrics and os.path.exists(args.metrics)
+        records = metrics.load_records(args.metrics, run) if have_records else []
+        if records:
+            prom_path = os.path.splitext(args.metrics)[0] + ".prom"
+            metrics.export_prometheus(records, prom_path)
+            print(f"\n✓ Metrics of {len(records)} stages saved to {args.metrics} and {prom_path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,862 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+import numpy as np
+import pandas as pd
+
+# ---------------------------
+# Storage layer for stock_data
+# ---------------------------
+# Every ticker is addressed by its logical path, e.g. stock_data/SPY.csv,
+# whatever format it is actually stored in. Frames use the yfinance layout:
+# a DatetimeIndex named 'Date' and (Price, Ticker) MultiIndex columns.
+#
+# Backends:
+# - csv: the original multi-header yfinance CSV (text)
+# - npy: a <TICKER>.cols/ directory holding one memory-mappable .npy file
+#        per column, a datetime64 index and a meta.json that records the
+#        files of the current write
+#
+# The backend of a ticker is the columnar one when <TICKER>.cols/ exists,
+# otherwise CSV. Set STOCK_DATA_BACKEND=csv|npy to force one.
+#
+# Daily updates do not rewrite the history: append_frame stores the new
+# rows as a small delta segment in <TICKER>.delta/ (a CSV per update),
+# which every read merges in. compact() folds the segments back into the
+# base data; append_frame does so every COMPACT_SEGMENTS segments. All
+# files are written to a temporary name of their own writer and moved into
+# place, so a crash mid-write leaves the previous version intact and
+# concurrent writers of a ticker never mix their files: the last complete
+# write wins.
+#
+# Compact mode (STOCK_DATA_PRECISION=float32) stores prices and indicators
+# as float32 and Volume as integers: columnar files take half the space and
+# CSV files hold ~9 instead of 17 significant digits per value. CSV data
+# is parsed as float64, columnar data keeps its stored dtype, and panels
+# follow the same policy (see panel_calc.load_panels). Existing data is
+# converted by STOCK_DATA_PRECISION=float32 python storage.py rewrite (or
+# migrate).
+
+BACKEND_ENV_VAR = 'STOCK_DATA_BACKEND'
+COLUMNAR_SUFFIX = '.cols'
+DELTA_SUFFIX = '.delta'
+COMPACT_SEGMENTS = 20
+PRECISION_ENV_VAR = 'STOCK_DATA_PRECISION'
+INTEGER_COLUMNS = ['Volume']
+
+
+def split_path(path):
+    """
+    Split a logical ticker path into (data_dir, ticker)
+
+    Accepts stock_data/SPY.csv, stock_data/SPY.cols or stock_data/SPY.
+    """
+    data_dir = os.path.dirname(path)
+    name = os.path.basename(path.rstrip(os.sep))
+    for suffix in ('.csv', COLUMNAR_SUFFIX, DELTA_SUFFIX):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return data_dir, name
+
+
+def ticker_path(data_dir, ticker):
+    """
+    Get the logical path of a ticker inside a data directory
+    """
+    return os.path.join(data_dir, f'{ticker}.csv')
+
+
+def compact_mode():
+    """
+    Check whether data is stored in compact (float32) precision
+    """
+    return os.environ.get(PRECISION_ENV_VAR, 'float64') == 'float32'
+
+
+def storage_dtype():
+    """
+    Get the float dtype prices and indicators are stored and panelled in
+    """
+    return np.float32 if compact_mode() else np.float64
+
+
+def compact_frame(df):
+    """
+    Cast a frame to the compact dtypes
+
+    Float columns become float32; Volume becomes int64 unless it has gaps.
+
+    Returns:
+    - DataFrame with the same index and columns
+    """
+    dtypes = {}
+    for column, dtype in df.dtypes.items():
+        name = column[0] if isinstance(column, tuple) else column
+        if name in INTEGER_COLUMNS:
+            if not df[column].isna().any():
+                dtypes[column] = np.int64
+        elif dtype.kind == 'f':
+            dtypes[column] = np.float32
+    return df.astype(dtypes) if dtypes else df
+
+
+def round_to_storage(values):
+    """
+    Round float64 values to what storing and reading them back returns
+
+    Returns:
+    - The values unchanged, or rounded through float32 in compact mode
+    """
+    if not compact_mode():
+        return values
+    return np.asarray(values, dtype=np.float32).astype(np.float64)
+
+
+def replace_file(path, write):
+    """
+    Write a file under a temporary name and move it into place atomically
+
+    The temporary name is unique to the writing process and call, so
+    concurrent writers of the same file never write into each other's
+    temporary file. It is removed if the write fails.
+
+    Parameters:
+    - path: Path of the file
+    - write: Callable writing the content to the path it is given
+    """
+    tmp_path = f'{path}.{os.getpid()}.{uuid.uuid4().hex[:12]}.tmp'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _multiindex_frame(df, ticker):
+    df.columns = pd.MultiIndex.from_arrays(
+        [list(df.columns), [ticker] * len(df.columns)], names=['Price', 'Ticker']
+    )
+    df.index.name = 'Date'
+    return df
+
+
+class CSVBackend:
+    """
+    yfinance-style CSV files: stock_data/<TICKER>.csv
+    """
+
+    name = 'csv'
+
+    def path(self, data_dir, ticker):
+        return os.path.join(data_dir, f'{ticker}.csv')
+
+    def exists(self, data_dir, ticker):
+        return os.path.isfile(self.path(data_dir, ticker))
+
+    def list_tickers(self, data_dir):
+        return [f[:-len('.csv')] for f in os.listdir(data_dir) if f.endswith('.csv')]
+
+    @staticmethod
+    def _header_rows(path):
+        # Multi-header files carry a 'Ticker' row and usually a 'Date' row
+        with open(path, 'r') as f:
+            lines = [f.readline() for _ in range(3)]
+        if not lines[1].startswith('Ticker,'):
+            return 1
+        return 3 if lines[2].startswith('Date,') else 2
+
+    def read(self, data_dir, ticker, columns=None, float_precision=None):
+        return self.read_path(self.path(data_dir, ticker), ticker, columns, float_precision)
+
+    @classmethod
+    def read_path(cls, path, ticker, columns=None, float_precision=None):
+        header_rows = cls._header_rows(path)
+
+        if header_rows == 1:
+            df = pd.read_csv(path, index_col=0, parse_dates=True,
+                             float_precision=float_precision)
+            df = _multiindex_frame(df, ticker)
+        else:
+            df = pd.read_csv(path, header=[0, 1], index_col=0, parse_dates=True,
+                             float_precision=float_precision)
+            df.index.name = 'Date'
+
+        if columns is not None:
+            df = df[[c for c in df.columns if c[0] in columns]]
+        return df
+
+    def write(self, df, data_dir, ticker):
+        replace_file(self.path(data_dir, ticker), df.to_csv)
+
+    @staticmethod
+    def last_date_path(path):
+        # Only the end of the file is read: the last line holds the last date
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            lines = f.read().decode().strip().splitlines()
+        last = lines[-1].split(',')[0] if lines else ''
+        try:
+            return pd.Timestamp(last)
+        except ValueError:
+            # Header only, no rows
+            return None
+
+    def last_date(self, data_dir, ticker):
+        return self.last_date_path(self.path(data_dir, ticker))
+
+    def read_tail(self, data_dir, ticker, rows, columns=None):
+        """
+        Parse only the last rows of the file, reading it from the end
+
+        Returns:
+        - Tuple of (datetime64 index array, dict of column name -> float array)
+        """
+        with open(self.path(data_dir, ticker), 'rb') as f:
+            head = [f.readline() for _ in range(3)]
+            names = head[0].decode().rstrip('\r\n').split(',')[1:]
+            if not head[1].startswith(b'Ticker,'):
+                header_rows = 1
+            else:
+                header_rows = 3 if head[2].startswith(b'Date,') else 2
+
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+
+            # Grow the block read from the end until it holds enough lines
+            block = 24 * (rows + 2) * (len(names) + 1)
+            while True:
+                offset = max(0, size - block)
+                f.seek(offset)
+                lines = f.read().rstrip().split(b'\n')
+                lines = lines[1:] if offset > 0 else lines[header_rows:]
+                if len(lines) >= rows or offset == 0:
+                    break
+                block *= 4
+
+        lines = lines[-rows:] if rows else []
+        fields = b','.join(lines).decode().replace('\r', '').split(',') if lines else []
+        width = len(names) + 1
+
+        dates = fields[0::width]
+        try:
+            index = np.array(dates, dtype='datetime64[ns]')
+        except ValueError:
+            index = pd.to_datetime(dates).values
+
+        nan = float('nan')
+        wanted = names if columns is None else [c for c in names if c in columns]
+        arrays = {}
+        for name in wanted:
+            values = fields[names.index(name) + 1::width]
+            arrays[name] = np.array([float(v) if v else nan for v in values], dtype=float)
+        return index, arrays
+
+    def fingerprint(self, data_dir, ticker):
+        digest = hashlib.sha1()
+        with open(self.path(data_dir, ticker), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def delete(self, data_dir, ticker):
+        os.remove(self.path(data_dir, ticker))
+
+
+class NumpyBackend:
+    """
+    Columnar storage: stock_data/<TICKER>.cols/{index,<column>}.npy
+
+    Columns are read memory-mapped, so reading only touches the pages of
+    the columns that are actually used.
+
+    meta.json is the commit record of a ticker. Every write stores its
+    index and columns under new file names (prefixed with a generation
+    number) and only then replaces meta.json, so readers always see the
+    files of one complete write, and a crash mid-write leaves the previous
+    generation in place. Readers check that every file has the number of
+    rows meta.json records. Writers of the same ticker take turns on an
+    exclusive lock of <TICKER>.cols/.lock, since they would otherwise pick
+    the same generation and remove each other's files.
+    """
+
+    name = 'npy'
+
+    # Attempts to read one generation; a writer can remove the files of the
+    # previous generation between a reader loading meta.json and the files
+    READ_ATTEMPTS = 3
+
+    def path(self, data_dir, ticker):
+        return os.path.join(data_dir, f'{ticker}{COLUMNAR_SUFFIX}')
+
+    def exists(self, data_dir, ticker):
+        return os.path.isfile(os.path.join(self.path(data_dir, ticker), 'meta.json'))
+
+    def list_tickers(self, data_dir):
+        return [f[:-len(COLUMNAR_SUFFIX)] for f in os.listdir(data_dir)
+                if f.endswith(COLUMNAR_SUFFIX) and self.exists(data_dir, f[:-len(COLUMNAR_SUFFIX)])]
+
+    def read_meta(self, data_dir, ticker):
+        with open(os.path.join(self.path(data_dir, ticker), 'meta.json'), 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _index_file(meta):
+        # Data written before generations were introduced has a plain index.npy
+        return meta.get('index', 'index.npy')
+
+    @staticmethod
+    def _check_rows(ticker, name, length, meta):
+        if 'rows' in meta and length != meta['rows']:
+            raise ValueError(f"{ticker}: {name} has {length} rows, "
+                             f"meta.json records {meta['rows']}")
+
+    def _read_committed(self, data_dir, ticker, load):
+        """
+        Call load(col_dir, meta) on the generation meta.json records,
+        reading meta.json again if the generation is replaced meanwhile
+        """
+        col_dir = self.path(data_dir, ticker)
+        for attempt in range(self.READ_ATTEMPTS):
+            meta = self.read_meta(data_dir, ticker)
+            try:
+                return load(col_dir, meta)
+            except FileNotFoundError:
+                if attempt == self.READ_ATTEMPTS - 1:
+                    raise
+
+    def read_arrays(self, data_dir, ticker, columns=None, mmap_mode='r'):
+        """
+        Read the index and columns as (memory-mapped) NumPy arrays
+
+        Returns:
+        - Tuple of (index array, dict of column name -> array)
+        """
+        def load(col_dir, meta):
+            names = meta['columns'] if columns is None else [c for c in meta['columns'] if c in columns]
+            index = np.load(os.path.join(col_dir, self._index_file(meta)), mmap_mode=mmap_mode)
+            self._check_rows(ticker, 'index', len(index), meta)
+            arrays = {}
+            for name in names:
+                arrays[name] = np.load(os.path.join(col_dir, meta['files'][name]), mmap_mode=mmap_mode)
+                self._check_rows(ticker, name, len(arrays[name]), meta)
+            return index, arrays
+
+        return self._read_committed(data_dir, ticker, load)
+
+    @staticmethod
+    def _load_tail(path, rows, layout=None):
+        # Read only the bytes of the last rows. Returns the tail and the
+        # number of rows the file holds, counted from its size so that a
+        # truncated file fails the row check. layout is the (data offset,
+        # dtype) meta.json records for the file; without it (data written
+        # before layouts were recorded) the .npy header is parsed
+        with open(path, 'rb') as f:
+            if layout is not None:
+                offset, dtype = layout[0], np.dtype(layout[1])
+            else:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    _, _, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    _, _, dtype = np.lib.format.read_array_header_2_0(f)
+                offset = f.tell()
+            total = (os.fstat(f.fileno()).st_size - offset) // dtype.itemsize
+            start = max(0, total - rows)
+            f.seek(offset + start * dtype.itemsize)
+            return np.fromfile(f, dtype=dtype, count=total - start), total
+
+    def read_tail(self, data_dir, ticker, rows, columns=None):
+        def load(col_dir, meta):
+            names = meta['columns'] if columns is None else [c for c in meta['columns'] if c in columns]
+            layout = meta.get('layout', {})
+            index_file = self._index_file(meta)
+            index, length = self._load_tail(os.path.join(col_dir, index_file), rows,
+                                            layout.get(index_file))
+            self._check_rows(ticker, 'index', length, meta)
+            arrays = {}
+            for name in names:
+                file = meta['files'][name]
+                values, length = self._load_tail(os.path.join(col_dir, file), rows,
+                                                 layout.get(file))
+                self._check_rows(ticker, name, length, meta)
+                arrays[name] = values.astype(float)
+            return index, arrays
+
+        return self._read_committed(data_dir, ticker, load)
+
+    def read(self, data_dir, ticker, columns=None, float_precision=None):
+        index, arrays = self.read_arrays(data_dir, ticker, columns)
+        # DataFrame construction copies the columns; copy the index too so
+        # the frame never points into files that a later write removes
+        df = pd.DataFrame(arrays, index=pd.DatetimeIndex(np.array(index)))
+        return _multiindex_frame(df, ticker)
+
+    def _save(self, path, values):
+        # Written to a temporary name and moved into place, so a file of the
+        # new generation is never seen half-written. Returns the layout
+        # read_tail needs to skip the header: (data offset, dtype)
+        def save(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+        replace_file(path, save)
+        return [os.path.getsize(path) - values.nbytes, values.dtype.str]
+
+    def write(self, df, data_dir, ticker):
+        col_dir = self.path(data_dir, ticker)
+        os.makedirs(col_dir, exist_ok=True)
+        with open(os.path.join(col_dir, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._write(df, col_dir, data_dir, ticker)
+
+    def _write(self, df, col_dir, data_dir, ticker):
+        try:
+            generation = self.read_meta(data_dir, ticker).get('generation', 0) + 1
+        except (OSError, ValueError):
+            generation = 1
+        prefix = f'g{generation}_'
+
+        index_file = f'{prefix}index.npy'
+        layout = {}
+        layout[index_file] = self._save(os.path.join(col_dir, index_file),
+                                        pd.DatetimeIndex(df.index).values.astype('datetime64[ns]'))
+
+        names = [c[0] if isinstance(c, tuple) else c for c in df.columns]
+        files = {}
+        for i, name in enumerate(names):
+            files[name] = f'{prefix}{i:03d}_{name}.npy'
+            values = df.iloc[:, i].to_numpy()
+            if values.dtype.kind not in 'iuf':
+                values = values.astype(float)
+            layout[files[name]] = self._save(os.path.join(col_dir, files[name]),
+                                             np.ascontiguousarray(values))
+
+        # Commit: readers switch to the new generation when meta.json is replaced
+        meta = {'ticker': ticker, 'rows': len(df), 'columns': names, 'files': files,
+                'index': index_file, 'generation': generation, 'layout': layout}
+
+        def dump_meta(path):
+            with open(path, 'w') as f:
+                json.dump(meta, f, indent=2)
+        replace_file(os.path.join(col_dir, 'meta.json'), dump_meta)
+
+        # Remove the files of earlier (or interrupted) generations. Readers
+        # that still map them keep their data; readers that had not opened
+        # them yet read meta.json again
+        current = set(files.values()) | {index_file}
+        for f in os.listdir(col_dir):
+            if f.endswith('.npy') and f not in current:
+                os.remove(os.path.join(col_dir, f))
+
+    def last_date(self, data_dir, ticker):
+        def load(col_dir, meta):
+            return np.load(os.path.join(col_dir, self._index_file(meta)), mmap_mode='r')
+
+        index = self._read_committed(data_dir, ticker, load)
+        return pd.Timestamp(index[-1]) if len(index) else None
+
+    def fingerprint(self, data_dir, ticker):
+        def load(col_dir, meta):
+            # File names change with every write; only the contents count
+            described = {k: meta[k] for k in ('ticker', 'rows', 'columns') if k in meta}
+            digest = hashlib.sha1(json.dumps(described, sort_keys=True).encode())
+            for name in [self._index_file(meta)] + [meta['files'][c] for c in meta['columns']]:
+                with open(os.path.join(col_dir, name), 'rb') as f:
+                    digest.update(f.read())
+            return digest.hexdigest()
+
+        return self._read_committed(data_dir, ticker, load)
+
+    def delete(self, data_dir, ticker):
+        shutil.rmtree(self.path(data_dir, ticker))
+
+
+BACKENDS = {
+    'csv': CSVBackend(),
+    'npy': NumpyBackend(),
+}
+
+
+def register_backend(backend):
+    """
+    Register an additional storage backend under backend.name
+    """
+    BACKENDS[backend.name] = backend
+
+
+def get_backend(data_dir, ticker):
+    """
+    Get the storage backend a ticker is stored with
+    """
+    forced = os.environ.get(BACKEND_ENV_VAR)
+    if forced:
+        return BACKENDS[forced]
+    if BACKENDS['npy'].exists(data_dir, ticker):
+        return BACKENDS['npy']
+    return BACKENDS['csv']
+
+
+def _delta_dir(data_dir, ticker):
+    return os.path.join(data_dir, f'{ticker}{DELTA_SUFFIX}')
+
+
+def _segments(data_dir, ticker):
+    # Segment files are numbered, so name order is append order
+    delta_dir = _delta_dir(data_dir, ticker)
+    if not os.path.isdir(delta_dir):
+        return []
+    return [os.path.join(delta_dir, f) for f in sorted(os.listdir(delta_dir))
+            if f.endswith('.csv')]
+
+
+def _clear_segments(data_dir, ticker):
+    delta_dir = _delta_dir(data_dir, ticker)
+    if os.path.isdir(delta_dir):
+        shutil.rmtree(delta_dir)
+
+
+def _merge_segments(df, data_dir, ticker, columns=None, float_precision=None):
+    segments = _segments(data_dir, ticker)
+    if not segments:
+        return df
+
+    frames = [df] + [CSVBackend.read_path(path, ticker, columns, float_precision)
+                     for path in segments]
+    merged = pd.concat(frames)
+    # Rows of an interrupted compaction can be in both; the segment wins
+    if merged.index.has_duplicates:
+        merged = merged[~merged.index.duplicated(keep='last')]
+    if not merged.index.is_monotonic_increasing:
+        merged = merged.sort_index()
+    return merged
+
+
+def exists(path):
+    """
+    Check whether a ticker exists in any backend
+    """
+    data_dir, ticker = split_path(path)
+    return any(b.exists(data_dir, ticker) for b in BACKENDS.values())
+
+
+def fingerprint(path):
+    """
+    Get a content hash of a ticker's stored data
+
+    The hash changes whenever any stored value changes, so it can be used
+    to decide whether outputs derived from the data are still current.
+
+    Returns:
+    - Hex digest string
+    """
+    data_dir, ticker = split_path(path)
+    backend = get_backend(data_dir, ticker)
+    digest = backend.fingerprint(data_dir, ticker)
+
+    segments = _segments(data_dir, ticker)
+    if segments:
+        combined = hashlib.sha1(digest.encode())
+        for segment in segments:
+            with open(segment, 'rb') as f:
+                combined.update(f.read())
+        digest = combined.hexdigest()
+
+    return f'{backend.name}:{digest}'
+
+
+def list_tickers(data_dir):
+    """
+    List all tickers stored in a data directory, across backends
+
+    Returns:
+    - Sorted list of ticker symbols
+    """
+    tickers = set()
+    for backend in BACKENDS.values():
+        tickers.update(backend.list_tickers(data_dir))
+    return sorted(tickers)
+
+
+def read_frame(path, columns=None, float_precision=None):
+    """
+    Read a ticker's data
+
+    Parameters:
+    - path: Logical path of the ticker (e.g. stock_data/SPY.csv)
+    - columns: Optional list of column names (e.g. ['Close']) to read
+    - float_precision: Passed to the CSV parser; use 'round_trip' when
+      values must survive a read/write cycle bit for bit
+
+    Returns:
+    - DataFrame with DatetimeIndex 'Date' and (Price, Ticker) columns
+    """
+    data_dir, ticker = split_path(path)
+    df = get_backend(data_dir, ticker).read(data_dir, ticker, columns, float_precision)
+    return _merge_segments(df, data_dir, ticker, columns, float_precision)
+
+
+def write_frame(df, path):
+    """
+    Write a ticker's data with the ticker's backend
+
+    Parameters:
+    - df: DataFrame with DatetimeIndex and (Price, Ticker) columns
+    - path: Logical path of the ticker (e.g. stock_data/SPY.csv)
+    """
+    data_dir, ticker = split_path(path)
+    if compact_mode():
+        df = compact_frame(df)
+    get_backend(data_dir, ticker).write(df, data_dir, ticker)
+    # The frame holds the full history, pending segments included
+    _clear_segments(data_dir, ticker)
+
+
+def last_date(path):
+    """
+    Get the last stored date of a ticker without reading its history
+
+    Returns:
+    - Timestamp, or None if the ticker has no rows
+    """
+    data_dir, ticker = split_path(path)
+    segments = _segments(data_dir, ticker)
+    if segments:
+        return CSVBackend.last_date_path(segments[-1])
+    return get_backend(data_dir, ticker).last_date(data_dir, ticker)
+
+
+def append_frame(df, path, compact_every=COMPACT_SEGMENTS):
+    """
+    Append rows that are strictly newer than a ticker's stored data
+
+    The rows are written as a new delta segment, so the cost depends only
+    on the number of new rows. Every compact_every segments the ticker is
+    compacted.
+
+    Parameters:
+    - df: DataFrame of new rows (DatetimeIndex, (Price, Ticker) columns)
+    - path: Logical path of the ticker (e.g. stock_data/SPY.csv)
+    - compact_every: Compact once this many segments are pending (None to never)
+
+    Returns:
+    - Number of segments pending after the append
+    """
+    data_dir, ticker = split_path(path)
+    last = last_date(path)
+    if last is not None and df.index.min() <= last:
+        raise ValueError(f"{ticker}: appended rows must be newer than {last.date()}")
+
+    segments = _segments(data_dir, ticker)
+    if segments:
+        number = int(os.path.splitext(os.path.basename(segments[-1]))[0]) + 1
+    else:
+        number = 1
+
+    if compact_mode():
+        df = compact_frame(df)
+
+    delta_dir = _delta_dir(data_dir, ticker)
+    os.makedirs(delta_dir, exist_ok=True)
+    replace_file(os.path.join(delta_dir, f'{number:06d}.csv'), df.to_csv)
+
+    pending = len(segments) + 1
+    if compact_every and pending >= compact_every:
+        compact(path)
+        return 0
+    return pending
+
+
+def compact(path):
+    """
+    Merge a ticker's delta segments back into its base data
+
+    Returns:
+    - True if segments were merged, False if there was nothing to do
+    """
+    data_dir, ticker = split_path(path)
+    if not _segments(data_dir, ticker):
+        return False
+    write_frame(read_frame(path, float_precision='round_trip'), path)
+    return True
+
+
+def compact_all(data_dir='stock_data'):
+    """
+    Compact every ticker in a data directory that has delta segments
+    """
+    compacted = 0
+    for ticker in list_tickers(data_dir):
+        try:
+            if compact(ticker_path(data_dir, ticker)):
+                compacted += 1
+                print(f"✓ {ticker}: compacted")
+        except Exception as e:
+            print(f"✗ {ticker}: Error - {str(e)}")
+
+    print(f"\nCompaction complete: {compacted} tickers compacted")
+
+
+def read_arrays(path, columns=None):
+    """
+    Read a ticker's index and columns as NumPy arrays
+
+    Columnar tickers are returned memory-mapped (zero-copy) unless they
+    have pending delta segments; CSV tickers are parsed.
+
+    Returns:
+    - Tuple of (datetime64 index array, dict of column name -> array)
+    """
+    data_dir, ticker = split_path(path)
+    backend = get_backend(data_dir, ticker)
+    if isinstance(backend, NumpyBackend) and not _segments(data_dir, ticker):
+        return backend.read_arrays(data_dir, ticker, columns)
+
+    df = read_frame(path, columns)
+    arrays = {c[0]: df[c].to_numpy() for c in df.columns}
+    return df.index.values, arrays
+
+
+def stat_signature(path):
+    """
+    Get a cheap token that changes whenever a ticker's stored data changes
+
+    Unlike fingerprint() no data is read: the token is built from the size
+    and modification time of the files (every write replaces them).
+
+    Returns:
+    - String token
+    """
+    data_dir, ticker = split_path(path)
+    backend = get_backend(data_dir, ticker)
+    if isinstance(backend, NumpyBackend):
+        base = os.path.join(backend.path(data_dir, ticker), 'meta.json')
+    else:
+        base = backend.path(data_dir, ticker)
+
+    parts = []
+    for file_path in [base] + _segments(data_dir, ticker):
+        st = os.stat(file_path)
+        parts.append(f'{os.path.basename(file_path)}:{st.st_size}:{st.st_mtime_ns}')
+    return f'{backend.name}|' + '|'.join(parts)
+
+
+def read_tail(path, rows, columns=None):
+    """
+    Read only the last rows of a ticker
+
+    CSV files are read from the end and columnar tickers are sliced, so
+    the cost does not grow with the length of the history.
+
+    Parameters:
+    - path: Logical path of the ticker (e.g. stock_data/SPY.csv)
+    - rows: Number of trailing rows to read
+    - columns: Optional list of column names to read
+
+    Returns:
+    - Tuple of (datetime64 index array, dict of column name -> float array)
+    """
+    data_dir, ticker = split_path(path)
+    if _segments(data_dir, ticker):
+        # Parsed exactly, as the CSV backend parses tails
+        df = read_frame(path, columns, float_precision='round_trip')
+        df = df.iloc[max(0, len(df) - rows):]
+        return df.index.values, {c[0]: df[c].to_numpy(dtype=float) for c in df.columns}
+    return get_backend(data_dir, ticker).read_tail(data_dir, ticker, rows, columns)
+
+
+def migrate_csv_to_columnar(data_dir='stock_data'):
+    """
+    One-shot migration of every CSV in a data directory to columnar storage
+
+    The CSV files are kept so they can still be read by other tools;
+    after migration the columnar copy is the one that gets read and
+    written. Use export_csv to refresh the CSVs.
+
+    Parameters:
+    - data_dir: Directory containing CSV files
+    """
+    csv_backend, npy_backend = BACKENDS['csv'], BACKENDS['npy']
+    tickers = sorted(csv_backend.list_tickers(data_dir))
+
+    for ticker in tickers:
+        try:
+            df = csv_backend.read(data_dir, ticker, float_precision='round_trip')
+            df = _merge_segments(df, data_dir, ticker, float_precision='round_trip')
+            if compact_mode():
+                df = compact_frame(df)
+            npy_backend.write(df, data_dir, ticker)
+            _clear_segments(data_dir, ticker)
+            print(f"✓ {ticker}: {len(df)} rows migrated to {npy_backend.path(data_dir, ticker)}")
+        except Exception as e:
+            print(f"✗ {ticker}: Error - {str(e)}")
+
+    print(f"\nMigration complete: {len(tickers)} tickers")
+
+
+def rewrite_all(data_dir='stock_data'):
+    """
+    Rewrite every ticker with its backend, in the current precision
+
+    Converts existing data after switching STOCK_DATA_PRECISION; pending
+    delta segments are merged in on the way.
+
+    Parameters:
+    - data_dir: Data directory
+    """
+    tickers = list_tickers(data_dir)
+    for ticker in tickers:
+        path = ticker_path(data_dir, ticker)
+        try:
+            write_frame(read_frame(path, float_precision='round_trip'), path)
+            print(f"✓ {ticker}: rewritten as {storage_dtype().__name__}")
+        except Exception as e:
+            print(f"✗ {ticker}: Error - {str(e)}")
+
+    print(f"\nRewrite complete: {len(tickers)} tickers")
+
+
+def export_csv(data_dir='stock_data', tickers=None):
+    """
+    Export columnar tickers back to yfinance-style CSV files
+
+    Parameters:
+    - data_dir: Data directory
+    - tickers: Optional list of tickers (default: all columnar tickers)
+    """
+    csv_backend, npy_backend = BACKENDS['csv'], BACKENDS['npy']
+    if tickers is None:
+        tickers = sorted(npy_backend.list_tickers(data_dir))
+
+    for ticker in tickers:
+        try:
+            df = _merge_segments(npy_backend.read(data_dir, ticker), data_dir, ticker)
+            csv_backend.write(df, data_dir, ticker)
+            print(f"✓ {ticker}: exported to {csv_backend.path(data_dir, ticker)}")
+        except Exception as e:
+            print(f"✗ {ticker}: Error - {str(e)}")
+
+
+# Example usage
+if __name__ == "__main__":
+    # python storage.py migrate  -> convert stock_data/*.csv to columnar
+    # python storage.py export   -> write stock_data/*.csv from columnar
+    # python storage.py compact  -> merge delta segments into the base data
+    # python storage.py rewrite  -> rewrite all tickers in the current precision
+    command = sys.argv[1] if len(sys.argv) > 1 else 'migrate'
+    if command == 'migrate':
+        migrate_csv_to_columnar('stock_data')
+    elif command == 'export':
+        export_csv('stock_data')
+    elif command == 'compact':
+        compact_all('stock_data')
+    elif command == 'rewrite':
+        rewrite_all('stock_data')
+    else:
+        print(f"Unknown command '{command}'. Use 'migrate', 'export', 'compact' or 'rewrite'.")
@@ -0,0 +1,394 @@
+from math import copysign
+from storage import read_arrays, read_tail
+
+# ---------------------------
+# Streaming indicator calculators
+# ---------------------------
+# Each calculator takes one bar at a time in constant time and memory and
+# produces the same values as the full-history functions in ema_calc,
+# macd_calc and rsi_calc, bit for bit: the update steps follow pandas'
+# ewm(adjust=False) and rolling().mean() kernels operation by operation.
+#
+# update(x) commits a bar and returns the new value. peek(x) returns the
+# value the current bar would get at price x without committing it, for
+# intraday ticks of a bar that has not closed yet.
+
+NAN = float('nan')
+
+
+class StreamingEMA:
+    """
+    Streaming ewm(span=period, adjust=False).mean(), as calculate_ema
+
+    Parameters:
+    - period: EMA span
+    - alpha: Smoothing factor instead of a span (e.g. 1/14 for Wilder)
+    - value: Last EMA value of the stored history to continue from
+    """
+
+    __slots__ = ('alpha', 'old_wt_factor', 'old_wt', 'value')
+
+    def __init__(self, period=None, alpha=None, value=None):
+        # Same conversions as pandas: span or alpha -> center of mass -> alpha
+        com = (period - 1) / 2.0 if alpha is None else (1 - alpha) / alpha
+        self.alpha = 1. / (1. + com)
+        self.old_wt_factor = 1. - self.alpha
+        self.old_wt = 1.
+        self.value = NAN if value is None else float(value)
+
+    @classmethod
+    def from_history(cls, values, period=None, alpha=None):
+        """Build a calculator by feeding a full history of values."""
+        ema = cls(period, alpha)
+        for x in values:
+            ema.update(x)
+        return ema
+
+    def _step(self, x):
+        weighted = self.value
+        old_wt = self.old_wt
+        if weighted == weighted:
+            # Missing values decay the old weight too (ignore_na=False)
+            old_wt *= self.old_wt_factor
+            if x == x:
+                # pandas leaves the average untouched when the value equals it
+                if weighted != x:
+                    weighted = (old_wt * weighted + self.alpha * x) / (old_wt + self.alpha)
+                old_wt = 1.
+        elif x == x:
+            weighted = x
+        return weighted, old_wt
+
+    def update(self, x):
+        self.value, self.old_wt = self._step(x)
+        return self.value
+
+    def peek(self, x):
+        return self._step(x)[0]
+
+
+class StreamingMACD:
+    """
+    Streaming MACD, as calculate_macd
+
+    Parameters:
+    - fast: Fast EMA period (default 12)
+    - slow: Slow EMA period (default 26)
+    - signal: Signal line EMA period (default 9)
+    - ema_fast, ema_slow, signal_value: Last fast EMA, slow EMA and signal
+      line values of the stored history to continue from
+    """
+
+    __slots__ = ('fast', 'slow', 'signal')
+
+    def __init__(self, fast=12, slow=26, signal=9, ema_fast=None, ema_slow=None,
+                 signal_value=None):
+        self.fast = StreamingEMA(fast, value=ema_fast)
+        self.slow = StreamingEMA(slow, value=ema_slow)
+        self.signal = StreamingEMA(signal, value=signal_value)
+
+    @classmethod
+    def from_history(cls, closes, fast=12, slow=26, signal=9):
+        """Build a calculator by feeding a full history of closes."""
+        macd = cls(fast, slow, signal)
+        for x in closes:
+            macd.update(x)
+        return macd
+
+    def update(self, close):
+        """
+        Returns:
+        - Tuple of (macd, signal_line, histogram)
+        """
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal_line = self.signal.update(macd)
+        return macd, signal_line, macd - signal_line
+
+    def peek(self, close):
+        macd = self.fast.peek(close) - self.slow.peek(close)
+        signal_line = self.signal.peek(macd)
+        return macd, signal_line, macd - signal_line
+
+
+class _RollingMean:
+    """
+    Streaming rolling(window).mean() of a series without missing values
+
+    Follows pandas' running-sum kernel: Kahan-compensated add and remove,
+    sign clamping, and windows of one repeated value.
+    """
+
+    __slots__ = ('window', 'buffer', 'pos', 'nobs', 'sum_x', 'compensation_add',
+                 'compensation_remove', 'neg_ct', 'same_ct', 'prev_value')
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [0.] * window
+        self.pos = 0
+        self.nobs = 0
+        self.sum_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev_value = None
+
+    def _state(self):
+        return (self.buffer[self.pos], self.pos, self.nobs, self.sum_x, self.compensation_add,
+                self.compensation_remove, self.neg_ct, self.same_ct, self.prev_value)
+
+    def _restore(self, state):
+        (value, self.pos, self.nobs, self.sum_x, self.compensation_add,
+         self.compensation_remove, self.neg_ct, self.same_ct, self.prev_value) = state
+        self.buffer[self.pos] = value
+
+    def update(self, val):
+        if self.nobs == self.window:
+            # Remove the value leaving the window
+            old = self.buffer[self.pos]
+            y = -old - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            self.nobs -= 1
+            if copysign(1., old) < 0:
+                self.neg_ct -= 1
+
+        # Add the value entering the window
+        y = val - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        self.nobs += 1
+        if copysign(1., val) < 0:
+            self.neg_ct += 1
+
+        if self.prev_value is None:
+            self.prev_value = val
+        self.same_ct = self.same_ct + 1 if val == self.prev_value else 1
+        self.prev_value = val
+
+        self.buffer[self.pos] = val
+        self.pos = (self.pos + 1) % self.window
+
+        if self.nobs < self.window:
+            return NAN
+        if self.same_ct >= self.nobs:
+            return val
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.
+        return result
+
+    def peek(self, val):
+        state = self._state()
+        result = self.update(val)
+        self._restore(state)
+        return result
+
+
+def _rsi(avg_gain, avg_loss):
+    # 100 - 100 / (1 + gain / loss) with NumPy's division semantics
+    if avg_loss == 0:
+        if avg_gain == 0 or avg_gain != avg_gain:
+            return NAN
+        return 100.
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def _gain_loss(delta):
+    # Same values as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0):
+    # missing deltas count as 0 and losses of non-negative moves are -0.0
+    gain = delta if delta > 0 else 0.
+    loss = -(delta if delta < 0 else 0.)
+    return gain, loss
+
+
+class StreamingRSI:
+    """
+    Streaming RSI with simple moving averages, as calculate_rsi
+
+    Parameters:
+    - period: Number of periods for RSI calculation (default 14)
+    """
+
+    __slots__ = ('prev_close', 'gain', 'loss')
+
+    def __init__(self, period=14):
+        self.prev_close = None
+        self.gain = _RollingMean(period)
+        self.loss = _RollingMean(period)
+
+    @classmethod
+    def from_history(cls, closes, period=14):
+        """
+        Build a calculator by feeding a history of closes
+
+        Feeding the full history matches calculate_rsi exactly; the last
+        period + 1 closes are enough to fill the window.
+        """
+        rsi = cls(period)
+        for x in closes:
+            rsi.update(x)
+        return rsi
+
+    def _delta(self, close):
+        return NAN if self.prev_close is None else close - self.prev_close
+
+    def update(self, close):
+        gain, loss = _gain_loss(self._delta(close))
+        self.prev_close = close
+        return _rsi(self.gain.update(gain), self.loss.update(loss))
+
+    def peek(self, close):
+        gain, loss = _gain_loss(self._delta(close))
+        return _rsi(self.gain.peek(gain), self.loss.peek(loss))
+
+
+class StreamingWilderRSI:
+    """
+    Streaming Wilder-smoothed RSI (ewm with alpha = 1 / period), as in
+    archive/spy_daily_ema_incr.py
+
+    Parameters:
+    - period: Number of periods for RSI calculation (default 14)
+    """
+
+    __slots__ = ('prev_close', 'gain', 'loss')
+
+    def __init__(self, period=14):
+        self.prev_close = None
+        self.gain = StreamingEMA(alpha=1 / period)
+        self.loss = StreamingEMA(alpha=1 / period)
+
+    @classmethod
+    def from_history(cls, closes, period=14):
+        """Build a calculator by feeding a full history of closes."""
+        rsi = cls(period)
+        for x in closes:
+            rsi.update(x)
+        return rsi
+
+    def _delta(self, close):
+        return NAN if self.prev_close is None else close - self.prev_close
+
+    def update(self, close):
+        gain, loss = _gain_loss(self._delta(close))
+        self.prev_close = close
+        return _rsi(self.gain.update(gain), self.loss.update(loss))
+
+    def peek(self, close):
+        gain, loss = _gain_loss(self._delta(close))
+        return _rsi(self.gain.peek(gain), self.loss.peek(loss))
+
+
+class TickerStream:
+    """
+    All indicators of one ticker, updated together one bar at a time
+
+    Parameters:
+    - ema_periods: List of EMA periods
+    - macd_fast, macd_slow, macd_signal: MACD periods
+    - rsi_period: RSI period
+    - wilder_period: Wilder RSI period (None to skip)
+    """
+
+    __slots__ = ('emas', 'macd', 'rsi', 'rsi_period', 'wilder', 'wilder_period')
+
+    def __init__(self, ema_periods=[12, 26, 50, 200], macd_fast=12, macd_slow=26,
+                 macd_signal=9, rsi_period=14, wilder_period=None):
+        self.emas = {period: StreamingEMA(period) for period in ema_periods}
+        self.macd = StreamingMACD(macd_fast, macd_slow, macd_signal)
+        self.rsi = StreamingRSI(rsi_period)
+        self.rsi_period = rsi_period
+        self.wilder = StreamingWilderRSI(wilder_period) if wilder_period else None
+        self.wilder_period = wilder_period
+
+    @classmethod
+    def from_file(cls, csv_file, ema_periods=[12, 26, 50, 200], macd_fast=12, macd_slow=26,
+                  macd_signal=9, rsi_period=14, wilder_period=None):
+        """
+        Seed the calculators from a ticker's stored data
+
+        EMAs and MACD continue from the last stored indicator values and
+        RSI from the trailing window of closes, so only the tail of the
+        file is read. Indicators that are not stored (and Wilder RSI, whose
+        averages are not stored) are seeded from the full close history.
+
+        Parameters:
+        - csv_file: Path to the ticker's data (e.g. stock_data/SPY.csv)
+        - Other parameters as for TickerStream
+
+        Returns:
+        - TickerStream ready for the next bar
+        """
+        stream = cls(ema_periods, macd_fast, macd_slow, macd_signal, rsi_period, wilder_period)
+
+        _, tail = read_tail(csv_file, rsi_period + 1)
+        last = {name: values[-1] for name, values in tail.items() if len(values)}
+
+        def stored(name):
+            value = last.get(name, NAN)
+            return float(value) if value == value else None
+
+        closes = []
+
+        def history():
+            if not closes:
+                closes.extend(read_arrays(csv_file, ['Close'])[1]['Close'].tolist())
+            return closes
+
+        for period in ema_periods:
+            value = stored(f'EMA_{period}')
+            if value is None:
+                stream.emas[period] = StreamingEMA.from_history(history(), period)
+            else:
+                stream.emas[period] = StreamingEMA(period, value=value)
+
+        ema_fast = stream.emas.get(macd_fast)
+        ema_slow = stream.emas.get(macd_slow)
+        signal_value = stored('MACD_Signal')
+        if ema_fast is not None and ema_slow is not None and signal_value is not None:
+            stream.macd = StreamingMACD(macd_fast, macd_slow, macd_signal,
+                                        ema_fast.value, ema_slow.value, signal_value)
+        else:
+            stream.macd = StreamingMACD.from_history(history(), macd_fast, macd_slow, macd_signal)
+
+        stream.rsi = StreamingRSI.from_history(tail['Close'].tolist(), rsi_period)
+
+        if wilder_period:
+            stream.wilder = StreamingWilderRSI.from_history(history(), wilder_period)
+
+        return stream
+
+    def _values(self, close, commit):
+        step = 'update' if commit else 'peek'
+        values = {f'EMA_{period}': getattr(ema, step)(close) for period, ema in self.emas.items()}
+        values['MACD'], values['MACD_Signal'], values['MACD_Hist'] = getattr(self.macd, step)(close)
+        values[f'RSI_{self.rsi_period}'] = getattr(self.rsi, step)(close)
+        if self.wilder is not None:
+            values[f'RSI_Wilder_{self.wilder_period}'] = getattr(self.wilder, step)(close)
+        return values
+
+    def update(self, close):
+        """
+        Commit a closed bar
+
+        Returns:
+        - Dict of indicator name (e.g. 'EMA_12', 'MACD_Hist') -> value
+        """
+        return self._values(close, True)
+
+    def peek(self, close):
+        """Indicator values for the current bar at price close, not committed."""
+        return self._values(close, False)
+
+
+# Example usage
+if __name__ == "__main__":
+    stream = TickerStream.from_file('stock_data/SPY.csv', wilder_period=14)
+    _, last = read_tail('stock_data/SPY.csv', 1, ['Close'])
+    tick = float(last['Close'][-1]) * 1.001
+    print(f"SPY at {tick:.2f}: {stream.peek(tick)}")
@@ -0,0 +1,245 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from shared_panel import SharedPanel, map_blocks
+from storage import list_tickers, read_arrays, ticker_path
+
+# ---------------------------
+# EMA crossover parameter sweep
+# ---------------------------
+# Evaluates the crossover signals of detect_ema_crossovers for a grid of
+# (fast, slow) EMA spans instead of the fixed 12/26 pair.
+#
+# Every ticker's own bars are stacked top-aligned into a rows x tickers
+# matrix (shorter histories are padded with NaN at the bottom), so one
+# ewm() call per span calculates that EMA for the whole universe, bit for
+# bit as ema_calc does per ticker. Each distinct span is calculated once.
+# Pairs are then evaluated in batches: for every fast span, the crosses
+# against all slower spans are found with one broadcast comparison.
+#
+# Tickers are split into chunks that run on separate worker processes,
+# which all map one shared copy of the close matrix (see shared_panel).
+
+STOCK_DATA_DIR = 'stock_data'
+FAST_SPANS = list(range(5, 51))
+SLOW_SPANS = list(range(20, 251))
+CHUNK_TICKERS = 32
+
+
+def make_grid(fast_spans=FAST_SPANS, slow_spans=SLOW_SPANS):
+    """
+    List the (fast, slow) pairs of a sweep, keeping pairs with fast < slow
+
+    Returns:
+    - List of (fast, slow) tuples
+    """
+    return [(fast, slow) for fast in fast_spans for slow in slow_spans if fast < slow]
+
+
+def load_histories(data_dir=STOCK_DATA_DIR, tickers=None):
+    """
+    Load the close history of every ticker top-aligned in one matrix
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+
+    Returns:
+    - Tuple of (tickers, close array, dates array); both arrays are
+      rows x tickers where row k is the k-th bar of each ticker, padded
+      with NaN / NaT after its last bar
+    """
+    if tickers is None:
+        tickers = list_tickers(data_dir)
+
+    histories = []
+    for ticker in tickers:
+        index, arrays = read_arrays(ticker_path(data_dir, ticker), columns=['Close'])
+        histories.append((np.asarray(index, dtype='datetime64[ns]'),
+                          np.asarray(arrays['Close'], dtype=float)))
+
+    rows = max((len(index) for index, _ in histories), default=0)
+    close = np.full((rows, len(tickers)), np.nan)
+    dates = np.full((rows, len(tickers)), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for j, (index, values) in enumerate(histories):
+        close[:len(values), j] = values
+        dates[:len(index), j] = index
+
+    return list(tickers), close, dates
+
+
+def _ema_stack(close, spans):
+    # spans x tickers x rows, so the per-ticker reductions below run over
+    # contiguous memory; trailing padding only yields trailing rows
+    frame = pd.DataFrame(close)
+    return np.stack([frame.ewm(span=span, adjust=False).mean().to_numpy().T
+                     for span in spans])
+
+
+def _last_true_row(mask):
+    # Index of the last True along the last axis, -1 where there is none
+    rows = mask.shape[-1]
+    last = rows - 1 - mask[..., ::-1].argmax(axis=-1)
+    return np.where(mask.any(axis=-1), last, -1)
+
+
+def _sweep_block(close, pairs):
+    """
+    Crossover statistics of every pair for a block of tickers
+
+    Returns:
+    - Dict of pairs x tickers arrays: bullish / bearish cross counts and
+      the row of the last bullish / bearish cross (-1 if none)
+    """
+    spans = sorted({span for pair in pairs for span in pair})
+    position = {span: k for k, span in enumerate(spans)}
+    emas = _ema_stack(close, spans)
+
+    shape = (len(pairs), close.shape[1])
+    stats = {
+        'bullish': np.zeros(shape, dtype=np.int64),
+        'bearish': np.zeros(shape, dtype=np.int64),
+        'last_bullish': np.full(shape, -1),
+        'last_bearish': np.full(shape, -1),
+    }
+    if close.shape[0] < 2:
+        return stats
+
+    # EMAs are NaN until a ticker's first observation, whatever the span
+    # (later NaN closes carry the average forward), so "at or below" in
+    # detect_ema_crossovers is "not above" on any started row
+    started = np.maximum.accumulate(~np.isnan(close), axis=0).T
+    not_started = ~started[:, :-1]
+
+    by_fast = {}
+    for p, (fast, slow) in enumerate(pairs):
+        by_fast.setdefault(fast, []).append((p, slow))
+
+    for fast, group in by_fast.items():
+        rows = [p for p, _ in group]
+        fast_ema = emas[position[fast]][None]
+
+        # Compare against a view of the slow spans' range; only the bool
+        # results are gathered when the slow spans are not contiguous
+        slows = np.array([position[slow] for _, slow in group])
+        lo, hi = slows.min(), slows.max() + 1
+        above = fast_ema > emas[lo:hi]
+        below = fast_ema < emas[lo:hi]
+        if hi - lo != len(slows) or np.any(np.diff(slows) != 1):
+            above, below = above[slows - lo], below[slows - lo]
+
+        # Bool a > b is a & ~b: above now, and not above before
+        bullish = np.greater(above[..., 1:], above[..., :-1] | not_started)
+        bearish = np.greater(below[..., 1:], below[..., :-1] | not_started)
+
+        stats['bullish'][rows] = np.count_nonzero(bullish, axis=-1)
+        stats['bearish'][rows] = np.count_nonzero(bearish, axis=-1)
+
+        # Crosses start at the second row
+        for name, mask in (('last_bullish', bullish), ('last_bearish', bearish)):
+            last = _last_true_row(mask)
+            stats[name][rows] = np.where(last >= 0, last + 1, -1)
+
+    return stats
+
+
+def _sweep_shared_block(frames, pairs):
+    return _sweep_block(frames['close'].to_numpy(), pairs)
+
+
+def sweep_crossovers(data_dir=STOCK_DATA_DIR, tickers=None, fast_spans=FAST_SPANS,
+                     slow_spans=SLOW_SPANS, workers=1, chunk_tickers=CHUNK_TICKERS):
+    """
+    Evaluate EMA crossover signals for a grid of (fast, slow) spans across
+    all tickers
+
+    Parameters:
+    - data_dir: Directory containing ticker data
+    - tickers: Optional list of tickers (default: all tickers in data_dir)
+    - fast_spans: Fast EMA spans
+    - slow_spans: Slow EMA spans (pairs with fast >= slow are skipped)
+    - workers: Number of worker processes
+    - chunk_tickers: Tickers per worker task
+
+    Returns:
+    - DataFrame with one row per (fast, slow, ticker): bullish and bearish
+      cross counts, latest signal and last cross date over the full history
+    """
+    pairs = make_grid(fast_spans, slow_spans)
+    tickers, close, dates = load_histories(data_dir, tickers)
+
+    print(f"Sweeping {len(pairs)} EMA pairs over {len(tickers)} tickers "
+          f"({len({s for pair in pairs for s in pair})} distinct spans)...")
+
+    if workers > 1 and len(tickers) > chunk_tickers:
+        # Workers map the close matrix instead of receiving pickled copies
+        with SharedPanel.create({'close': close}, tickers) as shared:
+            results = map_blocks(_sweep_shared_block, shared, ['close'], args=(pairs,),
+                                 workers=workers, chunk_tickers=chunk_tickers)
+    else:
+        results = [_sweep_block(close[:, start:start + chunk_tickers], pairs)
+                   for start in range(0, len(tickers), chunk_tickers)]
+
+    stats = {name: np.concatenate([r[name] for r in results], axis=1)
+             if results else np.empty((len(pairs), 0), dtype=np.int64)
+             for name in ('bullish', 'bearish', 'last_bullish', 'last_bearish')}
+
+    last_bullish, last_bearish = stats['last_bullish'], stats['last_bearish']
+    signal = np.where(last_bullish > last_bearish, 'Bullish',
+                      np.where(last_bearish >= 0, 'Bearish', 'Neutral'))
+    last_cross = np.maximum(last_bullish, last_bearish)
+    cross_dates = np.full(last_cross.shape, np.datetime64('NaT'), dtype='datetime64[ns]')
+    crossed = last_cross >= 0
+    cross_dates[crossed] = dates[last_cross[crossed], np.nonzero(crossed)[1]]
+
+    pair_array = np.array(pairs, dtype=int).reshape(-1, 2)
+
+    return pd.DataFrame({
+        'fast': np.repeat(pair_array[:, 0], len(tickers)),
+        'slow': np.repeat(pair_array[:, 1], len(tickers)),
+        'ticker': np.tile(np.array(tickers, dtype=object), len(pairs)),
+        'bullish_crosses': stats['bullish'].ravel(),
+        'bearish_crosses': stats['bearish'].ravel(),
+        'signal': signal.ravel(),
+        'last_cross_date': pd.to_datetime(cross_dates.ravel()),
+    })
+
+
+def summarize_sweep(results):
+    """
+    Summarize a sweep per (fast, slow) pair
+
+    Returns:
+    - DataFrame indexed by (fast, slow) with the mean number of crosses
+      per ticker and the share of tickers whose latest signal is bullish
+    """
+    grouped = results.assign(
+        crosses=results['bullish_crosses'] + results['bearish_crosses'],
+        bullish=results['signal'] == 'Bullish',
+    ).groupby(['fast', 'slow'])
+    return pd.DataFrame({
+        'mean_crosses': grouped['crosses'].mean(),
+        'bullish_share': grouped['bullish'].mean(),
+    })
+
+
+# Example usage
+if __name__ == "__main__":
+    # python sweep_calc.py --fast 5 50 --slow 20 250 --output signals/sweep.csv
+    parser = argparse.ArgumentParser(description="Sweep EMA crossover signals over a grid of spans")
+    parser.add_argument("--data-dir", default=STOCK_DATA_DIR)
+    parser.add_argument("--fast", type=int, nargs=2, default=[5, 50], metavar=("MIN", "MAX"))
+    parser.add_argument("--slow", type=int, nargs=2, default=[20, 250], metavar=("MIN", "MAX"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="signals/sweep.csv")
+    args = parser.parse_args()
+
+    results = sweep_crossovers(args.data_dir,
+                               fast_spans=range(args.fast[0], args.fast[1] + 1),
+                               slow_spans=range(args.slow[0], args.slow[1] + 1),
+                               workers=args.workers)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"✓ {len(results)} rows saved to {args.output}")
+    print(summarize_sweep(results).sort_values('mean_crosses').head(10))
@@ -0,0 +1,102 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_signals
+from benchmark import make_history
+from ema_calc import calculate_ema
+from macd_calc import calculate_macd
+from rsi_calc import calculate_rsi
+from storage import BACKEND_ENV_VAR, PRECISION_ENV_VAR, ticker_path, write_frame
+
+# ---------------------------
+# Shared fixtures
+# ---------------------------
+# A small universe of synthetic histories: AAA is the longest, BBB starts
+# later (like JEPQ next to SPY) and CCC has a gap of missing closes. The
+# fast paths are compared against REFERENCE: ema_calc, macd_calc and
+# rsi_calc run on one ticker's full history with plain pandas.
+
+EMA_PERIODS = [12, 26, 50, 200]
+INDICATOR_COLUMNS = [f'EMA_{p}' for p in EMA_PERIODS] + ['MACD', 'MACD_Signal', 'MACD_Hist',
+                                                           'RSI_14']
+
+
+def make_universe():
+    """
+    Price histories of the fixture tickers
+
+    Returns:
+    - Dict of ticker -> DataFrame in the yfinance layout
+    """
+    histories = {
+        'AAA': make_history('AAA', years=4, seed=1),
+        'BBB': make_history('BBB', years=2, seed=2),
+        'CCC': make_history('CCC', years=3, seed=3),
+    }
+    ccc = histories['CCC']
+    ccc.loc[ccc.index[300:305], ('Close', 'CCC')] = np.nan
+    return histories
+
+
+def reference_indicators(close):
+    """
+    EMA, MACD and RSI of one close series, calculated on its full history
+
+    Parameters:
+    - close: Series of closes
+
+    Returns:
+    - Dict of indicator name -> Series
+    """
+    df = pd.DataFrame({'Close': close})
+    result = {f'EMA_{p}': calculate_ema(df, 'Close', p) for p in EMA_PERIODS}
+    result['MACD'], result['MACD_Signal'], result['MACD_Hist'] = calculate_macd(df, 'Close')
+    result['RSI_14'] = calculate_rsi(df, 'Close', 14)
+    return result
+
+
+def assert_identical(actual, expected, name=''):
+    """Assert two arrays are equal bit for bit, NaNs in the same places."""
+    actual = np.asarray(actual, dtype=float)
+    expected = np.asarray(expected, dtype=float)
+    assert actual.shape == expected.shape, name
+    same = (actual == expected) | (np.isnan(actual) & np.isnan(expected))
+    assert same.all(), f"{name}: {np.count_nonzero(~same)} values differ"
+
+
+@pytest.fixture(autouse=True)
+def default_storage(monkeypatch):
+    # Tests choose a backend or precision explicitly
+    monkeypatch.delenv(BACKEND_ENV_VAR, raising=False)
+    monkeypatch.delenv(PRECISION_ENV_VAR, raising=False)
+
+
+@pytest.fixture
+def universe():
+    return make_universe()
+
+
+@pytest.fixture
+def data_dir(tmp_path, universe):
+    """Directory holding the price histories as CSV files."""
+    for ticker, df in universe.items():
+        write_frame(df, ticker_path(str(tmp_path), ticker))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """Tickers whose chart was rendered; the PNG is an empty file."""
+    calls = []
+
+    def render(ticker, df, bullish, bearish, latest_signal, output_path, *args):
+        calls.append(ticker)
+        open(output_path, 'wb').close()
+
+    monkeypatch.setattr(generate_signals, 'render_signal_chart', render)
+    return calls
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest import run_backtest
+
+# X rises 10% twice while long (bullish cross at row 1, bearish at row 3),
+# then falls back. Y lists two bars later and never crosses.
+INDEX = pd.bdate_range('2024-01-01', periods=6, name='Date')
+CLOSE = pd.DataFrame({'X': [100.0, 100.0, 110.0, 121.0, 110.0, 100.0],
+                      'Y': [np.nan, np.nan, 50.0, 50.0, 50.0, 50.0]}, index=INDEX)
+
+
+def _flags(rows):
+    flags = pd.DataFrame(False, index=INDEX, columns=CLOSE.columns)
+    flags.iloc[rows, 0] = True
+    return flags
+
+
+BULLISH, BEARISH = _flags([1]), _flags([3])
+
+
+def test_long_trade():
+    result = run_backtest(CLOSE, BULLISH, BEARISH)
+
+    # Held over the bars after the signal closes
+    assert result['positions']['X'].tolist() == [0, 0, 1, 1, 0, 0]
+    assert result['returns']['X'].to_numpy() == pytest.approx([0, 0, 0.1, 0.1, 0, 0])
+    assert result['equity']['X'].iloc[-1] == pytest.approx(1.21)
+    assert (result['returns']['Y'] == 0).all()
+
+    trade = result['trades'].iloc[0]
+    assert len(result['trades']) == 1
+    assert (trade['ticker'], trade['side'], trade['bars'], trade['open']) == ('X', 'long', 2, False)
+    assert (trade['entry_price'], trade['exit_price']) == (100.0, 121.0)
+    assert trade['return'] == pytest.approx(0.21)
+
+    # Equal weight over the tickers listed on each date
+    assert result['portfolio']['returns'].to_numpy() == pytest.approx([0, 0, 0.05, 0.05, 0, 0])
+    assert result['stats'].loc['X', 'trades'] == 1
+    assert result['stats'].loc['X', 'win_rate'] == 1.0
+
+
+def test_costs_are_charged_per_position_change():
+    result = run_backtest(CLOSE, BULLISH, BEARISH, cost=0.01)
+    assert result['returns']['X'].to_numpy() == pytest.approx([0, 0, 0.09, 0.1, -0.01, 0])
+    assert result['equity']['X'].iloc[-1] == pytest.approx(1.09 * 1.1 * 0.99)
+    assert result['trades']['net_return'].iloc[0] == pytest.approx(1.21 * 0.99 ** 2 - 1)
+
+
+def test_short_trade_stays_open():
+    result = run_backtest(CLOSE, BULLISH, BEARISH, short=True)
+    assert result['positions']['X'].tolist() == [0, 0, 1, 1, -1, -1]
+    # Each 1/11 fall earns 1/11 on the short
+    assert result['equity']['X'].iloc[-1] == pytest.approx(1.21 * (12 / 11) ** 2)
+
+    short = result['trades'].iloc[1]
+    assert (short['side'], short['exit_price'], short['open']) == ('short', 100.0, True)
+    assert short['return'] == pytest.approx((12 / 11) ** 2 - 1)
+
+
+def test_rsi_filter_skips_entry():
+    rsi = pd.DataFrame(80.0, index=INDEX, columns=CLOSE.columns)
+    result = run_backtest(CLOSE, BULLISH, BEARISH, rsi=rsi, rsi_max=70)
+    assert (result['positions'] == 0).all().all()
+    assert result['trades'].empty
@@ -0,0 +1,41 @@
+import json
+import numpy as np
+import pandas as pd
+from benchmark import (CASES, POOL_SIZE, compare_results, make_history, make_pool,
+                       run_benchmarks, save_results)
+
+
+def test_make_history():
+    df = make_history('XYZ', years=2, seed=5)
+    assert df.equals(make_history('XYZ', years=2, seed=5))
+    assert not df.equals(make_history('XYZ', years=2, seed=6))
+
+    assert len(df) == 2 * 252
+    assert df.index.name == 'Date' and df.index[-1] == pd.Timestamp('2025-12-31')
+    assert list(df.columns) == [(field, 'XYZ') for field in
+                                ('Close', 'High', 'Low', 'Open', 'Volume')]
+    assert (df[('High', 'XYZ')] >= df[('Close', 'XYZ')]).all()
+    assert (df[('Low', 'XYZ')] <= df[('Close', 'XYZ')]).all()
+    assert (df[('Close', 'XYZ')] > 0).all()
+
+
+def test_pool_is_capped():
+    assert [ticker for ticker, _ in make_pool(3, years=1)] == ['T00000', 'T00001', 'T00002']
+    assert len(make_pool(POOL_SIZE + 50, years=1)) == POOL_SIZE
+
+
+def test_run_save_and_compare(tmp_path):
+    cases = [case for case in CASES if case != 'render_signal_chart']
+    results = run_benchmarks(sizes=[3], cases=cases, years=1, repeat=1)
+
+    assert [(r['case'], r['tickers'], r['items']) for r in results['results']] == \
+        [(case, 3, 3) for case in cases]
+    assert all(r['seconds'] > 0 and np.isfinite(r['per_item_ms']) for r in results['results'])
+
+    path = str(tmp_path / 'bench' / 'latest.json')
+    save_results(results, path)
+    with open(path) as f:
+        baseline = json.load(f)
+    comparison = compare_results(results, baseline)
+    assert [c['case'] for c in comparison] == cases
+    assert all(c['time_ratio'] == 1.0 for c in comparison)
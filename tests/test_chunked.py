@@ -0,0 +1,28 @@
+import pytest
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from chunked_calc import process_csv_chunked
+from signal_calc import detect_ema_crossovers
+from storage import read_frame, ticker_path
+
+
+@pytest.mark.parametrize('chunksize', [97, 1000, 100_000])
+def test_chunks_match_full_history(data_dir, universe, tmp_path, chunksize):
+    for ticker, df in universe.items():
+        output = str(tmp_path / f'{ticker}_indicators.csv')
+        summary = process_csv_chunked(ticker_path(data_dir, ticker), output, chunksize)
+        assert summary['rows'] == len(df)
+        assert summary['chunks'] == -(-len(df) // chunksize)
+
+        result = read_frame(output, float_precision='round_trip')
+        assert (result.index == df.index).all()
+        expected = reference_indicators(df[('Close', ticker)])
+        for name in INDICATOR_COLUMNS:
+            assert_identical(result[(name, ticker)], expected[name], f'{ticker} {name}')
+
+        bullish, bearish = detect_ema_crossovers(expected)
+        assert_identical(result[('Bullish_Cross', ticker)], bullish.astype(int), 'Bullish_Cross')
+        assert_identical(result[('Bearish_Cross', ticker)], bearish.astype(int), 'Bearish_Cross')
+
+        last = (bullish | bearish).to_numpy().nonzero()[0][-1]
+        assert summary['last_cross'] == str(df.index[last].date())
+        assert summary['latest_signal'] == ('Bullish' if bullish.iloc[last] else 'Bearish')
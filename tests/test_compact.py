@@ -0,0 +1,67 @@
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from indicators_incremental import update_indicators_incremental
+from indicators_main import add_indicators_to_file
+from precision_check import compare_precision
+from signal_calc import detect_ema_crossovers
+from storage import (BACKEND_ENV_VAR, PRECISION_ENV_VAR, append_frame, read_arrays, read_frame,
+                     ticker_path, write_frame)
+
+
+@pytest.fixture
+def compact_dir(tmp_path, universe, monkeypatch, request):
+    monkeypatch.setenv(BACKEND_ENV_VAR, getattr(request, 'param', 'csv'))
+    monkeypatch.setenv(PRECISION_ENV_VAR, 'float32')
+    for ticker, df in universe.items():
+        write_frame(df, ticker_path(str(tmp_path), ticker))
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('compact_dir', ['csv', 'npy'], indirect=True)
+def test_incremental_state_survives_compact_storage(compact_dir, tmp_path_factory, capsys):
+    path = ticker_path(compact_dir, 'AAA')
+    df = read_frame(path, float_precision='round_trip')
+    write_frame(df.iloc[:-5], path)
+
+    update_indicators_incremental(path)
+    capsys.readouterr()
+    update_indicators_incremental(path)
+    assert 'already up to date' in capsys.readouterr().out
+
+    append_frame(df.iloc[-5:], path)
+    full_dir = str(tmp_path_factory.mktemp('full'))
+    shutil.copytree(compact_dir, full_dir, dirs_exist_ok=True)
+    update_indicators_incremental(path)
+    output = capsys.readouterr().out
+    assert 'extended' in output and 'No usable state' not in output
+
+    # Stored values match a full recompute of the same data
+    full_path = ticker_path(full_dir, 'AAA')
+    add_indicators_to_file(full_path)
+    result = read_frame(path, float_precision='round_trip')
+    expected = read_frame(full_path, float_precision='round_trip')
+    for name in INDICATOR_COLUMNS:
+        assert_identical(result[(name, 'AAA')], expected[(name, 'AAA')], name)
+
+
+def test_precision_check_reports_stored_crossovers(compact_dir, universe):
+    tickers = ['AAA', 'BBB']
+    report = compare_precision(compact_dir, tickers, as_of=universe['AAA'].index[-1])
+
+    for ticker in tickers:
+        path = ticker_path(compact_dir, ticker)
+        add_indicators_to_file(path)
+        _, stored = read_arrays(path, ['EMA_12', 'EMA_26'])
+        close = read_frame(path, ['Close'], float_precision='round_trip')[('Close', ticker)]
+        expected = reference_indicators(close)
+
+        bullish64, bearish64 = detect_ema_crossovers(expected)
+        bullish, bearish = detect_ema_crossovers({name: pd.Series(values)
+                                                  for name, values in stored.items()})
+        diffs = np.count_nonzero((bullish64.to_numpy() != bullish.to_numpy()) |
+                                 (bearish64.to_numpy() != bearish.to_numpy()))
+        assert report.at[ticker, 'event_diffs_stored'] == diffs
+        assert report.at[ticker, 'signal_stored'] in ('Bullish', 'Bearish', 'Neutral')
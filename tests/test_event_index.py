@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from event_index import COLUMNS, EVENT_NAMES, EventIndex, detect_events
+from indicators_incremental import update_indicators_incremental
+from storage import BACKEND_ENV_VAR, append_frame, read_frame, ticker_path, write_frame
+
+NEW_ROWS = 25
+
+
+def _reference_events(data_dir, universe):
+    # Events of every ticker's full history, as the index sorts them
+    parts = []
+    for ticker in universe:
+        df = read_frame(ticker_path(data_dir, ticker), float_precision='round_trip')
+        rows, codes, directions = detect_events({name: df[(name, ticker)].to_numpy()
+                                                 for name in COLUMNS})
+        parts.append(pd.DataFrame({'date': df.index[rows], 'ticker': ticker,
+                                   'event': np.array(EVENT_NAMES)[codes],
+                                   'direction': directions}))
+    events = pd.concat(parts).sort_values(['date', 'ticker'], kind='stable')
+    return events.reset_index(drop=True)
+
+
+def _events(index):
+    return pd.DataFrame({'date': index.events['date'], 'ticker': index.events['ticker'],
+                         'event': np.array(EVENT_NAMES)[index.events['event'].astype(int)],
+                         'direction': index.events['direction']})
+
+
+@pytest.mark.parametrize('backend', ['csv', 'npy'])
+def test_incremental_update_matches_rebuild(tmp_path, universe, monkeypatch, capsys, backend):
+    monkeypatch.setenv(BACKEND_ENV_VAR, backend)
+    data_dir = str(tmp_path)
+    for ticker, df in universe.items():
+        path = ticker_path(data_dir, ticker)
+        write_frame(df.iloc[:-NEW_ROWS], path)
+        update_indicators_incremental(path)
+    index = EventIndex(data_dir)
+    index.update()
+    before = {ticker: np.count_nonzero(index.events['ticker'] == ticker) for ticker in universe}
+
+    for ticker, df in universe.items():
+        path = ticker_path(data_dir, ticker)
+        append_frame(df.iloc[-NEW_ROWS:], path)
+        update_indicators_incremental(path)
+    added = EventIndex(data_dir).update()
+
+    # Only the events of the new rows were added
+    updated = EventIndex(data_dir)
+    expected = _reference_events(data_dir, universe)
+    for ticker in universe:
+        new_dates = universe[ticker].index[-NEW_ROWS:]
+        assert added[ticker] == np.count_nonzero((expected['ticker'] == ticker) &
+                                                 expected['date'].isin(new_dates))
+        assert np.count_nonzero(updated.events['ticker'] == ticker) == before[ticker] + added[ticker]
+
+    rebuilt = EventIndex(data_dir, rebuild=True)
+    rebuilt.update()
+    pd.testing.assert_frame_equal(_events(updated), expected, check_dtype=False)
+    pd.testing.assert_frame_equal(_events(rebuilt), expected, check_dtype=False)
+    assert len(updated.query(events='ema_12_26', start=universe['AAA'].index[-NEW_ROWS])) == \
+        np.count_nonzero((expected['event'] == 'ema_12_26') &
+                         (expected['date'] >= universe['AAA'].index[-NEW_ROWS]))
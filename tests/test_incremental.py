@@ -0,0 +1,85 @@
+import pytest
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from indicator_registry import calculate_indicators
+from indicators_incremental import update_indicators_incremental
+from indicators_main import add_indicators_to_file
+from storage import append_frame, read_frame, ticker_path, write_frame
+
+EXTRAS = ['bollinger:20:2.5', 'obv', 'atr']
+
+
+def _read(path):
+    return read_frame(path, float_precision='round_trip')
+
+
+def _append_in_steps(df, path, steps, capsys, **kwargs):
+    # Write the history without its last rows, then append and update step by step
+    write_frame(df.iloc[:-sum(steps)], path)
+    update_indicators_incremental(path, **kwargs)
+    end = len(df) - sum(steps)
+    for step in steps:
+        append_frame(df.iloc[end:end + step], path)
+        end += step
+        capsys.readouterr()
+        update_indicators_incremental(path, **kwargs)
+        output = capsys.readouterr().out
+        assert 'extended' in output and 'No usable state' not in output
+
+
+def test_full_calculation_matches_reference(data_dir, universe):
+    for ticker, df in universe.items():
+        path = ticker_path(data_dir, ticker)
+        add_indicators_to_file(path)
+        result = _read(path)
+        expected = reference_indicators(df[('Close', ticker)])
+        for name in INDICATOR_COLUMNS:
+            assert_identical(result[(name, ticker)], expected[name], f'{ticker} {name}')
+
+
+@pytest.mark.parametrize('steps', [[1], [20, 1, 5]])
+def test_incremental_update_matches_full_recompute(tmp_path, universe, capsys, steps):
+    df = universe['AAA']
+    path = ticker_path(str(tmp_path), 'AAA')
+    _append_in_steps(df, path, steps, capsys)
+
+    result = _read(path)
+    expected = reference_indicators(df[('Close', 'AAA')])
+    for name in INDICATOR_COLUMNS:
+        assert_identical(result[(name, 'AAA')], expected[name], name)
+
+
+def test_incremental_update_with_extras(tmp_path, universe, capsys):
+    df = universe['AAA']
+    path = ticker_path(str(tmp_path), 'AAA')
+    _append_in_steps(df, path, [10, 3], capsys, extra_indicators=EXTRAS)
+
+    result = _read(path)
+    expected = reference_indicators(df[('Close', 'AAA')])
+    for name in INDICATOR_COLUMNS:
+        assert_identical(result[(name, 'AAA')], expected[name], name)
+    for name, values in calculate_indicators(df, EXTRAS, 'AAA').items():
+        assert_identical(result[(name, 'AAA')], values, name)
+
+
+def test_new_extras_without_new_rows(tmp_path, universe, capsys):
+    df = universe['AAA']
+    path = ticker_path(str(tmp_path), 'AAA')
+    write_frame(df, path)
+    update_indicators_incremental(path)
+
+    # Requesting extras changes the recorded parameters
+    update_indicators_incremental(path, extra_indicators=EXTRAS)
+    expected = calculate_indicators(df, EXTRAS, 'AAA')
+    result = _read(path)
+    for name, values in expected.items():
+        assert_identical(result[(name, 'AAA')], values, name)
+
+    capsys.readouterr()
+    update_indicators_incremental(path, extra_indicators=EXTRAS)
+    assert 'already up to date' in capsys.readouterr().out
+
+    # Extra columns dropped from the file are calculated again
+    write_frame(result.drop(columns=[('OBV', 'AAA')]), path)
+    update_indicators_incremental(path, extra_indicators=EXTRAS)
+    assert 'missing extra indicators calculated' in capsys.readouterr().out
+    assert_identical(_read(path)[('OBV', 'AAA')], expected['OBV'], 'OBV')
@@ -0,0 +1,41 @@
+import os
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from indicator_cache import CACHE_DIR_NAME, IndicatorCache
+from indicators_main import _shared_cache, process_all_tickers
+from storage import read_frame, ticker_path
+
+
+def test_cached_run_matches_reference(data_dir, universe, capsys, monkeypatch):
+    scans = []
+    scan = IndicatorCache._scan
+    monkeypatch.setattr(IndicatorCache, '_scan', lambda self: scans.append(1) or scan(self))
+
+    process_all_tickers(data_dir)
+    assert 'EMA_12 calculated' in capsys.readouterr().out
+    # Tickers share one cache that never rescans the directory on store
+    assert _shared_cache(data_dir) is _shared_cache(data_dir)
+    assert not scans
+
+    process_all_tickers(data_dir)
+    output = capsys.readouterr().out
+    assert 'EMA_12 cached' in output and ' calculated\n' not in output
+    for ticker, df in universe.items():
+        result = read_frame(ticker_path(data_dir, ticker), float_precision='round_trip')
+        expected = reference_indicators(df[('Close', ticker)])
+        for name in INDICATOR_COLUMNS:
+            assert_identical(result[(name, ticker)], expected[name], f'{ticker} {name}')
+
+
+def test_run_trims_cache_once(data_dir):
+    process_all_tickers(data_dir, cache_max_bytes=20_000)
+    cache = IndicatorCache.for_data_dir(data_dir)
+    assert 0 < cache.size() <= 20_000
+    assert all(name.endswith('.npy') for name in os.listdir(os.path.join(data_dir, CACHE_DIR_NAME)))
+
+
+def test_cache_is_bounded_per_store(tmp_path):
+    cache = IndicatorCache(str(tmp_path), max_bytes=1000)
+    for k in range(5):
+        cache.put(f'k{k}', [float(k)] * 50)
+    assert cache.size() <= 1000
+    assert cache.get('k4') is not None and cache.get('k0') is None
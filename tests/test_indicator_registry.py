@@ -0,0 +1,50 @@
+import pytest
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from indicator_registry import IndicatorGraph, calculate_indicators, make_indicator
+
+CORE = ['ema:12', 'ema:26', 'ema:50', 'ema:200', 'macd', 'rsi']
+
+
+def test_core_indicators_match_reference(universe):
+    for ticker, df in universe.items():
+        result = calculate_indicators(df, CORE, ticker)
+        expected = reference_indicators(df[('Close', ticker)])
+        for name in INDICATOR_COLUMNS:
+            assert_identical(result[name], expected[name], f'{ticker} {name}')
+
+
+def test_intermediates_are_calculated_once(universe):
+    graph = IndicatorGraph.from_frame(universe['AAA'], 'AAA')
+    for spec in CORE + ['obv', 'atr', 'bollinger']:
+        graph.evaluate(make_indicator(spec))
+    assert len(graph.computed) == len(set(graph.computed))
+    assert graph.computed.count(('ema', 12)) == 1
+    assert ('delta',) in graph.computed
+
+
+def test_bollinger_widths_do_not_collide(universe):
+    result = calculate_indicators(universe['AAA'], ['bollinger:20:2', 'bollinger:20:2.5'], 'AAA')
+    assert {'BB_Upper_20_2', 'BB_Upper_20_2.5'} <= set(result.columns)
+    assert not result['BB_Upper_20_2'].equals(result['BB_Upper_20_2.5'])
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('bollinger:20:2', 'bollinger:20:2'),
+    ('bollinger:20:2.0', 'bollinger:20:2'),
+    ('bollinger:20:2.50', 'bollinger:20:2.5'),
+    ('atr', 'atr:14'),
+    ('atr:14.0', 'atr:14'),
+])
+def test_specs_are_normalized(spec, expected):
+    assert make_indicator(spec).spec() == expected
+    assert make_indicator(expected).spec() == expected
+
+
+@pytest.mark.parametrize('spec, parameter', [
+    ('atr:abc', "'period' of atr"),
+    ('bollinger:20:wide', "'width' of bollinger"),
+    ('rsi:inf', "'period' of rsi"),
+])
+def test_non_numeric_parameters_are_rejected(spec, parameter):
+    with pytest.raises(ValueError, match=parameter):
+        make_indicator(spec)
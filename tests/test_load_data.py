@@ -0,0 +1,57 @@
+import os
+from datetime import timedelta
+from conftest import assert_identical
+from data_providers import LocalProvider
+from load_data import fetch_and_store_ticker_data
+from storage import DELTA_SUFFIX, read_frame, ticker_path, write_frame
+
+FETCH = dict(years=10, rate_limit=None, backoff=0.0)
+
+
+def _assert_stored(dest_dir, source_dir, ticker):
+    stored = read_frame(ticker_path(dest_dir, ticker), float_precision='round_trip')
+    expected = read_frame(ticker_path(source_dir, ticker), float_precision='round_trip')
+    assert (stored.index == expected.index).all(), ticker
+    for column in expected.columns:
+        assert_identical(stored[column], expected[column], f'{ticker} {column[0]}')
+
+
+def test_full_history_in_batches_with_retries(tmp_path, data_dir, universe):
+    dest = str(tmp_path / 'dest')
+    provider = LocalProvider(data_dir, fail_times=1)
+    fetch_and_store_ticker_data(sorted(universe), data_dir=dest, provider=provider,
+                                batch_size=2, max_retries=2, **FETCH)
+
+    # Two batches of one start date, plus the failed first attempt
+    assert len(provider.calls) == 3
+    assert sorted(len(tickers) for tickers, _, _ in provider.calls[1:]) == [1, 2]
+    assert {t for tickers, _, _ in provider.calls for t in tickers} == set(universe)
+    for ticker in universe:
+        _assert_stored(dest, data_dir, ticker)
+
+
+def test_exhausted_retries_store_nothing(tmp_path, data_dir, universe):
+    dest = str(tmp_path / 'dest')
+    provider = LocalProvider(data_dir, fail_times=10)
+    fetch_and_store_ticker_data(['AAA'], data_dir=dest, provider=provider, max_retries=2,
+                                **FETCH)
+    assert len(provider.calls) == 3
+    assert not os.path.exists(ticker_path(dest, 'AAA'))
+
+
+def test_new_rows_are_appended(tmp_path, data_dir, universe):
+    dest = str(tmp_path / 'dest')
+    os.makedirs(dest)
+    write_frame(universe['AAA'].iloc[:-5], ticker_path(dest, 'AAA'))
+    write_frame(universe['BBB'].iloc[:-10], ticker_path(dest, 'BBB'))
+
+    provider = LocalProvider(data_dir)
+    fetch_and_store_ticker_data(['AAA', 'BBB'], data_dir=dest, provider=provider, **FETCH)
+
+    # Each stored ticker is fetched from the day after its last date
+    starts = {tickers: start.date() for tickers, start, _ in provider.calls}
+    assert starts == {(ticker,): (universe[ticker].index[-rows - 1] + timedelta(days=1)).date()
+                      for ticker, rows in (('AAA', 5), ('BBB', 10))}
+    for ticker in ('AAA', 'BBB'):
+        assert os.listdir(os.path.join(dest, f'{ticker}{DELTA_SUFFIX}')) == ['000001.csv']
+        _assert_stored(dest, data_dir, ticker)
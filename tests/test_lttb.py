@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from signal_chart import lttb
+
+
+def _line(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=float)
+    return x, np.sin(x / 50) + rng.normal(0, 0.05, n)
+
+
+def test_keeps_endpoints_and_spikes():
+    x, y = _line()
+    y[500], y[1300] = 10.0, -10.0
+    keep = lttb(x, y, 100)
+
+    assert len(keep) == 100
+    assert (np.diff(keep) > 0).all()
+    assert (keep[0], keep[-1]) == (0, len(x) - 1)
+    assert {500, 1300} <= set(keep)
+
+
+def test_skips_nan_points():
+    x, y = _line()
+    y[:5] = np.nan
+    y[1000:1100] = np.nan
+    y[-3:] = np.nan
+    keep = lttb(x, y, 50)
+
+    assert len(keep) == 50
+    assert (keep[0], keep[-1]) == (5, len(x) - 4)
+    assert not np.isnan(y[keep]).any()
+
+
+@pytest.mark.parametrize('threshold', [0, 2, 1997, 5000])
+def test_small_thresholds_and_short_lines_keep_every_point(threshold):
+    x, y = _line()
+    y[[10, 20, 30]] = np.nan
+    keep = lttb(x, y, threshold)
+    assert (keep == np.flatnonzero(~np.isnan(y))).all()
+
+
+def test_three_points_keep_the_extreme_middle():
+    x = np.arange(5, dtype=float)
+    y = np.array([0.0, 1.0, 4.0, 1.0, 0.0])
+    assert lttb(x, y, 3).tolist() == [0, 2, 4]
+    assert len(lttb(x, np.full(5, np.nan), 3)) == 0
@@ -0,0 +1,73 @@
+import os
+import tracemalloc
+import pytest
+import metrics
+
+BIG = 20_000_000
+
+
+@pytest.fixture
+def records_path(tmp_path, monkeypatch):
+    # Registered with monkeypatch so configure()'s settings are undone
+    for name in (metrics.METRICS_ENV_VAR, metrics.PROFILE_ENV_VAR, metrics.MEMORY_ENV_VAR,
+                 metrics.RUN_ENV_VAR):
+        monkeypatch.setenv(name, '')
+    path = str(tmp_path / 'metrics.jsonl')
+    metrics.configure(path, trace_memory=True)
+    yield path
+    tracemalloc.stop()
+
+
+def test_disabled_stage_records_nothing(tmp_path, monkeypatch):
+    monkeypatch.delenv(metrics.METRICS_ENV_VAR, raising=False)
+    monkeypatch.delenv(metrics.PROFILE_ENV_VAR, raising=False)
+    with metrics.stage('indicators', 'AAA') as record:
+        assert record == {}
+
+
+def test_nested_stages_track_peaks(records_path):
+    with metrics.stage('outer') as outer:
+        outer['rows'] = 3
+        with metrics.stage('inner', 'AAA'):
+            buffer = bytearray(BIG)
+            del buffer
+        with pytest.raises(ValueError):
+            with metrics.stage('failing', 'BBB'):
+                raise ValueError
+        with metrics.stage('handled', 'CCC') as record:
+            record['ok'] = False
+
+    records = {r['stage']: r for r in metrics.load_records(records_path)}
+    assert list(records) == ['inner', 'failing', 'handled', 'outer']
+    assert len({r['run'] for r in records.values()}) == 1
+
+    # The inner peak is reported by the enclosing stage, not by later siblings
+    assert records['inner']['peak_bytes'] >= BIG
+    assert records['outer']['peak_bytes'] >= records['inner']['peak_bytes']
+    assert records['handled']['peak_bytes'] < BIG
+    assert records['outer']['wall_s'] >= records['inner']['wall_s']
+
+    assert [records[name]['ok'] for name in ('inner', 'failing', 'handled', 'outer')] == \
+        [True, False, False, True]
+    assert (records['outer']['rows'], records['inner']['ticker']) == (3, 'AAA')
+
+
+def test_export_prometheus(records_path, tmp_path):
+    for ticker in ('AAA', 'AAA', 'B"B'):
+        with metrics.stage('indicators', ticker) as record:
+            record['rows'] = 10
+    with metrics.stage('seasonality'):
+        pass
+
+    prom_path = str(tmp_path / 'prom' / 'siqrs.prom')
+    metrics.export_prometheus(metrics.load_records(records_path), prom_path)
+    with open(prom_path) as f:
+        lines = f.read().splitlines()
+
+    prefix = metrics.PROM_PREFIX
+    assert f'# TYPE {prefix}_rows gauge' in lines
+    assert f'{prefix}_rows{{stage="indicators",ticker="AAA"}} 20' in lines
+    assert f'{prefix}_calls{{stage="indicators",ticker="B\\"B"}} 1' in lines
+    assert f'{prefix}_calls{{stage="seasonality",ticker=""}} 1' in lines
+    assert f'{prefix}_failures{{stage="seasonality",ticker=""}} 0' in lines
+    assert os.listdir(tmp_path / 'prom') == ['siqrs.prom']
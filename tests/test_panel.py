@@ -0,0 +1,33 @@
+import pandas as pd
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from panel_calc import calculate_indicators_panel, load_panel
+from storage import BACKEND_ENV_VAR, ticker_path, write_frame
+
+
+def test_load_panel_aligns_dates(tmp_path, universe, monkeypatch):
+    # The columnar backend stores closes exactly, as they were written
+    monkeypatch.setenv(BACKEND_ENV_VAR, 'npy')
+    for ticker, df in universe.items():
+        write_frame(df, ticker_path(str(tmp_path), ticker))
+
+    panel = load_panel(str(tmp_path))
+    assert list(panel.columns) == ['AAA', 'BBB', 'CCC']
+    assert panel.index.is_monotonic_increasing
+    for ticker, df in universe.items():
+        assert_identical(panel[ticker].loc[df.index], df[('Close', ticker)], ticker)
+        assert panel[ticker].drop(df.index).isna().all()
+
+
+def test_panel_matches_per_ticker_reference(universe):
+    panel = pd.DataFrame({ticker: df[('Close', ticker)] for ticker, df in universe.items()})
+    results = calculate_indicators_panel(panel.sort_index())
+
+    for ticker, df in universe.items():
+        # A NaN in a panel means no bar, so each ticker is calculated over
+        # the bars it has (CCC's missing closes are left out)
+        close = df[('Close', ticker)].dropna()
+        expected = reference_indicators(close)
+        for name in INDICATOR_COLUMNS:
+            assert_identical(results[name][ticker].loc[close.index], expected[name],
+                             f'{ticker} {name}')
+            assert results[name][ticker].drop(close.index).isna().all()
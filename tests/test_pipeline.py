@@ -0,0 +1,36 @@
+import generate_signals
+from pipeline import run_pipeline
+from storage import read_frame, ticker_path, write_frame
+
+RUN = dict(fetch=False, seasonality=False, cache_max_bytes=None)
+
+
+def test_only_stale_outputs_are_rebuilt(tmp_path, data_dir, rendered):
+    signals_dir = str(tmp_path / 'signals')
+    rebuilt = run_pipeline(data_dir, signals_dir, **RUN)
+    assert rebuilt['indicators'] == rebuilt['signals'] == ['AAA', 'BBB', 'CCC']
+    assert sorted(rendered) == ['AAA', 'BBB', 'CCC']
+
+    rebuilt = run_pipeline(data_dir, signals_dir, **RUN)
+    assert rebuilt['indicators'] == rebuilt['signals'] == rebuilt['events'] == []
+
+    # New data rebuilds that ticker's stages, and only those
+    path = ticker_path(data_dir, 'BBB')
+    df = read_frame(path, float_precision='round_trip')
+    df.iloc[-1, df.columns.get_loc(('Volume', 'BBB'))] += 1
+    write_frame(df, path)
+    rebuilt = run_pipeline(data_dir, signals_dir, **RUN)
+    assert rebuilt['indicators'] == rebuilt['signals'] == ['BBB']
+
+    rebuilt = run_pipeline(data_dir, signals_dir, force=True, **RUN)
+    assert rebuilt['indicators'] == rebuilt['signals'] == ['AAA', 'BBB', 'CCC']
+
+
+def test_generate_signals_keeps_pipeline_charts(tmp_path, data_dir, rendered):
+    # Both record the same manifest, so neither re-renders the other's charts
+    signals_dir = str(tmp_path / 'signals')
+    run_pipeline(data_dir, signals_dir, **RUN)
+    rendered.clear()
+    signals = generate_signals.main(data_dir=data_dir, signals_dir=signals_dir)
+    assert rendered == []
+    assert sorted(signals) == ['AAA', 'BBB', 'CCC']
@@ -0,0 +1,28 @@
+import os
+from indicators_main import process_all_tickers
+from storage import ticker_path, write_frame
+
+
+def _run(tmp_path, name, universe, capsys, workers):
+    data_dir = str(tmp_path / name)
+    os.makedirs(data_dir)
+    for ticker, df in universe.items():
+        write_frame(df, ticker_path(data_dir, ticker))
+    process_all_tickers(data_dir, extra_indicators=['atr'], workers=workers, use_cache=False)
+    output = capsys.readouterr().out.replace(f'Workers: {workers}', 'Workers: N')
+    files = {}
+    for ticker in universe:
+        with open(ticker_path(data_dir, ticker), 'rb') as f:
+            files[ticker] = f.read()
+    return output, files
+
+
+def test_process_pool_matches_serial_run(tmp_path, universe, capsys):
+    serial_output, serial_files = _run(tmp_path, 'serial', universe, capsys, workers=1)
+    pool_output, pool_files = _run(tmp_path, 'pool', universe, capsys, workers=2)
+
+    # Same files byte for byte, and the same progress in the same order
+    assert pool_files == serial_files
+    assert pool_output.replace(str(tmp_path / 'pool'), '') == \
+        serial_output.replace(str(tmp_path / 'serial'), '')
+    assert 'Successfully processed: 3/3 files' in pool_output
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+import pandas as pd
+import pytest
+from indicators_incremental import update_indicators_incremental
+from indicators_main import process_all_tickers
+from query_service import QueryService
+from screen import screen
+from storage import append_frame, ticker_path, write_frame
+
+
+@pytest.fixture
+def service_dir(tmp_path, universe):
+    # BBB is held back so that it can be added later
+    data_dir = str(tmp_path)
+    for ticker in ('AAA', 'CCC'):
+        write_frame(universe[ticker].iloc[:-5], ticker_path(data_dir, ticker))
+    process_all_tickers(data_dir, use_cache=False)
+    return data_dir
+
+
+def _json(response):
+    status, body = response
+    return status, json.loads(body)
+
+
+def _signals(service):
+    return {ticker: entry['signal'] for ticker, entry in service.entries.items()}
+
+
+def test_routes(service_dir, universe):
+    as_of = str(universe['AAA'].index[-6].date())
+    service = QueryService(service_dir, as_of=as_of)
+    assert asyncio.run(service.refresh()) == ['AAA', 'CCC']
+
+    assert _json(service.route('GET', '/tickers')) == (200, ['AAA', 'CCC'])
+    status, entry = _json(service.route('GET', '/ticker/aaa'))
+    assert status == 200 and entry['date'] == as_of
+    expected = {r['ticker']: r for r in screen(service_dir, as_of=as_of)}
+    assert entry['signal'] == expected['AAA']['signal']
+    assert entry['last_cross_date'] == expected['AAA']['last_cross_date']
+
+    status, batch = _json(service.route('GET', '/batch?tickers=AAA,XXX,CCC'))
+    assert status == 200 and list(batch) == ['AAA', 'CCC']
+    status, rows = _json(service.route('GET', f"/screen?signal={entry['signal']}"))
+    assert 'AAA' in [row['ticker'] for row in rows]
+    status, rows = _json(service.route('GET', '/screen?rsi_min=101'))
+    assert (status, rows) == (200, [])
+
+    assert service.route('GET', '/ticker/XXX')[0] == 404
+    assert service.route('GET', '/batch')[0] == 400
+    assert service.route('GET', '/screen?rsi_min=x')[0] == 400
+    assert service.route('GET', '/screen?volume_min=1')[0] == 400
+    assert service.route('POST', '/tickers')[0] == 405
+
+
+def test_refresh_reloads_changed_tickers(service_dir, universe):
+    service = QueryService(service_dir, as_of=str(universe['AAA'].index[-1].date()))
+    asyncio.run(service.refresh())
+    assert asyncio.run(service.refresh()) == []
+
+    path = ticker_path(service_dir, 'AAA')
+    append_frame(universe['AAA'].iloc[-5:], path)
+    update_indicators_incremental(path)
+    write_frame(universe['BBB'], ticker_path(service_dir, 'BBB'))
+    os.remove(ticker_path(service_dir, 'CCC'))
+
+    assert asyncio.run(service.refresh()) == ['AAA', 'BBB', 'CCC']
+    assert sorted(service.entries) == ['AAA', 'BBB']
+    assert service.entries['AAA']['date'] == str(universe['AAA'].index[-1].date())
+    assert _json(service.route('GET', '/tickers')) == (200, ['AAA', 'BBB'])
+
+
+def test_signals_follow_the_date(service_dir, universe):
+    last = universe['AAA'].index[-6]
+    service = QueryService(service_dir, as_of=str(last.date()))
+    asyncio.run(service.refresh())
+    before = _signals(service)
+
+    # Only the last bars are in the window now; no file changed
+    service.as_of = str((last + pd.Timedelta(days=364)).date())
+    assert asyncio.run(service.refresh()) == ['AAA', 'CCC']
+    expected = {r['ticker']: r['signal'] for r in screen(service_dir, as_of=service.as_of)}
+    assert _signals(service) == expected
+    assert _signals(service) != before
+
+
+async def _exchange(service, request):
+    server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+def test_http_keep_alive_and_bad_length(service_dir):
+    service = QueryService(service_dir)
+    asyncio.run(service.refresh())
+
+    # Two requests on one connection; the second asks to close it
+    response = asyncio.run(_exchange(service, b'GET /tickers HTTP/1.1\r\n\r\n'
+                                              b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n'))
+    assert response.count(b'HTTP/1.1 200 OK') == 2
+    assert b'Connection: keep-alive' in response and response.endswith(b'}')
+
+    for length in (b'x', b'-1'):
+        response = asyncio.run(_exchange(service, b'GET /tickers HTTP/1.1\r\nContent-Length: '
+                                                  + length + b'\r\n\r\nGET /health HTTP/1.1\r\n\r\n'))
+        assert response.startswith(b'HTTP/1.1 400 Bad Request')
+        assert b'Connection: close' in response and response.count(b'HTTP/1.1') == 1
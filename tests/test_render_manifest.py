@@ -0,0 +1,69 @@
+import os
+import pytest
+import generate_signals
+from indicators_main import process_all_tickers
+from storage import read_frame, ticker_path, write_frame
+
+
+@pytest.fixture
+def indicator_dir(data_dir, capsys):
+    process_all_tickers(data_dir, use_cache=False)
+    capsys.readouterr()
+    return data_dir
+
+
+def _render(data_dir, signals_dir, calls, **kwargs):
+    calls.clear()
+    signals = generate_signals.main(data_dir=data_dir, signals_dir=signals_dir, **kwargs)
+    return sorted(calls), signals
+
+
+def _touch_volume(data_dir, ticker):
+    # Changes the stored data, but not the signal
+    path = ticker_path(data_dir, ticker)
+    df = read_frame(path, float_precision='round_trip')
+    df.iloc[-1, df.columns.get_loc(('Volume', ticker))] += 1
+    write_frame(df, path)
+
+
+def test_unchanged_charts_are_skipped(tmp_path, indicator_dir, rendered):
+    signals_dir = str(tmp_path / 'signals')
+    calls, signals = _render(indicator_dir, signals_dir, rendered)
+    assert calls == ['AAA', 'BBB', 'CCC']
+
+    manifest = generate_signals.load_render_manifest(signals_dir)
+    assert {ticker: entry['signal'] for ticker, entry in manifest.items()} == signals
+
+    assert _render(indicator_dir, signals_dir, rendered) == ([], signals)
+
+    _touch_volume(indicator_dir, 'BBB')
+    assert _render(indicator_dir, signals_dir, rendered)[0] == ['BBB']
+
+    # A missing PNG, changed plot parameters and force all re-render
+    os.remove(os.path.join(signals_dir, 'CCC_signals.png'))
+    assert _render(indicator_dir, signals_dir, rendered)[0] == ['CCC']
+    assert _render(indicator_dir, signals_dir, rendered, max_points=500)[0] == \
+        ['AAA', 'BBB', 'CCC']
+    assert _render(indicator_dir, signals_dir, rendered, max_points=500, force=True)[0] == \
+        ['AAA', 'BBB', 'CCC']
+
+
+def test_only_signal_changes(tmp_path, indicator_dir, rendered):
+    signals_dir = str(tmp_path / 'signals')
+    _render(indicator_dir, signals_dir, rendered)
+    before = generate_signals.load_render_manifest(signals_dir)
+
+    # New data with the same signal keeps the chart and its old fingerprint
+    _touch_volume(indicator_dir, 'AAA')
+    assert _render(indicator_dir, signals_dir, rendered, only_signal_changes=True)[0] == []
+    assert generate_signals.load_render_manifest(signals_dir) == before
+
+    # so a full run still renders it
+    assert _render(indicator_dir, signals_dir, rendered)[0] == ['AAA']
+
+    # A changed signal is rendered
+    manifest = generate_signals.load_render_manifest(signals_dir)
+    manifest['BBB']['signal'] = 'Changed'
+    manifest['BBB']['data'] = 'stale'
+    generate_signals.save_render_manifest(manifest, signals_dir)
+    assert _render(indicator_dir, signals_dir, rendered, only_signal_changes=True)[0] == ['BBB']
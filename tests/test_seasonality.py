@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from seasonality import calendar_buckets, seasonality
+
+TOM, REST, UNKNOWN = 0, 1, 2
+
+
+def _tom_codes(dates):
+    names, codes = calendar_buckets(dates)[2]
+    assert names == ['TOM', 'Rest']
+    return pd.Series(codes, index=dates)
+
+
+def test_turn_of_month_buckets():
+    # Starts mid-January, ends on the last business day of March
+    codes = _tom_codes(pd.bdate_range('2024-01-15', '2024-03-29'))
+    tom = ['2024-01-31', '2024-02-01', '2024-02-02', '2024-02-05',
+           '2024-02-29', '2024-03-01', '2024-03-04', '2024-03-05', '2024-03-29']
+    assert list(codes.index[codes == TOM].strftime('%Y-%m-%d')) == tom
+
+    # The first days of the data are not known to be the first of January
+    assert list(codes.index[codes == UNKNOWN].strftime('%Y-%m-%d')) == \
+        ['2024-01-15', '2024-01-16', '2024-01-17']
+
+    # Ending before the last business day, March's last day is cut off
+    codes = _tom_codes(pd.bdate_range('2024-01-01', '2024-03-27'))
+    assert codes['2024-01-01'] == TOM
+    assert codes['2024-03-27'] == UNKNOWN
+    assert codes['2024-03-26'] == REST
+
+
+def _planted_close(seed=0):
+    # Two tickers over four years; X gains 1% on every turn-of-month day
+    dates = pd.bdate_range('2020-01-01', '2023-12-29')
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (len(dates), 2))
+    returns[_tom_codes(dates).to_numpy() == TOM, 0] += 0.01
+    close = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=dates, columns=['X', 'Y'])
+    close.iloc[:60, 1] = np.nan
+    return close
+
+
+def test_p_values_are_reproducible_and_find_the_effect():
+    close = _planted_close()
+    result = seasonality(close, resamples=400, batch_size=64, seed=7)
+
+    assert result.equals(seasonality(close, resamples=400, batch_size=64, seed=7))
+    assert not result['p_value'].equals(seasonality(close, resamples=400, seed=8)['p_value'])
+
+    p_values = result['p_value'].to_numpy()
+    assert ((p_values > 0) & (p_values <= 1)).all()
+    assert result.loc['X', ('p_value', 'TOM')] == 1 / 401
+    assert result.loc['Y', ('p_value', 'TOM')] > 0.01
+
+    # The data covers whole months, so every return is in exactly one
+    # bucket of each grouping
+    returns = close.pct_change(fill_method=None).notna().sum()
+    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+    assert (result['count'][days].sum(axis=1) == returns).all()
+    assert (result['count'][['TOM', 'Rest']].sum(axis=1) == returns).all()
+
+    # Means and counts do not depend on the permutations
+    no_p = seasonality(close, resamples=0)
+    assert no_p['p_value'].isna().all().all()
+    assert no_p['mean'].equals(result['mean']) and no_p['count'].equals(result['count'])
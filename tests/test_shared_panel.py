@@ -0,0 +1,60 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from backtest import backtest_universe
+from indicators_main import process_all_tickers
+from panel_calc import calculate_indicators_panel, calculate_universe_indicators, load_panel
+from shared_panel import SharedPanel, attach, load_shared_panels, map_blocks
+
+
+def _block_sums(frames):
+    return frames['Close'].sum()
+
+
+def _assert_same(actual, expected):
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for name in expected:
+            _assert_same(actual[name], expected[name])
+    else:
+        pd.testing.assert_frame_equal(actual, expected, check_freq=False)
+
+
+def test_pickle_sends_only_the_path(data_dir, tmp_path):
+    with load_shared_panels(data_dir, ['Close'], root=str(tmp_path)) as shared:
+        data = pickle.dumps(shared)
+        assert len(data) < 500 and shared.path.encode() in data
+        assert shared.array('Close').nbytes > len(data)
+
+        # A process maps a directory once, without taking ownership
+        attached = pickle.loads(data)
+        assert attached is attach(shared.path) and not attached.owner
+        _assert_same(attached.frame('Close'), shared.frame('Close'))
+        attached.close()
+        assert os.path.isdir(shared.path)
+    assert not os.path.exists(shared.path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_map_blocks_covers_every_ticker(data_dir, tmp_path, workers):
+    close = load_panel(data_dir)
+    with SharedPanel.from_panels({'Close': close}, root=str(tmp_path)) as shared:
+        blocks = map_blocks(_block_sums, shared, workers=workers, chunk_tickers=2)
+    assert [list(block.index) for block in blocks] == [['AAA', 'BBB'], ['CCC']]
+    pd.testing.assert_series_equal(pd.concat(blocks), close.sum())
+
+
+def test_universe_indicators_with_workers(data_dir):
+    expected = calculate_indicators_panel(load_panel(data_dir))
+    _assert_same(calculate_universe_indicators(data_dir), expected)
+    _assert_same(calculate_universe_indicators(data_dir, workers=2), expected)
+
+
+def test_backtest_with_workers(data_dir):
+    process_all_tickers(data_dir, use_cache=False)
+    expected = backtest_universe(data_dir, cost=0.0005)
+    result = backtest_universe(data_dir, cost=0.0005, workers=2)
+    _assert_same(result, expected)
+    assert len(result['trades']) > 0 and np.isfinite(result['portfolio']['equity']).all()
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import pytest
+import start
+from storage import BACKEND_ENV_VAR, list_tickers, ticker_path, write_frame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(code):
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                            text=True, check=True)
+    return result.stdout
+
+
+def test_help_lists_subcommands(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        start.main(['--help'])
+    assert exit_info.value.code == 0
+    usage = capsys.readouterr().out
+    for command in ('fetch', 'indicators', 'signals', 'screen', 'events', 'run', 'tickers'):
+        assert command in usage
+
+
+def test_stored_tickers_match_storage(data_dir, universe, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, 'npy')
+    write_frame(universe['AAA'], ticker_path(data_dir, 'DDD'))
+    assert start.stored_tickers(data_dir) == list_tickers(data_dir) == \
+        ['AAA', 'BBB', 'CCC', 'DDD']
+
+
+def test_tickers_command_skips_heavy_imports(data_dir):
+    output = _python(f"import sys, start; start.main(['--data-dir', {data_dir!r}, 'tickers']); "
+                     "print(sorted(m for m in ('numpy', 'pandas', 'matplotlib') "
+                     "if m in sys.modules))")
+    assert output.splitlines() == ['AAA', 'BBB', 'CCC', '[]']
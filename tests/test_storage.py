@@ -0,0 +1,120 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+from conftest import assert_identical
+from storage import (BACKEND_ENV_VAR, BACKENDS, append_frame, compact, last_date, list_tickers,
+                     migrate_csv_to_columnar, read_arrays, read_frame, read_tail, ticker_path,
+                     write_frame)
+
+
+@pytest.fixture(params=['csv', 'npy'])
+def backend(request, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, request.param)
+    return request.param
+
+
+def _assert_same_frame(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    assert (actual.index == expected.index).all()
+    for column in expected.columns:
+        assert_identical(actual[column], expected[column], str(column))
+
+
+def test_round_trip(tmp_path, universe, backend):
+    for ticker, df in universe.items():
+        path = ticker_path(str(tmp_path), ticker)
+        write_frame(df, path)
+        _assert_same_frame(read_frame(path, float_precision='round_trip'), df)
+        assert last_date(path) == df.index[-1]
+    assert list_tickers(str(tmp_path)) == sorted(universe)
+
+
+def test_migrate_csv_to_columnar(data_dir, universe):
+    migrate_csv_to_columnar(data_dir)
+    npy = BACKENDS['npy']
+    for ticker, df in universe.items():
+        assert npy.exists(data_dir, ticker)
+        path = ticker_path(data_dir, ticker)
+        _assert_same_frame(read_frame(path, float_precision='round_trip'), df)
+
+        # Columnar arrays are read as stored, without parsing
+        index, arrays = read_arrays(path, ['Close'])
+        assert (index == df.index.values).all()
+        assert_identical(arrays['Close'], df[('Close', ticker)], ticker)
+    assert list_tickers(data_dir) == sorted(universe)
+
+
+def test_append_and_compact(tmp_path, universe, backend):
+    df = universe['CCC']
+    path = ticker_path(str(tmp_path), 'CCC')
+    write_frame(df.iloc[:-12], path)
+    assert append_frame(df.iloc[-12:-5], path, compact_every=None) == 1
+    assert append_frame(df.iloc[-5:], path, compact_every=None) == 2
+
+    _assert_same_frame(read_frame(path, float_precision='round_trip'), df)
+    # CSV data is parsed with pandas' default precision here, as by read_frame
+    index, arrays = read_arrays(path, ['Close'])
+    assert_identical(arrays['Close'], read_frame(path, ['Close'])[('Close', 'CCC')], 'Close')
+    assert last_date(path) == df.index[-1]
+
+    with pytest.raises(ValueError):
+        append_frame(df.iloc[-1:], path)
+
+    assert compact(path)
+    assert not compact(path)
+    _assert_same_frame(read_frame(path, float_precision='round_trip'), df)
+
+
+@pytest.mark.parametrize('rows', [0, 1, 40, 100_000])
+def test_read_tail(tmp_path, universe, backend, rows):
+    df = universe['CCC']
+    path = ticker_path(str(tmp_path), 'CCC')
+    write_frame(df.iloc[:-3], path)
+    append_frame(df.iloc[-3:], path, compact_every=None)
+
+    index, arrays = read_tail(path, rows, ['Close', 'Volume'])
+    expected = df.iloc[len(df) - min(rows, len(df)):]
+    assert (pd.DatetimeIndex(index) == expected.index).all()
+    assert_identical(arrays['Close'], expected[('Close', 'CCC')], 'Close')
+    assert_identical(arrays['Volume'], expected[('Volume', 'CCC')], 'Volume')
+
+
+def test_columnar_generations(tmp_path, universe, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, 'npy')
+    df = universe['AAA']
+    path = ticker_path(str(tmp_path), 'AAA')
+    npy = BACKENDS['npy']
+    write_frame(df.iloc[:-1], path)
+    write_frame(df, path)
+
+    # Only the committed generation is left, and it holds the new rows
+    meta = npy.read_meta(str(tmp_path), 'AAA')
+    files = set(os.listdir(npy.path(str(tmp_path), 'AAA')))
+    assert files == {'.lock', 'meta.json', meta['index'], *meta['files'].values()}
+    assert meta['rows'] == len(df)
+
+    # A column file that does not match meta.json is never read silently
+    with open(os.path.join(npy.path(str(tmp_path), 'AAA'), meta['files']['Close']), 'r+b') as f:
+        f.truncate(1000)
+    with pytest.raises(ValueError):
+        read_tail(path, 5, ['Close'])
+    with pytest.raises(ValueError):
+        read_arrays(path, ['Close'])
+
+
+def test_concurrent_writers(tmp_path, universe, backend):
+    # Writers of one ticker never mix their files; the last write wins whole
+    df = universe['AAA']
+    path = ticker_path(str(tmp_path), 'AAA')
+    versions = [df.iloc[:len(df) - i] for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda version: write_frame(version, path), versions * 4))
+
+    stored = read_frame(path, float_precision='round_trip')
+    _assert_same_frame(stored, next(v for v in versions if len(v) == len(stored)))
+    assert not [f for f in os.listdir(str(tmp_path)) if f.endswith('.tmp')]
+    if backend == 'npy':
+        meta = BACKENDS['npy'].read_meta(str(tmp_path), 'AAA')
+        files = set(os.listdir(BACKENDS['npy'].path(str(tmp_path), 'AAA')))
+        assert files == {'.lock', 'meta.json', meta['index'], *meta['files'].values()}
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from conftest import INDICATOR_COLUMNS, assert_identical, reference_indicators
+from indicators_main import add_indicators_to_file
+from storage import ticker_path, write_frame
+from streaming_calc import StreamingEMA, StreamingMACD, StreamingRSI, TickerStream
+
+
+@pytest.mark.parametrize('ticker', ['AAA', 'BBB', 'CCC'])
+def test_calculators_match_reference(universe, ticker):
+    close = universe[ticker][('Close', ticker)]
+    expected = reference_indicators(close)
+    values = close.tolist()
+
+    for period in (12, 26, 50, 200):
+        ema = StreamingEMA(period)
+        assert_identical([ema.update(x) for x in values], expected[f'EMA_{period}'],
+                         f'EMA_{period}')
+
+    macd = StreamingMACD()
+    macd_values = np.array([macd.update(x) for x in values])
+    for k, name in enumerate(['MACD', 'MACD_Signal', 'MACD_Hist']):
+        assert_identical(macd_values[:, k], expected[name], name)
+
+    rsi = StreamingRSI()
+    assert_identical([rsi.update(x) for x in values], expected['RSI_14'], 'RSI_14')
+
+
+def test_peek_does_not_commit(universe):
+    values = universe['AAA'][('Close', 'AAA')].tolist()
+    stream = TickerStream()
+    for x in values[:-1]:
+        stream.update(x)
+    peeked = stream.peek(values[-1] * 1.01)
+    assert stream.peek(values[-1] * 1.01) == peeked
+    final = stream.update(values[-1])
+
+    expected = reference_indicators(universe['AAA'][('Close', 'AAA')])
+    for name in INDICATOR_COLUMNS:
+        assert_identical([final[name]], [expected[name].iloc[-1]], name)
+
+
+def test_from_file_continues_stored_history(tmp_path, universe):
+    df = universe['AAA']
+    path = ticker_path(str(tmp_path), 'AAA')
+    write_frame(df.iloc[:-30], path)
+    add_indicators_to_file(path)
+
+    # Seeded from the stored indicators and the trailing closes only
+    stream = TickerStream.from_file(path)
+    updates = [stream.update(x) for x in df[('Close', 'AAA')].iloc[-30:]]
+
+    expected = reference_indicators(df[('Close', 'AAA')])
+    for name in INDICATOR_COLUMNS:
+        assert_identical([u[name] for u in updates], expected[name].iloc[-30:], name)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from ema_calc import calculate_ema
+from signal_calc import detect_ema_crossovers
+from storage import BACKEND_ENV_VAR, ticker_path, write_frame
+from sweep_calc import make_grid, sweep_crossovers
+
+FAST_SPANS = [5, 8, 12]
+SLOW_SPANS = [10, 26, 40]
+
+
+def _reference(df, ticker, fast, slow):
+    frame = pd.DataFrame({'Close': df[('Close', ticker)]})
+    emas = {'EMA_12': calculate_ema(frame, 'Close', fast),
+            'EMA_26': calculate_ema(frame, 'Close', slow)}
+    bullish, bearish = detect_ema_crossovers(emas)
+    last_bullish = df.index[bullish.to_numpy()].max()
+    last_bearish = df.index[bearish.to_numpy()].max()
+    if pd.notna(last_bullish) and (pd.isna(last_bearish) or last_bullish > last_bearish):
+        signal = 'Bullish'
+    elif pd.notna(last_bearish):
+        signal = 'Bearish'
+    else:
+        signal = 'Neutral'
+    last_cross = max((d for d in (last_bullish, last_bearish) if pd.notna(d)), default=pd.NaT)
+    return int(bullish.sum()), int(bearish.sum()), signal, last_cross
+
+
+def test_sweep_matches_per_pair_reference(tmp_path, universe, monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV_VAR, 'npy')
+    for ticker, df in universe.items():
+        write_frame(df, ticker_path(str(tmp_path), ticker))
+
+    # Chunks of two tickers leave one ticker in a block of its own
+    results = sweep_crossovers(str(tmp_path), fast_spans=FAST_SPANS, slow_spans=SLOW_SPANS,
+                               chunk_tickers=2)
+    pairs = make_grid(FAST_SPANS, SLOW_SPANS)
+    assert (12, 10) not in pairs
+    assert len(results) == len(pairs) * len(universe)
+
+    for row in results.itertuples():
+        df = universe[row.ticker]
+        bullish, bearish, signal, last_cross = _reference(df, row.ticker, row.fast, row.slow)
+        assert (row.bullish_crosses, row.bearish_crosses, row.signal) == (bullish, bearish, signal)
+        assert row.last_cross_date == last_cross or (pd.isna(row.last_cross_date) and
+                                                     pd.isna(last_cross))
+    assert np.all(results.groupby('ticker').size() == len(pairs))